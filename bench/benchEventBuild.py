@@ -0,0 +1,35 @@
+import os
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(os.path.realpath(__file__)), ".."))
+
+from lxml import etree
+
+from nor2qml.core import nordic2quakeml
+import nordicSamples
+
+#Events with hundreds of picks and several type 1 lines, where adding the arrivals used to search the whole event for every pick
+CASES = ((100, 1), (300, 4), (600, 4), (600, 8), (1200, 8))
+REPEATS = 5
+
+#Time addEvent on one event. Prints the best time of REPEATS runs for each number of picks and type 1 lines
+def main():
+	print("picks  type-1 lines  addEvent")
+
+	for picks, main_headers in CASES:
+		nordic = nordicSamples.createNordicEvent(nordicSamples.createEventLines(picks, main_headers))
+		best = None
+
+		for i in range(REPEATS):
+			eventParameters = etree.Element(nordic2quakeml.BED_NAMESPACE + "eventParameters")
+			start = time.perf_counter()
+			nordic2quakeml.addEvent(eventParameters, nordic, True)
+			elapsed = time.perf_counter() - start
+			if best is None or elapsed < best:
+				best = elapsed
+
+		print("{0:5d}  {1:12d}  {2:8.1f} ms".format(picks, main_headers, best * 1000))
+
+if __name__ == "__main__":
+	main()
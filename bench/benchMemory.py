@@ -0,0 +1,33 @@
+import os
+import sys
+import tracemalloc
+
+sys.path.append(os.path.join(os.path.dirname(os.path.realpath(__file__)), ".."))
+
+from nor2qml.core import nordicColumns, nordicHandler, nordicString
+import nordicSamples
+
+PICKS = 100000
+
+#Measure the memory of the typed and the string phase data records built from separate raw lines with tracemalloc. The values of the fields are included. Prints the memory scaled to one million picks
+def main():
+	lines = [nordicSamples.PHASE_DATA_LINE.format(i % 100) for i in range(PICKS)]
+
+	tracemalloc.start()
+	records = [nordicHandler.NordicPhaseData(nordicColumns.PHASE_DATA_LAYOUT.values(line)) for line in lines]
+	typed = tracemalloc.get_traced_memory()[0]
+	tracemalloc.stop()
+	del records
+
+	tracemalloc.start()
+	records = [nordicString.NordicData(line) for line in lines]
+	strings = tracemalloc.get_traced_memory()[0]
+	tracemalloc.stop()
+	del records
+
+	scale = 1000000.0 / PICKS / (1024 * 1024)
+	print("typed NordicPhaseData: {0:.0f} MB per million picks".format(typed * scale))
+	print("string NordicData:     {0:.0f} MB per million picks".format(strings * scale))
+
+if __name__ == "__main__":
+	main()
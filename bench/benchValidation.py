@@ -0,0 +1,33 @@
+import os
+import sys
+import time
+import warnings
+
+sys.path.append(os.path.join(os.path.dirname(os.path.realpath(__file__)), ".."))
+
+from nor2qml.core import nordic2quakeml
+import nordicSamples
+
+CASES = (3, 300)
+EVENTS = 200
+
+#Time building and validating one event with nordicEventToQuakeMl with the schema compiled beforehand. Prints the mean time per event
+def main():
+	warnings.simplefilter("ignore")
+	xmlschema = nordic2quakeml.getQuakeMlSchema()
+
+	print("picks  nordicEventToQuakeMl")
+
+	for picks in CASES:
+		nordic = nordicSamples.createNordicEvent(nordicSamples.createEventLines(picks))
+		count = max(EVENTS // max(picks // 10, 1), 10)
+
+		start = time.perf_counter()
+		for i in range(count):
+			nordic2quakeml.nordicEventToQuakeMl(nordic, True, xmlschema)
+		elapsed = time.perf_counter() - start
+
+		print("{0:5d}  {1:8.2f} ms per event".format(picks, elapsed / count * 1000))
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,18 @@
+#Synthetic nordic events for the benchmarks
+MAIN_HEADER_LINE = " 2016 0301 1200 30.5LL  60.123  25.456 10.0F HEL  5 0.5 2.3LHEL                1\n"
+OTHER_MAIN_HEADER_LINE = " 2016 0301 1200 31.0LL  60.200  25.500 12.0F BER  6 0.6 2.4LBER                1\n"
+COMMENT_HEADER_LINE = " Helsinki test event (HEL)                                                     3\n"
+ERROR_HEADER_LINE = "     120         0.5       1.2     1.5  2.0             0.2                    5\n"
+PHASE_DATA_LINE = " ST{0:02d} SZ IP   1 C 1200 35.12        12.3  0.4  123.4 6.0 5.0  2 0.12 9  123 200 \n"
+
+#Returns the lines of one event with the picks and the type 1 lines. The type 7 line is left out like the reader does
+def createEventLines(picks, main_headers=1):
+	lines = [MAIN_HEADER_LINE] + [OTHER_MAIN_HEADER_LINE] * (main_headers - 1)
+	lines += [COMMENT_HEADER_LINE, ERROR_HEADER_LINE]
+	lines += [PHASE_DATA_LINE.format(i % 100) for i in range(picks)]
+	return lines
+
+#Returns the NordicEvent of the lines. Uses the string layer so that the same call works on the older versions of the converter
+def createNordicEvent(lines):
+	from nor2qml.core import nordicHandler, nordicString
+	return nordicHandler.createNordicEvent(nordicString.getNordicString(lines))
@@ -8,12 +8,148 @@ sys.path = sys.path + [""]
 
 import click
 
-from nor2qml.core import nordic2quakeml
+from nor2qml.core import nordic2quakeml, nordicDatabase, nordicParallel, nordicQuery, nordicService, nordicStore, nordicWatch, quakeml2nordic
+
+QUERY_OPTIONS = ("starttime", "endtime", "minmagnitude", "maxmagnitude", "mindepth", "maxdepth", "minlatitude", "maxlatitude", "minlongitude", "maxlongitude", "latitude", "longitude", "maxradius")
+BULK_OPTIONS = ("bulk", "quarantine", "report")
+
+#Modes that cannot be used together and the options each mode uses. The query mode is the conversion with query options and the convert mode the conversion without them
+MODES = ("reverse", "sqlite", "database", "serve", "watch")
+MODE_OPTIONS = {
+	"reverse": (),
+	"sqlite": ("separate", "schema", "station") + QUERY_OPTIONS,
+	"database": ("jobs",) + BULK_OPTIONS,
+	"serve": ("schema", "host", "port"),
+	"watch": ("schema", "interval", "state"),
+	"query": ("separate", "schema") + BULK_OPTIONS + QUERY_OPTIONS,
+	"convert": ("separate", "schema", "jobs", "cache", "cache_max_size", "cache_max_age") + BULK_OPTIONS,
+}
+MODE_DESCRIPTIONS = {"reverse": "--reverse", "sqlite": "--sqlite", "database": "--database", "serve": "--serve", "watch": "--watch", "query": "the query options", "convert": "the conversion without the query options"}
+
+#Options that are only used together with another option
+DEPENDENT_OPTIONS = (("quarantine", "bulk"), ("report", "bulk"), ("cache_max_size", "cache"), ("cache_max_age", "cache"))
+RADIUS_OPTIONS = ("latitude", "longitude", "maxradius")
+
+def getOptionName(name):
+	return "--" + name.replace("_", "-")
+
+#Returns the mode of the command line. Raises click.UsageError if several modes are given or if an option is given that the mode does not use
+def getMode(ctx):
+	given = [param.name for param in ctx.command.params if param.name != "nordic" and ctx.get_parameter_source(param.name) != click.core.ParameterSource.DEFAULT]
+
+	modes = [name for name in MODES if name in given]
+	if len(modes) > 1:
+		raise click.UsageError("{0} and {1} cannot be used together".format(getOptionName(modes[0]), getOptionName(modes[1])))
+
+	if modes:
+		mode = modes[0]
+	elif any(name in QUERY_OPTIONS for name in given):
+		mode = "query"
+	else:
+		mode = "convert"
+
+	for name in given:
+		if name != mode and name not in MODE_OPTIONS[mode]:
+			raise click.UsageError("{0} cannot be used with {1}".format(getOptionName(name), MODE_DESCRIPTIONS[mode]))
+
+	for name, required in DEPENDENT_OPTIONS:
+		if name in given and required not in given:
+			raise click.UsageError("{0} is only used with {1}".format(getOptionName(name), getOptionName(required)))
+
+	if 0 < len([name for name in RADIUS_OPTIONS if name in given]) < len(RADIUS_OPTIONS):
+		raise click.UsageError("--latitude, --longitude and --maxradius must be given together")
+
+	return mode
 
 @click.command()
 @click.argument('nordic', nargs=1)
-def nor2qml(nordic):
-	nordic2quakeml.nordic2QuakeML(USR_PATH, nordic)
+@click.option('--separate', is_flag=True, help="Write every event of the nordic file into its own QuakeML file")
+@click.option('--schema', default=nordic2quakeml.QUAKEML_SCHEMA_PATH, help="QuakeML schema file used for validating the output")
+@click.option('--jobs', default=1, help="Number of worker processes converting the events")
+@click.option('--bulk', is_flag=True, help="Skip invalid events and report them at the end instead of stopping the conversion")
+@click.option('--quarantine', default=None, help="File where the invalid events are written in the bulk mode")
+@click.option('--report', default=None, help="File where the errors of the invalid events are written in the bulk mode")
+@click.option('--cache', default=None, help="Directory where the converted events are cached so that unchanged events are not converted again")
+@click.option('--cache-max-size', default=None, type=float, help="Maximum size of the cache in megabytes. The least recently used events are removed first")
+@click.option('--cache-max-age', default=None, type=float, help="Remove the events that have not been used in this many days from the cache")
+@click.option('--watch', is_flag=True, help="Keep watching the nordic directory and convert the new and changed S-files as they arrive")
+@click.option('--interval', default=nordicWatch.POLL_INTERVAL, help="Seconds between the scans of the watched directory")
+@click.option('--state', default=None, help="File where the watch mode records the converted S-files")
+@click.option('--starttime', default=None, help="Convert only the events after this time (YYYY-MM-DDTHH:MM:SS)")
+@click.option('--endtime', default=None, help="Convert only the events before this time (YYYY-MM-DDTHH:MM:SS)")
+@click.option('--minmagnitude', default=None, type=float, help="Convert only the events with at least this magnitude")
+@click.option('--maxmagnitude', default=None, type=float, help="Convert only the events with at most this magnitude")
+@click.option('--mindepth', default=None, type=float, help="Convert only the events at least this deep in kilometers")
+@click.option('--maxdepth', default=None, type=float, help="Convert only the events at most this deep in kilometers")
+@click.option('--minlatitude', default=None, type=float, help="Convert only the events north of this latitude")
+@click.option('--maxlatitude', default=None, type=float, help="Convert only the events south of this latitude")
+@click.option('--minlongitude', default=None, type=float, help="Convert only the events east of this longitude")
+@click.option('--maxlongitude', default=None, type=float, help="Convert only the events west of this longitude")
+@click.option('--latitude', default=None, type=float, help="Latitude of the center point of --maxradius")
+@click.option('--longitude', default=None, type=float, help="Longitude of the center point of --maxradius")
+@click.option('--maxradius', default=None, type=float, help="Convert only the events within this many degrees from --latitude and --longitude like the maxradius of the service")
+@click.option('--serve', is_flag=True, help="Serve the events of the nordic file over HTTP like the FDSN event service")
+@click.option('--host', default="127.0.0.1", help="Address the service listens on")
+@click.option('--port', default=8080, help="Port the service listens on")
+@click.option('--database', default=None, help="Load the events into the PostgreSQL database of this connection string instead of converting them. --jobs sets the number of connections. Events already loaded from the file are skipped. Without --bulk the loading stops at the first invalid event and the events before it stay loaded")
+@click.option('--sqlite', default=None, help="Sync the nordic file or directory into this SQLite store and convert the events from the store")
+@click.option('--station', default=None, help="Convert only the events with phase data from this station. Used with --sqlite")
+@click.option('--reverse', is_flag=True, help="Convert the given QuakeML file into a nordic file. The depths are read in meters and the distances in degrees like QuakeML gives them. An existing nordic file is not overwritten")
+def nor2qml(nordic, separate, schema, jobs, bulk, quarantine, report, cache, cache_max_size, cache_max_age, watch, interval, state,
+			starttime, endtime, minmagnitude, maxmagnitude, mindepth, maxdepth, minlatitude, maxlatitude, minlongitude, maxlongitude, latitude, longitude, maxradius,
+			serve, host, port, database, sqlite, station, reverse):
+	mode = getMode(click.get_current_context())
+
+	if mode == "reverse":
+		quakeml2nordic.quakeML2Nordic(USR_PATH, nordic)
+		return
+
+	query = None
+	query_values = (starttime, endtime, minmagnitude, maxmagnitude, mindepth, maxdepth, minlatitude, maxlatitude, minlongitude, maxlongitude, latitude, longitude, maxradius)
+	if any(value is not None for value in query_values):
+		if starttime is not None:
+			starttime = nordicQuery.parseTime(starttime)
+		if endtime is not None:
+			endtime = nordicQuery.parseTime(endtime)
+		if maxradius is not None:
+			maxradius *= nordicQuery.KM_PER_DEGREE
+		query = nordicQuery.NordicQuery(starttime, endtime, minmagnitude, maxmagnitude, mindepth, maxdepth, minlatitude, maxlatitude, minlongitude, maxlongitude, latitude, longitude, maxradius)
+
+	if mode == "sqlite":
+		nordicStore.nordicStore2QuakeML(USR_PATH, nordic, sqlite, query, station, separate, os.path.join(USR_PATH, schema))
+		return
+
+	if mode == "database":
+		nordicDatabase.nordic2Database(USR_PATH, nordic, database, max(jobs, 1), bulk, quarantine, report)
+		return
+
+	if mode == "serve":
+		nordicService.serveNordicFile(USR_PATH, nordic, host, port, os.path.join(USR_PATH, schema))
+		return
+
+	if mode == "query":
+		nordicQuery.queryNordic2QuakeML(USR_PATH, nordic, query, separate, os.path.join(USR_PATH, schema), bulk, quarantine, report)
+		return
+
+	if mode == "watch":
+		state_path = None
+		if state is not None:
+			state_path = os.path.join(USR_PATH, state)
+		nordicWatch.watchNordicDirectory(USR_PATH, nordic, os.path.join(USR_PATH, schema), state_path, interval)
+		return
+
+	cache_path = None
+	if cache is not None:
+		cache_path = os.path.join(USR_PATH, cache)
+	if cache_max_size is not None:
+		cache_max_size = int(cache_max_size * 1024 * 1024)
+	if cache_max_age is not None:
+		cache_max_age = cache_max_age * 24 * 60 * 60
+
+	if jobs > 1 or os.path.isdir(os.path.join(USR_PATH, nordic)):
+		nordicParallel.nordicCatalog2QuakeML(USR_PATH, nordic, separate, os.path.join(USR_PATH, schema), jobs, bulk, quarantine, report, cache_path, cache_max_size, cache_max_age)
+	else:
+		nordic2quakeml.nordic2QuakeML(USR_PATH, nordic, separate, os.path.join(USR_PATH, schema), bulk, quarantine, report, cache_path, cache_max_size, cache_max_age)
 
 if __name__ == "__main__":
 	nor2qml()
@@ -0,0 +1,49 @@
+import collections
+import logging
+
+from nor2qml.validation import validationTools
+
+#Errors of one event that was skipped during a bulk conversion
+class InvalidEvent:
+	def __init__(self, event_number, errors):
+		self.event_number = event_number
+		self.errors = errors
+
+#Collects the results of a bulk conversion. Invalid events are recorded with their errors and written to the quarantine file if one is given
+class ConversionReport:
+	def __init__(self, quarantine_file=None):
+		self.quarantine_file = quarantine_file
+		self.converted_count = 0
+		self.invalid_events = []
+		self.error_counts = collections.Counter()
+
+	def addConvertedEvent(self):
+		self.converted_count += 1
+
+	def addInvalidEvent(self, event_number, nordic_lines, errors):
+		self.invalid_events.append(InvalidEvent(event_number, errors))
+		validationTools.countErrors(errors, self.error_counts)
+
+		if self.quarantine_file is not None:
+			self.quarantine_file.writelines(nordic_lines)
+			self.quarantine_file.write("\n")
+
+	def getSummary(self):
+		summary = "Converted {0} events, skipped {1} invalid events".format(self.converted_count, len(self.invalid_events))
+
+		for invalid_event in self.invalid_events:
+			summary += "\n  Event {0}: {1} errors".format(invalid_event.event_number + 1, len(invalid_event.errors))
+
+		if self.error_counts:
+			summary += "\nErrors by line type and value:"
+			for (line_type, value_name), count in self.error_counts.most_common():
+				summary += "\n  {0} - {1}: {2}".format(line_type, value_name, count)
+
+		return summary
+
+	#Write every error of every skipped event to the file
+	def writeReport(self, f):
+		for invalid_event in self.invalid_events:
+			f.write("Event {0}:\n".format(invalid_event.event_number + 1))
+			for error in invalid_event.errors:
+				f.write("  {0} - {1}: {2}\n".format(validationTools.nTypes[error.nType], error.valueName, error.message))
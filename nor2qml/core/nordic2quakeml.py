@@ -1,18 +1,26 @@
 from lxml import etree
 
+import contextlib
+import datetime
 import math
+import re
 import sys
 import time
 import os
 import logging
 
-from nor2qml.core import nordicHandler, nordicRead, nordicString
-from nor2qml.validation import nordicValidation
+from nor2qml.core import conversionReport, nordicHandler, nordicRead, nordicString, quakeMlCache
+from nor2qml.validation import nordicValidation, nordicCompiledValidation, validationTools
 
 MODULE_PATH = os.path.realpath(__file__)[:-len("nordic2quakeml.py")]
+QUAKEML_SCHEMA_PATH = MODULE_PATH + "../xml/QuakeML-1.2.xsd"
 
 QUAKEML_ROOT_STRING = '''<?xml version="1.0" encoding="utf-8" standalone="yes"?><q:quakeml xmlns:q="http://quakeml.org/xmlns/quakeml/1.2" xmlns="http://quakeml.org/xmlns/bed/1.2" xmlns:ingv="http://webservices.ingv.it/fdsnws/event/1"></q:quakeml>'''
 
+#Elements added to the QuakeML root need the namespace explicitly. They won't inherit the default namespace of the root
+BED_NAMESPACE = "{http://quakeml.org/xmlns/bed/1.2}"
+XSD_NAMESPACE = "{http://www.w3.org/2001/XMLSchema}"
+
 AUTHORITY_ID = "wh.atis.ids"
 NETWORK_CODE = "netcode"
 
@@ -21,18 +29,96 @@ PICK_POLARITY_CONVERSION = {'C': "positive", 'D': "negative", "+": "undecidable"
 MAGNITUDE_TYPE_CONVERSION = {'L': 'ML', 'C': 'Mc', 'B': 'mb', 'S': 'Ms', 'W': 'MW'}
 INSTRUMENT_TYPE_CONVERSION = {'S': 'SH','B': 'BH', 'L': 'LH'}
 
-pick_id = 0
-
-def addEventParameters(quakeml, nordic, long_quakeML):
-	eventParameters = etree.SubElement(quakeml, "eventParameters")
-	eventParameters.attrib["publicID"] = "smi:" + AUTHORITY_ID + "/eventParameter"
+#QuakeML gives the depths in meters and the distances and the epicenter uncertainties in degrees, nordic in kilometers
+EARTH_RADIUS = 6371.0
+KM_PER_DEGREE = math.pi * EARTH_RADIUS / 180.0
+M_PER_KM = 1000.0
+
+#Version of the conversion. Change it whenever the produced QuakeML changes so that the cached QuakeML of older versions is not used
+CONVERTER_VERSION = 5
+
+#Preformatted publicIDs of one authority. The ids that are followed by the event and a number are given as prefixes
+class PublicIds:
+	def __init__(self, authority_id):
+		prefix = "smi:" + authority_id
+		self.event_parameters = prefix + "/eventParameter"
+		self.event = prefix + "/event/"
+		self.origin_prefix = prefix + "/path/to/origin/"
+		self.magnitude_prefix = prefix + "/path/to/magnitude/"
+		self.agency = prefix + "/path/to/agency"
+		self.focal_mechanism_prefix = prefix + "/path/to/focalMechanism/"
+		self.pick_prefix = prefix + "/path/to/pick/"
+		self.amplitude_prefix = prefix + "/path/to/amplitude/"
+		self.arrival_prefix = prefix + "/path/to/arrival/"
+
+PUBLIC_IDS = PublicIds(AUTHORITY_ID)
+
+#Returns the length of one degree of longitude in kilometers at the latitude. The latitude is taken as 0 when it is not known and the length is kept above 1 km near the poles
+def getKmPerLongitudeDegree(latitude):
+	return max(KM_PER_DEGREE * math.cos(math.radians(latitude or 0.0)), 1.0)
+
+#Returns the namespace of the publicIDs of the event from the origin time and the agency of the first type 1 line, so the ids don't depend on the other events being converted
+def getEventKey(nordic):
+	main_header = nordic.headers[1][0]
+	event_key = "{0:%Y%m%d}T{1:02d}{2:02d}{3:04.1f}".format(main_header.date, main_header.hour or 0, main_header.minute or 0, main_header.second or 0)
+
+	if main_header.epicenter_reporting_agency is not None:
+		event_key += "-" + re.sub(r"[^\w\-.]", "_", main_header.epicenter_reporting_agency)
+
+	return event_key
+
+#Allocates the publicIDs of one event. The picks are numbered from 1 inside the namespace of the event and the amplitude and the arrivals of a phase line share the number of its pick. Every origin has an arrival of the pick, so the arrival ids have the number of the origin before the number of the pick. The origins and the magnitudes are numbered by their type 1 line and the focal mechanisms by their type E line
+class EventIds:
+	def __init__(self, public_ids, event_key):
+		self.public_ids = public_ids
+		self.event = public_ids.event + event_key
+		self.origin_prefix = public_ids.origin_prefix + event_key + "/"
+		self.magnitude_prefix = public_ids.magnitude_prefix + event_key + "/"
+		self.focal_mechanism_prefix = public_ids.focal_mechanism_prefix + event_key + "/"
+		self.pick_prefix = public_ids.pick_prefix + event_key + "/"
+		self.amplitude_prefix = public_ids.amplitude_prefix + event_key + "/"
+		self.arrival_prefix = public_ids.arrival_prefix + event_key + "/"
+		self.pick_number = 0
+		self.pick = None
+		self.amplitude = None
+
+	#Allocate the ids of the next phase line. Returns the id of the pick
+	def nextPick(self):
+		self.pick_number += 1
+		number = str(self.pick_number)
+		self.pick = self.pick_prefix + number
+		self.amplitude = self.amplitude_prefix + number
+		return self.pick
+
+	#Returns the id of the arrival of the current pick in the origin of the type 1 line i
+	def getArrivalId(self, i):
+		return "{0}{1}/{2}".format(self.arrival_prefix, i + 1, self.pick_number)
+
+	def getOriginId(self, i):
+		return self.origin_prefix + str(i + 1)
+
+	def getMagnitudeId(self, i):
+		return self.magnitude_prefix + str(i + 1)
+
+	def getFocalMechanismId(self, i):
+		return self.focal_mechanism_prefix + str(i + 1)
+
+#Compiled QuakeML schemas of this process by the schema path
+xml_schemas = {}
+
+def addEventParameters(quakeml, nordics, long_quakeML, public_ids=PUBLIC_IDS, network_code=NETWORK_CODE):
+	eventParameters = etree.SubElement(quakeml, BED_NAMESPACE + "eventParameters")
+	eventParameters.attrib["publicID"] = public_ids.event_parameters
 	
-	addEvent(eventParameters, nordic, long_quakeML)
+	for nordic in nordics:
+		addEvent(eventParameters, nordic, long_quakeML, public_ids, network_code)
 
-def addEvent(eventParameters, nordic, long_quakeML):
+#Add one event. The publicIDs are formatted with the public ids of the authority and the waveform ids get the network code
+def addEvent(eventParameters, nordic, long_quakeML, public_ids=PUBLIC_IDS, network_code=NETWORK_CODE):
 	#Add event
-	event = etree.SubElement(eventParameters, "event")
-	event.attrib["publicID"] = "smi:" + AUTHORITY_ID + "/event/"
+	event = etree.SubElement(eventParameters, BED_NAMESPACE + "event")
+	ids = EventIds(public_ids, getEventKey(nordic))
+	event.attrib["publicID"] = ids.event
 
 	#Adding event type	
 	event_type_txt = " "
@@ -40,153 +126,118 @@ def addEvent(eventParameters, nordic, long_quakeML):
 		if header.event_desc_id is not None:
 			event_type_txt = header.event_desc_id
 
-	event_type = etree.SubElement(event, "type")
+	event_type = etree.SubElement(event, BED_NAMESPACE + "type")
 	event_type.text = EVENT_TYPE_CONVERSION[event_type_txt]
 
 	#Adding event comments
 	for header_comment in nordic.get_comment_headers():
 		if header_comment.h_comment is not None:
-			event_comment = etree.SubElement(event, "comment")
-			event_comment_txt = etree.SubElement(event_comment, "text")
+			event_comment = etree.SubElement(event, BED_NAMESPACE + "comment")
+			event_comment_txt = etree.SubElement(event_comment, BED_NAMESPACE + "text")
 			event_comment_txt.text = header_comment.h_comment
 
 	#Adding preferred Magnitude ID
 	
 	#Adding preferred Focal Mechanism ID
 
-	#Creating the all elements and their subelement
+	#Creating the all elements and their subelement. The origins are kept so that the arrivals can be added to them without searching the event
+	origins = []
 	for i in range(0,len(nordic.headers[1])):
-		addOrigin(event, nordic, i)
+		origins.append(addOrigin(event, nordic, i, ids))
 	
 		#Adding preferred OriginID	
 		
 
 		if long_quakeML:
-			addMagnitude(event, nordic, i)
+			addMagnitude(event, nordic, i, ids)
 	
 	for i in range(0, len(nordic.headers[5])):
-		addFocalMech(event, nordic.headers[5][i])
+		addFocalMech(event, nordic.headers[5][i], i, ids)
 
 
 	if long_quakeML:
+		pick_dates = getPickDates(nordic)
 		for phase_data in nordic.phase_data:
-			addPick(event, nordic, phase_data)
-			addAmplitude(event, nordic, phase_data)
-			for origin in event.iter("origin"):
-				addArrival(origin, phase_data, nordic)
-
-def addPick(event, nordic, phase_data):
-	pick = etree.SubElement(event, "pick")
-	global pick_id
-	pick_id += 1
-	pick.attrib["publicID"] = "smi:" + AUTHORITY_ID + "/path/to/pick/" + str(pick_id)
-
-	time_value = ""
-	#time value for the pick	
-	if (phase_data.time_info == '+'):
-		time_value = str(nordic.headers[1][0].date + datetime.timedelta(days=1)) + "T"
-	elif (phase_data.time_info == '-'):
-		time_value = str(nordic.headers[1][0].date - datetime.timedelta(days=1)) + "T"
-	else:
-		time_value = str(nordic.headers[1][0].date) + "T"
+			addPick(event, nordic, phase_data, pick_dates, ids, network_code)
+			addAmplitude(event, nordic, phase_data, ids)
+			for i, origin in enumerate(origins):
+				addArrival(origin, i, phase_data, nordic, ids)
 
-	if phase_data.hour < 10:
-		time_value = time_value + "0" + str(phase_data.hour) + ":"
-	else:
-		time_value = time_value + str(phase_data.hour) + ":"
+	return event
 
-	if phase_data.minute < 10:
-		time_value = time_value + "0" + str(phase_data.minute) + ":"
-	else:
-		time_value = time_value + str(phase_data.minute) + ":"
+#Dates of the picks of the event by the time_info of the phase data. The picks marked with + or - are on the next or the previous day
+def getPickDates(nordic):
+	event_date = nordic.headers[1][0].date
+	return {" ": str(event_date), "+": str(event_date + datetime.timedelta(days=1)), "-": str(event_date - datetime.timedelta(days=1))}
 
-	if phase_data.second < 10:
-		time_value = time_value + "0" + str(int(phase_data.second)) + "Z"
-	else:
-		time_value = time_value + str(int(phase_data.second)) + "Z" 
+#QuakeML time value of the date string and the time of the day. The fraction of the second is not written
+def formatQuakeMlTime(date_string, hour, minute, second):
+	return "%sT%02d:%02d:%02dZ" % (date_string, hour, minute, int(second))
+
+def addPick(event, nordic, phase_data, pick_dates, ids, network_code):
+	pick = etree.SubElement(event, BED_NAMESPACE + "pick")
+	pick.attrib["publicID"] = ids.nextPick()
+
+	#time value for the pick
+	time_value = formatQuakeMlTime(pick_dates.get(phase_data.time_info, pick_dates[" "]), phase_data.hour, phase_data.minute, phase_data.second)
 
 	addTime(pick, time_value, 0)
 
 	#Pick waveform ID
-	waveform_id = etree.SubElement(pick, "waveformID")
-	waveform_id.attrib["networkCode"] = "" + NETWORK_CODE
+	waveform_id = etree.SubElement(pick, BED_NAMESPACE + "waveformID")
+	waveform_id.attrib["networkCode"] = network_code
 	waveform_id.attrib["stationCode"] = phase_data.station_code.strip()
 	if phase_data.sp_instrument_type is not None and phase_data.sp_component is not None:
 		waveform_id.attrib["channelCode"] = INSTRUMENT_TYPE_CONVERSION[phase_data.sp_instrument_type] + phase_data.sp_component.strip()
 
 	#Pick first motion
 	if phase_data.first_motion is not None and phase_data.first_motion in PICK_POLARITY_CONVERSION:
-		pick_polarity = etree.SubElement(pick, "polarity")	
+		pick_polarity = etree.SubElement(pick, BED_NAMESPACE + "polarity")	
 		pick_polarity.text = PICK_POLARITY_CONVERSION[phase_data.first_motion]
 
 	#Pick backazimuth
 	if phase_data.back_azimuth is not None:
-		pick_back_azimuth = etree.SubElement(pick, "backazimuth")
-		pick_back_azimuth_value = etree.SubElement(pick_back_azimuth, "value")
+		pick_back_azimuth = etree.SubElement(pick, BED_NAMESPACE + "backazimuth")
+		pick_back_azimuth_value = etree.SubElement(pick_back_azimuth, BED_NAMESPACE + "value")
 		pick_back_azimuth_value.text = str(phase_data.back_azimuth)
 
-def addAmplitude(event, nordic, phase_data):
+def addAmplitude(event, nordic, phase_data, ids):
 	if phase_data.max_amplitude is not None:
-		global pick_id
-		amplitude = etree.SubElement(event, "amplitude")
-		amplitude.attrib["publicID"] = "smi:" + AUTHORITY_ID + "/path/to/amplitude/" + str(pick_id)
+		amplitude = etree.SubElement(event, BED_NAMESPACE + "amplitude")
+		amplitude.attrib["publicID"] = ids.amplitude
 
 		#adding generic amplitude
-		generic_amplitude = etree.SubElement(amplitude, "genericAmplitude")
-		generic_amplitude_value = etree.SubElement(generic_amplitude, "value")
+		generic_amplitude = etree.SubElement(amplitude, BED_NAMESPACE + "genericAmplitude")
+		generic_amplitude_value = etree.SubElement(generic_amplitude, BED_NAMESPACE + "value")
 		generic_amplitude_value.text = str(math.pow(phase_data.max_amplitude, -9)) #Convert to meters from nanometers
 
 		#Adding amplitude period
 		if phase_data.max_amplitude_period is not None:
-			amplitude_period = etree.SubElement(amplitude, "period")
-			amplitude_period_value = etree.SubElement(amplitude_period, "value")
+			amplitude_period = etree.SubElement(amplitude, BED_NAMESPACE + "period")
+			amplitude_period_value = etree.SubElement(amplitude_period, BED_NAMESPACE + "value")
 			amplitude_period_value.text = str(phase_data.max_amplitude_period)
 
 		#Adding amplitude unit
-		amplitude_unit = etree.SubElement(amplitude, "unit")
+		amplitude_unit = etree.SubElement(amplitude, BED_NAMESPACE + "unit")
 		amplitude_unit.text = "m"
 
 		#Adding time window
 		if phase_data.signal_duration is not None:
-			time_window = etree.SubElement(amplitude, "timeWindow")
-			time_window_value = etree.SubElement(time_window, "value")
+			time_window = etree.SubElement(amplitude, BED_NAMESPACE + "timeWindow")
+			time_window_value = etree.SubElement(time_window, BED_NAMESPACE + "value")
 			time_window_value.text = str(phase_data.signal_duration)
 
 		if phase_data.signal_to_noise is not None:
-			snr = etree.SubElement(amplitude, "snr")
+			snr = etree.SubElement(amplitude, BED_NAMESPACE + "snr")
 			snr.text = str(phase_data.signal_to_noise)
 
-def addOrigin(event, nordic, i):
-	origin = etree.SubElement(event, "origin") 
-	origin.attrib["publicID"] = "smi:" + AUTHORITY_ID + "/path/to/origin"
-
-	#time value for the origin
-	time_value = ""
-	time_value = str(nordic.headers[1][i].date) + "T"
+def addOrigin(event, nordic, i, ids):
+	origin = etree.SubElement(event, BED_NAMESPACE + "origin") 
+	origin.attrib["publicID"] = ids.getOriginId(i)
 
-	if nordic.headers[1][i].hour is not None:
-		if nordic.headers[1][i].hour < 10:
-			time_value = time_value + "0" + str(nordic.headers[1][i].hour) + ":"
-		else:
-			time_value = time_value + str(nordic.headers[1][i].hour) + ":"
-	else:
-		time_value = time_value + "00:"
-
-	if nordic.headers[1][i].minute is not None:
-		if nordic.headers[1][i].minute < 10:
-			time_value = time_value + "0" + str(nordic.headers[1][i].minute) + ":"
-		else:
-			time_value = time_value + str(nordic.headers[1][i].minute) + ":"
-	else:
-		time_value = time_value + "00:"
-	
-	if nordic.headers[1][i].second is not None:
-		if nordic.headers[1][i].second < 10:
-			time_value = time_value + "0" + str(int(nordic.headers[1][i].second)) + "Z"
-		else:
-			time_value = time_value + str(int(nordic.headers[1][i].second)) + "Z" 
-	else:
-		time_value = time_value + "00Z"
+	#time value for the origin. The missing parts of the time are written as zeros
+	main_header = nordic.headers[1][i]
+	time_value = formatQuakeMlTime(str(main_header.date), main_header.hour or 0, main_header.minute or 0, main_header.second or 0)
 
 	#time uncertainty	
 	if nordic.headers[5]:
@@ -201,193 +252,517 @@ def addOrigin(event, nordic, i):
 
 	#Adding value for epicenter latitude
 	if nordic.headers[1][i].epicenter_latitude is not None:
-		origin_latitude = etree.SubElement(origin, "latitude")
-		origin_latitude_value = etree.SubElement(origin_latitude, "value")
+		origin_latitude = etree.SubElement(origin, BED_NAMESPACE + "latitude")
+		origin_latitude_value = etree.SubElement(origin_latitude, BED_NAMESPACE + "value")
 		origin_latitude_value.text = str(nordic.headers[1][i].epicenter_latitude)
 		if nordic.headers[5]:
 			if nordic.headers[5][0].epicenter_latitude_error is not None:
-				origin_latitude_uncertainty = etree.SubElement(origin_latitude, "uncertainty")
-				origin_latitude_uncertainty.text = str(nordic.headers[5][0].epicenter_latitude_error)
+				origin_latitude_uncertainty = etree.SubElement(origin_latitude, BED_NAMESPACE + "uncertainty")
+				origin_latitude_uncertainty.text = str(nordic.headers[5][0].epicenter_latitude_error / KM_PER_DEGREE)
 
 	#Adding value for epicenter longitude
 	if nordic.headers[1][i].epicenter_longitude is not None:
-		origin_longitude = etree.SubElement(origin, "longitude")
-		origin_longitude_value = etree.SubElement(origin_longitude, "value")
+		origin_longitude = etree.SubElement(origin, BED_NAMESPACE + "longitude")
+		origin_longitude_value = etree.SubElement(origin_longitude, BED_NAMESPACE + "value")
 		origin_longitude_value.text = str(nordic.headers[1][i].epicenter_longitude)
 		if nordic.headers[5]:
 			if nordic.headers[5][0].epicenter_longitude_error is not None:
-				origin_longitude_uncertainty = etree.SubElement(origin_longitude, "uncertainty")
-				origin_longitude_uncertainty.text = str(nordic.headers[5][0].epicenter_longitude_error)
+				origin_longitude_uncertainty = etree.SubElement(origin_longitude, BED_NAMESPACE + "uncertainty")
+				origin_longitude_uncertainty.text = str(nordic.headers[5][0].epicenter_longitude_error / getKmPerLongitudeDegree(nordic.headers[1][i].epicenter_latitude))
 
 	#Adding value for epicenter depth
 	if nordic.headers[1][i].depth is not None:
-		origin_depth = etree.SubElement(origin, "depth")
-		origin_depth_value = etree.SubElement(origin_depth, "value")
-		origin_depth_value.text = str(nordic.headers[1][i].depth)
+		origin_depth = etree.SubElement(origin, BED_NAMESPACE + "depth")
+		origin_depth_value = etree.SubElement(origin_depth, BED_NAMESPACE + "value")
+		origin_depth_value.text = str(round(nordic.headers[1][i].depth * M_PER_KM, 3))
 		if nordic.headers[5]:
 			if nordic.headers[5][0].depth_error is not None:
-				origin_depth_uncertainty = etree.SubElement(origin_depth, "uncertainty")
-				origin_depth_uncertainty.text = str(nordic.headers[5][0].depth_error)
+				origin_depth_uncertainty = etree.SubElement(origin_depth, BED_NAMESPACE + "uncertainty")
+				origin_depth_uncertainty.text = str(round(nordic.headers[5][0].depth_error * M_PER_KM, 3))
 
 	#Adding value for rms time residuals
 	if nordic.headers[1][i].rms_time_residuals is not None:
-		origin_quality = etree.SubElement(origin, "quality")
-		origin_quality_standard_error = etree.SubElement(origin_quality, "standardError")
+		origin_quality = etree.SubElement(origin, BED_NAMESPACE + "quality")
+		origin_quality_standard_error = etree.SubElement(origin_quality, BED_NAMESPACE + "standardError")
 		origin_quality_standard_error.text = str(nordic.headers[1][i].rms_time_residuals)
 
-def addMagnitude(event, nordic, i):
+	return origin
+
+def addMagnitude(event, nordic, i, ids):
 	if nordic.headers[1][i].magnitude_1 is not None:
-		magnitude = etree.SubElement(event, "magnitude")
-		magnitude.attrib["publicID"] = "smi:" + AUTHORITY_ID + "/path/to/magnitude"
+		magnitude = etree.SubElement(event, BED_NAMESPACE + "magnitude")
+		magnitude.attrib["publicID"] = ids.getMagnitudeId(i)
 	
 		#Adding a value for magnitude
-		magnitude_mag = etree.SubElement(magnitude, "mag")
-		magnitude_mag_value = etree.SubElement(magnitude_mag, "value")
+		magnitude_mag = etree.SubElement(magnitude, BED_NAMESPACE + "mag")
+		magnitude_mag_value = etree.SubElement(magnitude_mag, BED_NAMESPACE + "value")
 		magnitude_mag_value.text = str(nordic.headers[1][i].magnitude_1)
 
 		if nordic.headers[5]:
 			if nordic.headers[5][0].magnitude_error is not None:
-					magnitude_mag_uncertainty = etree.SubElement(magnitude_mag, "uncertainty")
+					magnitude_mag_uncertainty = etree.SubElement(magnitude_mag, BED_NAMESPACE + "uncertainty")
 					magnitude_mag_uncertainty.text = str(nordic.headers[5][0].magnitude_error)
 
 		#Adding magnitude type 
 		if nordic.headers[1][i].type_of_magnitude_1 is not None and nordic.headers[1][i].type_of_magnitude_1 in MAGNITUDE_TYPE_CONVERSION:
-			magnitude_type = etree.SubElement(magnitude, "type")
+			magnitude_type = etree.SubElement(magnitude, BED_NAMESPACE + "type")
 			magnitude_type.text = MAGNITUDE_TYPE_CONVERSION[nordic.headers[1][i].type_of_magnitude_1]
 		
 		#Adding number of stations 
 		if nordic.headers[1][i].stations_used is not None:
-			magnitude_station_count = etree.SubElement(magnitude, "stationCount")
+			magnitude_station_count = etree.SubElement(magnitude, BED_NAMESPACE + "stationCount")
 			magnitude_station_count.text = str(nordic.headers[1][i].stations_used)
 
 		if nordic.headers[1][i].magnitude_reporting_agency_1 is not None:
-			magnitude_creation_info = etree.SubElement(magnitude, "creationInfo")
-			magnitude_creation_info_agency = etree.SubElement(magnitude_creation_info, "agencyID")
+			magnitude_creation_info = etree.SubElement(magnitude, BED_NAMESPACE + "creationInfo")
+			magnitude_creation_info_agency = etree.SubElement(magnitude_creation_info, BED_NAMESPACE + "agencyID")
 			magnitude_creation_info_agency.text = nordic.headers[1][i].magnitude_reporting_agency_1
-			magnitude_creation_info_agency_uri = etree.SubElement(magnitude_creation_info, "agencyURI")
-			magnitude_creation_info_agency_uri.text = "smi:" + AUTHORITY_ID + "/path/to/agency"
+			magnitude_creation_info_agency_uri = etree.SubElement(magnitude_creation_info, BED_NAMESPACE + "agencyURI")
+			magnitude_creation_info_agency_uri.text = ids.public_ids.agency
 
-		magnitude_origin_id = etree.SubElement(magnitude, "originID")
-		magnitude_origin_id.text =  "smi:" + AUTHORITY_ID + "/path/to/origin"
+		magnitude_origin_id = etree.SubElement(magnitude, BED_NAMESPACE + "originID")
+		magnitude_origin_id.text =  ids.getOriginId(i)
 
-def addArrival(origin, phase_data, nordic):
+def addArrival(origin, i, phase_data, nordic, ids):
 	if phase_data.phase_type is not None:
-		global pick_id
-		arrival = etree.SubElement(origin, "arrival")
-		arrival.attrib["publicID"] = "smi:" + AUTHORITY_ID + "/path/to/arrival/" + str(pick_id)
+		arrival = etree.SubElement(origin, BED_NAMESPACE + "arrival")
+		arrival.attrib["publicID"] = ids.getArrivalId(i)
 
 		#Adding pick reference
-		arrival_pick_id = etree.SubElement(arrival, "pickID")
-		arrival_pick_id.text = "smi:" + AUTHORITY_ID + "/path/to/pick/" + str(pick_id)
+		arrival_pick_id = etree.SubElement(arrival, BED_NAMESPACE + "pickID")
+		arrival_pick_id.text = ids.pick
 
 		#Adding phase
-		arrival_phase = etree.SubElement(arrival, "phase")
+		arrival_phase = etree.SubElement(arrival, BED_NAMESPACE + "phase")
 		arrival_phase.text = phase_data.phase_type
 	
 		#Adding azimuth
 		if phase_data.epicenter_to_station_azimuth is not None:
-			arrival_azimuth = etree.SubElement(arrival, "azimuth")
+			arrival_azimuth = etree.SubElement(arrival, BED_NAMESPACE + "azimuth")
 			arrival_azimuth.text = str(phase_data.epicenter_to_station_azimuth)
 	
 		#Adding time residual
 		if phase_data.travel_time_residual is not None:
-			arrival_time_residual = etree.SubElement(arrival, "timeResidual")
+			arrival_time_residual = etree.SubElement(arrival, BED_NAMESPACE + "timeResidual")
 			arrival_time_residual.text = str(phase_data.travel_time_residual)
 
 		#Adding arrival distance
 		if phase_data.epicenter_distance is not None:
-			arrival_distance = etree.SubElement(arrival, "distance")
-			arrival_distance.text = str(phase_data.epicenter_distance)
+			arrival_distance = etree.SubElement(arrival, BED_NAMESPACE + "distance")
+			arrival_distance.text = str(phase_data.epicenter_distance / KM_PER_DEGREE)
 
 #TODO: See if station magnitude information can be found from somewhere. Without it stationMagnitude and staionMagnitudeContribution elements are useless.
 
 #TODO: addStationMag
 #def addStationMag(event, phase_data, nordic):
 #	if phase_data.max_amplitude is not None:
-#		station_magnitude = etree.SubElement(event, "stationMagnitude")
+#		station_magnitude = etree.SubElement(event, BED_NAMESPACE + "stationMagnitude")
 #		station_magnitude.attrib["publicID"] = "smi:" + AUTHORITY_ID + "/path/to/stationmag/"
 #TODO: addStationMagContribution
 
 #TODO: addFocalMech
-def addFocalMech(event, h_error):
+def addFocalMech(event, h_error, i, ids):
 	if (h_error.gap is not None):
-		focal_mechanism = etree.SubElement(event, "focalMechanism")
-		focal_mechanism.attrib["publicID"] = "smi:" + AUTHORITY_ID + "/path/to/focalMech"
+		focal_mechanism = etree.SubElement(event, BED_NAMESPACE + "focalMechanism")
+		focal_mechanism.attrib["publicID"] = ids.getFocalMechanismId(i)
 		
 		#Adding Gap
-		focal_mechanism_gap = etree.SubElement(focal_mechanism, "azimuthalGap")
+		focal_mechanism_gap = etree.SubElement(focal_mechanism, BED_NAMESPACE + "azimuthalGap")
 		focal_mechanism_gap.text = str(h_error.gap)
 
 def addTime(container, time_value, time_uncertainty):
-	time = etree.SubElement(container, "time")
-	value = etree.SubElement(time, "value")
+	time = etree.SubElement(container, BED_NAMESPACE + "time")
+	value = etree.SubElement(time, BED_NAMESPACE + "value")
 	value.text = time_value
 
 	if time_uncertainty != 0:
-		uncertainty = etree.SubElement(time, "uncertainty")
+		uncertainty = etree.SubElement(time, BED_NAMESPACE + "uncertainty")
 		uncertainty.text = str(time_uncertainty)
 
-def validateQuakeMlFile(test, xmlschema):
+#Validate the QuakeML tree. The errors are logged or collected to the errors list if one is given
+def validateQuakeMlFile(test, xmlschema, errors=None):
 	try:
 		xmlschema.assertValid(test)
 		return True
-	except:
-		log = xmlschema.error_log.last_error
+	except Exception as e:
+		#The error log of the exception is used when there is one because the error log of the schema is shared by the threads using the schema
+		error_log = getattr(e, "error_log", xmlschema.error_log)
+
+		if errors is not None:
+			for log in error_log:
+				errors.append(validationTools.ValidationError(10, log.type_name, "{0}: {2}", (log.message,)))
+			return False
+
+		log = error_log.last_error
 		logging.error("QuakeML file did not go through the validation:")
 		logging.error(log.domain_name + ": " + log.type_name)
 		return False
 
-def nordicEventToQuakeMl(nordicEvent, long_quakeML):
-	f = open(MODULE_PATH + "../xml/QuakeML-1.2.xsd")
-	xmlschema_doc = etree.parse(f)
-	f.close()
+#Returns the compiled QuakeML schema. The schema file is parsed and compiled only once per process
+def getQuakeMlSchema(schema_path=QUAKEML_SCHEMA_PATH):
+	if schema_path not in xml_schemas:
+		f = open(schema_path)
+		xmlschema_doc = etree.parse(f)
+		f.close()
+
+		xml_schemas[schema_path] = etree.XMLSchema(xmlschema_doc)
+
+	return xml_schemas[schema_path]
+
+#Returns the paths of the schema file and of the local schema files it imports or includes, like the QuakeML BED schema of the QuakeML schema
+def getSchemaFiles(schema_path):
+	schema_files = [schema_path]
+
+	for schema_file in schema_files:
+		for element in etree.parse(schema_file).iter(XSD_NAMESPACE + "import", XSD_NAMESPACE + "include"):
+			location = element.get("schemaLocation")
+			if location is None or "://" in location:
+				continue
+
+			location = os.path.join(os.path.dirname(schema_file), location)
+			if location not in schema_files:
+				schema_files.append(location)
+
+	return schema_files
+
+#Replace the schema of the schema path with an already parsed schema document or compiled schema
+def setQuakeMlSchema(xmlschema, schema_path=QUAKEML_SCHEMA_PATH):
+	if not isinstance(xmlschema, etree.XMLSchema):
+		xmlschema = etree.XMLSchema(xmlschema)
+
+	xml_schemas[schema_path] = xmlschema
+
+def nordicEventToQuakeMl(nordicEvent, long_quakeML, xmlschema=None, errors=None):
+	return nordicEventsToQuakeMl([nordicEvent], long_quakeML, xmlschema, errors)
+
+#Returns the QuakeML tree of the events or None if it did not go through the validation. The errors are logged or collected to the errors list if one is given
+def nordicEventsToQuakeMl(nordicEvents, long_quakeML, xmlschema=None, errors=None):
+	if xmlschema is None:
+		xmlschema = getQuakeMlSchema()
 
 	utf8_parser = etree.XMLParser(encoding='utf-8')
 	quakeml = etree.fromstring(QUAKEML_ROOT_STRING.encode('utf-8'), utf8_parser)
 
-	addEventParameters(quakeml, nordicEvent, long_quakeML)
+	addEventParameters(quakeml, nordicEvents, long_quakeML)
 
-	xmlschema = etree.XMLSchema(xmlschema_doc)
+	if not validateQuakeMlFile(quakeml, xmlschema, errors):
+		return None
 
-	#Parse the tree to a string and back to the object because of a weird bug on validating the tree...
-	test = etree.tostring(quakeml)
-	quakeml = etree.XML(test)
+	return quakeml
 
-	if not validateQuakeMlFile(quakeml, xmlschema):
-		sys.exit(-1)
+#Writes events incrementally into one QuakeML document. Each event is built, validated, written and freed before the next one, so the memory use doesn't grow with the number of events
+class QuakeMlWriter:
+	def __init__(self, f, long_quakeML, xmlschema=None, converter=None):
+		if converter is None:
+			converter = QuakeMlConverter(long_quakeML, xmlschema)
+
+		self.f = f
+		self.converter = converter
+		self.xmlschema = converter.xmlschema
+		self.event_count = 0
+
+		#The events are built and validated inside this document before they are written
+		utf8_parser = etree.XMLParser(encoding='utf-8')
+		self.quakeml = etree.fromstring(QUAKEML_ROOT_STRING.encode('utf-8'), utf8_parser)
+		self.eventParameters = etree.SubElement(self.quakeml, BED_NAMESPACE + "eventParameters")
+		self.eventParameters.attrib["publicID"] = converter.public_ids.event_parameters
+
+	def __enter__(self):
+		self.exit_stack = contextlib.ExitStack()
+		self.xf = self.exit_stack.enter_context(etree.xmlfile(self.f, encoding='utf-8'))
+		self.xf.write_declaration(standalone=True)
+		self.exit_stack.enter_context(self.xf.element(self.quakeml.tag, nsmap=self.quakeml.nsmap))
+		self.xf.write("\n")
+		self.exit_stack.enter_context(self.xf.element(self.eventParameters.tag, attrib=dict(self.eventParameters.attrib)))
+		self.xf.write("\n")
+
+		return self
+
+	def __exit__(self, exc_type, exc_value, traceback):
+		return self.exit_stack.__exit__(exc_type, exc_value, traceback)
+
+	#Write an event that has already been built and serialized with nordicEventToQuakeMlFragment
+	def writeEventFragment(self, fragment):
+		self.xf.flush()
+		self.f.write(fragment)
+		self.event_count += 1
+
+	#Write one event to the document. Returns False if the event did not go through the validation
+	def writeEvent(self, nordic):
+		event = self.converter.addEvent(self.eventParameters, nordic)
+
+		valid = validateQuakeMlFile(self.quakeml, self.xmlschema)
+
+		if valid:
+			self.xf.write(event, pretty_print=True)
+			self.event_count += 1
+
+		self.eventParameters.remove(event)
+
+		return valid
+
+#Converts nordic events into QuakeML with the settings it is created with. The compiled schema and the public ids of the authority are kept in the converter and it holds no state between the events, so one converter can be used for any number of events from several threads at the same time
+class QuakeMlConverter:
+	def __init__(self, long_quakeML=True, xmlschema=None, authority_id=AUTHORITY_ID, network_code=NETWORK_CODE, schema_path=QUAKEML_SCHEMA_PATH):
+		if xmlschema is None:
+			xmlschema = getQuakeMlSchema(schema_path)
+
+		self.long_quakeML = long_quakeML
+		self.xmlschema = xmlschema
+		self.schema_path = schema_path
+		self.authority_id = authority_id
+		self.network_code = network_code
+
+		if authority_id == AUTHORITY_ID:
+			self.public_ids = PUBLIC_IDS
+		else:
+			self.public_ids = PublicIds(authority_id)
 
-	return quakeml
+	def addEvent(self, eventParameters, nordic):
+		return addEvent(eventParameters, nordic, self.long_quakeML, self.public_ids, self.network_code)
 
-def nordic2QuakeML(usr_path, filename):
-	print (usr_path)
-	try:
-		fnordic = open(usr_path + "/" + filename)
-	except:
-		logging.error("File {0} does not exists.".format(filename))
-		return False
+	#Returns the cache of the events converted with the settings of this converter
+	def createCache(self, cache_path, whole_document=False):
+		return createQuakeMlCache(cache_path, self.schema_path, self.long_quakeML, whole_document, self.authority_id, self.network_code)
 
-	nordic_string = nordicString.getNordicString(nordicRead.readNordicFile(fnordic)[0])
-	fnordic.close()
-	
-	if not nordicValidation.validateNordic(nordic_string):
-		logging.error("Problem with validation. Fix the problems and try again!")
-		return False
+	#Builds and validates one event and returns it serialized, either as an event element for QuakeMlWriter or as a whole QuakeML document. Returns None if the event did not go through the validation
+	def convertEvent(self, nordicEvent, whole_document=False, errors=None):
+		utf8_parser = etree.XMLParser(encoding='utf-8')
+		quakeml = etree.fromstring(QUAKEML_ROOT_STRING.encode('utf-8'), utf8_parser)
+		eventParameters = etree.SubElement(quakeml, BED_NAMESPACE + "eventParameters")
+		eventParameters.attrib["publicID"] = self.public_ids.event_parameters
 
-	nordic = nordicHandler.createNordicEvent(nordic_string)
+		event = self.addEvent(eventParameters, nordicEvent)
 
-	if nordic == None:
-		return False
+		if not validateQuakeMlFile(quakeml, self.xmlschema, errors):
+			return None
 
-	filename = "{:d}{:03d}{:02d}{:02d}{:02d}".format(nordic.headers[1][0].date.year, nordic.headers[1][0].date.timetuple().tm_yday, nordic.headers[1][0].hour, nordic.headers[1][0].minute, int(nordic.headers[1][0].second)) + ".xml"
+		if whole_document:
+			return etree.tostring(quakeml, pretty_print=True)
 
-	quakeMLString = etree.tostring(nordicEventToQuakeMl(nordic, True), pretty_print=True)	
+		return etree.tostring(event, pretty_print=True)
+
+	#Converts the lines of one event like convertNordicLines. A cache must have been created for the same settings as the converter. An exception from building the event is reported as an error of the event so that one event cannot stop the conversion of the others
+	def convertNordicLines(self, nordic_lines, whole_document=False, errors=None, cache=None):
+		if cache is not None:
+			key = cache.getKey(nordic_lines)
+			cached = cache.get(key)
+			if cached is not None:
+				return (cached[0], cached[1], errors)
+
+		try:
+			nordic = nordicCompiledValidation.validateAndCreateNordicEvent(nordic_lines, errors)
+
+			if nordic is None:
+				return (None, None, errors)
+
+			fragment = self.convertEvent(nordic, whole_document, errors)
+
+			if fragment is None:
+				return (None, None, errors)
+
+			filename = getQuakeMlFilename(nordic)
+		except Exception as e:
+			validationTools.reportError(errors, 0, "conversion", validationTools.CONVERSION_MSG, (type(e).__name__, e), nordic_lines[0] if nordic_lines else None)
+			return (None, None, errors)
+
+		if cache is not None:
+			cache.put(key, filename, fragment)
+
+		return (filename, fragment, errors)
+
+	#Returns a QuakeMlWriter that builds the events with this converter
+	def createWriter(self, f):
+		return QuakeMlWriter(f, self.long_quakeML, self.xmlschema, self)
+
+#Builds and validates one event with the default settings, see QuakeMlConverter.convertEvent
+def nordicEventToQuakeMlFragment(nordicEvent, long_quakeML, xmlschema=None, whole_document=False, errors=None):
+	return QuakeMlConverter(long_quakeML, xmlschema).convertEvent(nordicEvent, whole_document, errors)
+
+def getQuakeMlFilename(nordic):
+	main_header = nordic.headers[1][0]
+	return "{:d}{:03d}{:02d}{:02d}{:02d}".format(main_header.date.year, main_header.date.timetuple().tm_yday, main_header.hour, main_header.minute, int(main_header.second)) + ".xml"
+
+def writeQuakeMlFile(usr_path, filename, quakeml):
+	quakeMLString = etree.tostring(quakeml, pretty_print=True)	
 
-	print(filename + " has been created!")
-	
 	f = open(usr_path + "/" + filename, 'wb')
 	
 	f.write(quakeMLString)
 
 	f.close()
 
+	print(filename + " has been created!")
+
+#Generator that reads, validates and creates the events of the nordic file one at a time. Yields None for an event that is not valid
+def createNordicEvents(fnordic):
+	for nordic_lines in nordicRead.readNordicEvents(fnordic):
+		yield nordicCompiledValidation.validateAndCreateNordicEvent(nordic_lines)
+
+#Returns the cache of the converted events in the cache path. The entries depend on the converter version, the schema files, the authority and the network code of the publicIDs and the conversion settings
+def createQuakeMlCache(cache_path, schema_path, long_quakeML, whole_document, authority_id=AUTHORITY_ID, network_code=NETWORK_CODE):
+	schema_hash = ",".join(quakeMlCache.getFileHash(schema_file) for schema_file in getSchemaFiles(schema_path))
+	version = "{0}:{1}:{2}:{3}:{4}:{5}".format(CONVERTER_VERSION, schema_hash, authority_id, network_code, long_quakeML, whole_document)
+	return quakeMlCache.QuakeMlCache(cache_path, version)
+
+#Converts the lines of one event. Returns a tuple of the QuakeML filename, the serialized QuakeML and the errors list. The QuakeML is None if the event is not valid. The errors are logged or collected to the errors list if one is given. With a cache the events converted before are not parsed, validated or built again. Creates a QuakeMlConverter for the call, use QuakeMlConverter.convertNordicLines to convert many events
+def convertNordicLines(nordic_lines, long_quakeML, xmlschema, whole_document, errors=None, cache=None):
+	return QuakeMlConverter(long_quakeML, xmlschema).convertNordicLines(nordic_lines, whole_document, errors, cache)
+
+#Generator that reads the events of the nordic file with their reading errors. When the errors are not collected they are logged, the errors are None for the valid events and the reading stops after the first event with errors
+def readNordicEventsAndErrors(fnordic, collect_errors):
+	for nordic_lines, errors in nordicRead.readNordicEventsWithErrors(fnordic):
+		if collect_errors:
+			yield nordic_lines, errors
+		elif errors:
+			for error in errors:
+				logging.error("%s", error)
+			yield nordic_lines, errors
+			return
+		else:
+			yield nordic_lines, None
+
+#Generator that converts the events of the nordic file one at a time. Yields the lines of each event with the result of convertNordicLines. With collect_errors the errors of every event are collected instead of logged. All events are converted with the given converter or with one converter created for the settings
+def convertNordicEvents(fnordic, long_quakeML, xmlschema, whole_document, collect_errors=False, cache=None, converter=None):
+	if converter is None:
+		converter = QuakeMlConverter(long_quakeML, xmlschema)
+
+	for nordic_lines, errors in readNordicEventsAndErrors(fnordic, collect_errors):
+		if errors:
+			yield nordic_lines, (None, None, errors)
+		else:
+			yield nordic_lines, converter.convertNordicLines(nordic_lines, whole_document, errors, cache)
+
+#Handles an event that could not be converted. Without a report the conversion is stopped and False returned, with a report the event is recorded and skipped
+def skipInvalidEvent(event_number, nordic_lines, errors, report):
+	if report is None:
+		logging.error("Problem with validation of event {0}. Fix the problems and try again!".format(event_number + 1))
+		return False
+
+	report.addInvalidEvent(event_number, nordic_lines, errors)
+
+	return True
+
+#Write every converted event into its own file as soon as it has been converted
+def writeQuakeMlFiles(usr_path, results, report=None):
+	for event_number, (nordic_lines, result) in enumerate(results):
+		if result[1] is None:
+			if skipInvalidEvent(event_number, nordic_lines, result[2], report):
+				continue
+			results.close()
+			return False
+
+		f = open(usr_path + "/" + result[0], 'wb')
+		f.write(result[1])
+		f.close()
+
+		if report is not None:
+			report.addConvertedEvent()
+
+		print(result[0] + " has been created!")
+
 	return True
+
+#Write the converted events into one QuakeML document while they are converted
+def writeQuakeMlDocument(usr_path, qml_filename, results, xmlschema, report=None):
+	first_filename = None
+	success = True
+
+	f = open(usr_path + "/" + qml_filename, 'wb')
+
+	with QuakeMlWriter(f, True, xmlschema) as writer:
+		for event_number, (nordic_lines, result) in enumerate(results):
+			if result[1] is None:
+				if skipInvalidEvent(event_number, nordic_lines, result[2], report):
+					continue
+				results.close()
+				success = False
+				break
+
+			if first_filename is None:
+				first_filename = result[0]
+
+			writer.writeEventFragment(result[1])
+
+			if report is not None:
+				report.addConvertedEvent()
+
+	f.close()
+
+	if success and writer.event_count == 0:
+		logging.error("No valid events found.")
+		success = False
+
+	if not success:
+		os.remove(usr_path + "/" + qml_filename)
+		return False
+
+	#A document with only one event is named by the event like the separate files
+	if writer.event_count == 1:
+		os.rename(usr_path + "/" + qml_filename, usr_path + "/" + first_filename)
+		qml_filename = first_filename
+
+	print(qml_filename + " has been created!")
+
+	return True
+
+#Print the summary of a bulk conversion and write the full error report if a report file is given
+def finishReport(usr_path, report, report_filename):
+	print(report.getSummary())
+
+	if report_filename is not None:
+		f = open(os.path.join(usr_path, report_filename), 'w')
+		report.writeReport(f)
+		f.close()
+
+#Remove the old entries from the cache when a maximum size in bytes or a maximum age in seconds is given
+def evictQuakeMlCache(cache, cache_max_size, cache_max_age):
+	if cache_max_size is None and cache_max_age is None:
+		return
+
+	removed = cache.evict(cache_max_size, cache_max_age)
+
+	if removed > 0:
+		print("Removed {0} old events from the cache".format(removed))
+
+#Convert the nordic file into QuakeML. In the bulk mode invalid events are skipped and reported instead of stopping the conversion. With a cache path the QuakeML of the events that have not changed since the previous conversion is taken from the cache
+def nordic2QuakeML(usr_path, filename, separate_files=False, schema_path=QUAKEML_SCHEMA_PATH, bulk=False, quarantine_filename=None, report_filename=None, cache_path=None, cache_max_size=None, cache_max_age=None):
+	print (usr_path)
+	try:
+		fnordic = open(usr_path + "/" + filename, encoding=nordicRead.NORDIC_ENCODING)
+	except:
+		logging.error("File {0} does not exists.".format(filename))
+		return False
+
+	xmlschema = getQuakeMlSchema(schema_path)
+	converter = QuakeMlConverter(True, xmlschema, schema_path=schema_path)
+
+	cache = None
+	if cache_path is not None:
+		cache = converter.createCache(cache_path, separate_files)
+
+	results = convertNordicEvents(fnordic, True, xmlschema, separate_files, bulk, cache, converter)
+
+	report = None
+	quarantine_file = None
+	if bulk:
+		if quarantine_filename is not None:
+			quarantine_file = open(os.path.join(usr_path, quarantine_filename), 'w', encoding=nordicRead.NORDIC_ENCODING)
+		report = conversionReport.ConversionReport(quarantine_file)
+
+	if separate_files:
+		success = writeQuakeMlFiles(usr_path, results, report)
+	else:
+		success = writeQuakeMlDocument(usr_path, os.path.splitext(os.path.basename(filename))[0] + ".xml", results, xmlschema, report)
+
+	fnordic.close()
+
+	if bulk:
+		if quarantine_file is not None:
+			quarantine_file.close()
+		finishReport(usr_path, report, report_filename)
+
+	if cache is not None:
+		evictQuakeMlCache(cache, cache_max_size, cache_max_age)
+
+	return success
@@ -0,0 +1,126 @@
+import logging
+
+try:
+	import numpy
+except ImportError:
+	numpy = None
+
+from nor2qml.core import nordicColumns
+
+#Array types and the values that fill the masked places for each column type
+COLUMN_DTYPES = {"integer": "int64", "float": "float64", "date": "datetime64[D]"}
+COLUMN_FILL_VALUES = {"integer": 0, "float": float("nan"), "string": "", "date": None}
+
+def checkNumpy():
+	if numpy is None:
+		raise ImportError("The columnar phase data needs numpy. Install it with pip install numpy")
+
+#Column oriented storage of nordic lines of one type. Every column is a numpy masked array where the missing values are masked. The invalid arrays of the columns tell the values that are masked because the column was not blank but could not be read
+class ColumnarData:
+	def __init__(self, layout, columns, event_numbers, invalid):
+		self.layout = layout
+		self.columns = columns
+		self.event_numbers = event_numbers
+		self.invalid = invalid
+
+	def __getitem__(self, name):
+		return self.columns[name]
+
+	def __len__(self):
+		return len(self.event_numbers)
+
+	#Returns the rows where the boolean array is true
+	def select(self, selection):
+		selection = numpy.ma.filled(selection, False)
+		columns = dict((name, column[selection]) for name, column in self.columns.items())
+		invalid = dict((name, column[selection]) for name, column in self.invalid.items())
+		return ColumnarData(self.layout, columns, self.event_numbers[selection], invalid)
+
+	#Returns the number of values of each column that could not be read
+	def countInvalid(self):
+		return dict((name, int(column.sum())) for name, column in self.invalid.items())
+
+#Create the columns from the rows of values in the order of the layout and the rows of the raw columns of the lines. A value that is None is masked and, when its raw column is not blank, marked as invalid
+def createColumns(layout, rows, raw_rows, event_numbers):
+	columns = {}
+	invalid = {}
+
+	for i, (name, start, end, column_type) in enumerate(layout.columns):
+		column = [row[i] for row in rows]
+		mask = numpy.fromiter((value is None for value in column), dtype=bool, count=len(column))
+
+		if raw_rows is None or column_type == "string":
+			invalid[name] = numpy.zeros(len(column), dtype=bool)
+		else:
+			invalid[name] = numpy.fromiter((value is None and not raw[i].isspace() and raw[i] != "" for value, raw in zip(column, raw_rows)), dtype=bool, count=len(column))
+
+		fill_value = COLUMN_FILL_VALUES[column_type]
+		column = [fill_value if value is None else value for value in column]
+
+		if column_type == "string":
+			dtype = "U{0}".format(end - start)
+		else:
+			dtype = COLUMN_DTYPES[column_type]
+
+		columns[name] = numpy.ma.masked_array(numpy.array(column, dtype=dtype), mask=mask)
+
+	return ColumnarData(layout, columns, numpy.array(event_numbers, dtype="int64"), invalid)
+
+#Create the columns of the lines straight from the column layout of the lines
+def createColumnarData(layout, lines, event_numbers):
+	checkNumpy()
+
+	raw_rows = [layout.slice_columns(line) for line in lines]
+	converters = layout.value_converters
+	rows = [[converter(column) for converter, column in zip(converters, raw)] for raw in raw_rows]
+
+	return createColumns(layout, rows, raw_rows, event_numbers)
+
+#Create the columns from the attributes of the records of the layout, like the NordicPhaseData of a NordicEvent. The records are validated so none of their values are invalid
+def createColumnarDataFromRecords(layout, records, event_numbers):
+	checkNumpy()
+
+	names = layout.names
+	rows = [[getattr(record, name) for name in names] for record in records]
+
+	return createColumns(layout, rows, None, event_numbers)
+
+#Columnar phase data of one event from the lines of the event
+def createPhaseDataColumns(nordic_lines):
+	data_lines = nordicColumns.splitNordicLines(nordic_lines)[1]
+	return createColumnarData(nordicColumns.PHASE_DATA_LAYOUT, data_lines, [0] * len(data_lines))
+
+#Columnar main headers and phase data of a whole catalog. The event_numbers array of both tells the index of the event the row belongs to
+class NordicCatalogColumns:
+	def __init__(self, main_headers, phase_data):
+		self.main_headers = main_headers
+		self.phase_data = phase_data
+
+def createCatalogColumns(nordic_events):
+	main_lines = []
+	main_event_numbers = []
+	data_lines = []
+	data_event_numbers = []
+
+	for event_number, nordic_lines in enumerate(nordic_events):
+		header_lines, event_data_lines = nordicColumns.splitNordicLines(nordic_lines)
+
+		for line in header_lines:
+			if line[79] == "1":
+				main_lines.append(line)
+				main_event_numbers.append(event_number)
+
+		data_lines.extend(event_data_lines)
+		data_event_numbers.extend([event_number] * len(event_data_lines))
+
+	logging.info("Creating columns for {0} main headers and {1} phase lines".format(len(main_lines), len(data_lines)))
+
+	catalog_columns = NordicCatalogColumns(createColumnarData(nordicColumns.MAIN_HEADER_LAYOUT, main_lines, main_event_numbers),
+											createColumnarData(nordicColumns.PHASE_DATA_LAYOUT, data_lines, data_event_numbers))
+
+	for columnar_data in (catalog_columns.main_headers, catalog_columns.phase_data):
+		for name, count in columnar_data.countInvalid().items():
+			if count:
+				logging.warning("{0} values of {1} could not be read and are masked".format(count, name))
+
+	return catalog_columns
@@ -0,0 +1,178 @@
+import operator
+from datetime import date
+
+#Column layouts of the nordic lines. Each column is given as (attribute, start, end, type) where start and end are the python string indices of the column
+
+PHASE_DATA_COLUMNS = (
+	("station_code", 1, 5, "string"),
+	("sp_instrument_type", 6, 7, "string"),
+	("sp_component", 7, 8, "string"),
+	("quality_indicator", 9, 10, "string"),
+	("phase_type", 10, 14, "string"),
+	("weight", 14, 15, "integer"),
+	("first_motion", 16, 17, "string"),
+	("time_info", 17, 18, "string"),
+	("hour", 18, 20, "integer"),
+	("minute", 20, 22, "integer"),
+	("second", 23, 28, "float"),
+	("signal_duration", 29, 33, "integer"),
+	("max_amplitude", 34, 40, "float"),
+	("max_amplitude_period", 41, 45, "float"),
+	("back_azimuth", 46, 52, "float"),
+	("apparent_velocity", 52, 56, "float"),
+	("signal_to_noise", 56, 60, "float"),
+	("azimuth_residual", 60, 63, "integer"),
+	("travel_time_residual", 63, 68, "float"),
+	("location_weight", 68, 70, "integer"),
+	("epicenter_distance", 70, 75, "integer"),
+	("epicenter_to_station_azimuth", 76, 79, "integer"),
+)
+
+MAIN_HEADER_COLUMNS = (
+	("date", 1, 10, "date"),
+	("hour", 11, 13, "integer"),
+	("minute", 13, 15, "integer"),
+	("second", 16, 20, "float"),
+	("location_model", 20, 21, "string"),
+	("distance_indicator", 21, 22, "string"),
+	("event_desc_id", 22, 23, "string"),
+	("epicenter_latitude", 23, 30, "float"),
+	("epicenter_longitude", 30, 38, "float"),
+	("depth", 38, 43, "float"),
+	("depth_control", 43, 44, "string"),
+	("locating_indicator", 44, 45, "string"),
+	("epicenter_reporting_agency", 45, 48, "string"),
+	("stations_used", 48, 51, "integer"),
+	("rms_time_residuals", 51, 55, "float"),
+	("magnitude_1", 56, 59, "float"),
+	("type_of_magnitude_1", 59, 60, "string"),
+	("magnitude_reporting_agency_1", 60, 63, "string"),
+	("magnitude_2", 64, 67, "float"),
+	("type_of_magnitude_2", 67, 68, "string"),
+	("magnitude_reporting_agency_2", 68, 71, "string"),
+	("magnitude_3", 72, 75, "float"),
+	("type_of_magnitude_3", 75, 76, "string"),
+	("magnitude_reporting_agency_3", 76, 79, "string"),
+)
+
+MACROSEISMIC_HEADER_COLUMNS = (
+	("description", 5, 20, "string"),
+	("diastrophism_code", 22, 23, "string"),
+	("tsunami_code", 23, 24, "string"),
+	("seiche_code", 24, 25, "string"),
+	("cultural_effects", 25, 26, "string"),
+	("unusual_effects", 26, 27, "string"),
+	("maximum_observed_intensity", 27, 29, "integer"),
+	("maximum_intensity_qualifier", 29, 30, "string"),
+	("intensity_scale", 30, 32, "string"),
+	("macroseismic_latitude", 33, 39, "float"),
+	("macroseismic_longitude", 40, 47, "float"),
+	("macroseismic_magnitude", 48, 51, "float"),
+	("type_of_magnitude", 52, 53, "string"),
+	("logarithm_of_radius", 52, 56, "float"),
+	("logarithm_of_area_1", 56, 61, "float"),
+	("bordering_intensity_1", 61, 63, "integer"),
+	("logarithm_of_area_2", 63, 68, "float"),
+	("bordering_intensity_2", 68, 70, "integer"),
+	("quality_rank", 72, 73, "string"),
+	("reporting_agency", 72, 75, "string"),
+)
+
+COMMENT_HEADER_COLUMNS = (
+	("h_comment", 1, 79, "string"),
+)
+
+ERROR_HEADER_COLUMNS = (
+	("gap", 5, 8, "integer"),
+	("second_error", 16, 20, "float"),
+	("epicenter_latitude_error", 24, 30, "float"),
+	("epicenter_longitude_error", 31, 38, "float"),
+	("depth_error", 40, 43, "float"),
+	("magnitude_error", 56, 59, "float"),
+)
+
+WAVEFORM_HEADER_COLUMNS = (
+	("waveform_info", 1, 79, "string"),
+)
+
+#Functions for converting a column into its value. Empty columns are converted to None
+def toString(column):
+	column = column.strip()
+	if column == "":
+		return None
+	return column
+
+def toInteger(column):
+	if column == "" or column.isspace():
+		return None
+	try:
+		return int(column)
+	except ValueError:
+		return None
+
+def toFloat(column):
+	if column == "" or column.isspace():
+		return None
+	try:
+		return float(column)
+	except ValueError:
+		return None
+
+def toDate(column):
+	try:
+		return date(year=int(column[0:4]), month=int(column[5:7]), day=int(column[7:9]))
+	except ValueError:
+		return None
+
+#Date column in the YYYY-MM-DD form that is used by the validation
+def toDateString(column):
+	return column[0:4] + "-" + column[5:7] + "-" + column[7:9]
+
+VALUE_CONVERTERS = {"string": toString, "integer": toInteger, "float": toFloat, "date": toDate}
+STRING_CONVERTERS = {"string": str.strip, "integer": str.strip, "float": str.strip, "date": toDateString}
+
+#Precompiled reader for one column layout. All columns of a line are sliced with one itemgetter call
+class ColumnLayout:
+	def __init__(self, columns):
+		self.columns = columns
+		self.names = tuple(column[0] for column in columns)
+		self.value_converters = tuple(VALUE_CONVERTERS[column[3]] for column in columns)
+		self.string_converters = tuple(STRING_CONVERTERS[column[3]] for column in columns)
+
+		slices = [slice(column[1], column[2]) for column in columns]
+		if len(slices) == 1:
+			self.slice_columns = lambda line: (line[slices[0]],)
+		else:
+			self.slice_columns = operator.itemgetter(*slices)
+
+	#Returns the stripped strings of the columns of the line
+	def strings(self, line):
+		return [converter(column) for converter, column in zip(self.string_converters, self.slice_columns(line))]
+
+	#Returns the typed values of the columns of the line. Each column is sliced and converted only once
+	def values(self, line):
+		return [converter(column) for converter, column in zip(self.value_converters, self.slice_columns(line))]
+
+PHASE_DATA_LAYOUT = ColumnLayout(PHASE_DATA_COLUMNS)
+MAIN_HEADER_LAYOUT = ColumnLayout(MAIN_HEADER_COLUMNS)
+MACROSEISMIC_HEADER_LAYOUT = ColumnLayout(MACROSEISMIC_HEADER_COLUMNS)
+COMMENT_HEADER_LAYOUT = ColumnLayout(COMMENT_HEADER_COLUMNS)
+ERROR_HEADER_LAYOUT = ColumnLayout(ERROR_HEADER_COLUMNS)
+WAVEFORM_HEADER_LAYOUT = ColumnLayout(WAVEFORM_HEADER_COLUMNS)
+
+#Layouts of the header lines by the line type in column 80
+HEADER_LAYOUTS = {
+	"1": MAIN_HEADER_LAYOUT,
+	"2": MACROSEISMIC_HEADER_LAYOUT,
+	"3": COMMENT_HEADER_LAYOUT,
+	"5": ERROR_HEADER_LAYOUT,
+	"6": WAVEFORM_HEADER_LAYOUT,
+}
+
+#Split the lines of one event into the header lines and the phase data lines
+def splitNordicLines(nordic):
+	for i in range(1, len(nordic)):
+		if nordic[i][79] == " ":
+			return nordic[:i], nordic[i:]
+
+	return nordic, []
@@ -0,0 +1,245 @@
+import collections
+import concurrent.futures
+import hashlib
+import io
+import logging
+import os
+
+import psycopg2
+import psycopg2.extras
+import psycopg2.pool
+
+from nor2qml.core import conversionReport, nordic2quakeml, nordicColumns, nordicRead
+from nor2qml.validation import nordicCompiledValidation
+
+#Number of events written with one COPY per table and the number of batches that can be waiting per connection
+BATCH_EVENTS = 5000
+BATCHES_PER_CONNECTION = 2
+
+EVENT_TABLE = "nordic_event"
+PHASE_DATA_TABLE = "nordic_phase_data"
+
+#Tables of the headers by the header type of NordicEvent.headers and their column layouts
+HEADER_TABLES = (
+	(1, "nordic_main_header", nordicColumns.MAIN_HEADER_LAYOUT),
+	(2, "nordic_macroseismic_header", nordicColumns.MACROSEISMIC_HEADER_LAYOUT),
+	(3, "nordic_comment_header", nordicColumns.COMMENT_HEADER_LAYOUT),
+	(5, "nordic_error_header", nordicColumns.ERROR_HEADER_LAYOUT),
+	(6, "nordic_waveform_header", nordicColumns.WAVEFORM_HEADER_LAYOUT),
+)
+
+POSTGRESQL_TYPES = {"string": "text", "integer": "integer", "float": "double precision", "date": "date"}
+
+#Every header and phase data row has the id of its event and its position among the lines of the same type in the event
+ROW_KEY_COLUMNS = ("event_id", "line_number")
+
+#SQL that creates the tables of the events. The columns of the lines are taken from the column layouts. An event is identified by the path of its nordic file and the hash of its lines so that loading the same file again does not duplicate the events. The columns are added to an event table of an older version
+def getCreateTablesSql():
+	statements = ["CREATE TABLE IF NOT EXISTS {0} (id bigserial PRIMARY KEY, source_path text, hash text)".format(EVENT_TABLE)]
+	statements.append("ALTER TABLE {0} ADD COLUMN IF NOT EXISTS source_path text, ADD COLUMN IF NOT EXISTS hash text".format(EVENT_TABLE))
+	statements.append("CREATE UNIQUE INDEX IF NOT EXISTS {0}_source ON {0} (source_path, hash)".format(EVENT_TABLE))
+
+	for table, layout in [(table, layout) for header_type, table, layout in HEADER_TABLES] + [(PHASE_DATA_TABLE, nordicColumns.PHASE_DATA_LAYOUT)]:
+		columns = ["event_id bigint NOT NULL", "line_number integer NOT NULL"]
+		columns += ['"{0}" {1}'.format(column[0], POSTGRESQL_TYPES[column[3]]) for column in layout.columns]
+		statements.append("CREATE TABLE IF NOT EXISTS {0} ({1})".format(table, ", ".join(columns)))
+		statements.append("CREATE INDEX IF NOT EXISTS {0}_event_id ON {0} (event_id)".format(table))
+
+	return ";\n".join(statements) + ";"
+
+#Returns the hash of the lines of the event
+def getEventHash(nordic_lines):
+	sha = hashlib.sha1()
+
+	for line in nordic_lines:
+		sha.update(line.encode('utf-8'))
+
+	return sha.hexdigest()
+
+#Returns the value in the text format of COPY
+def toCopyValue(value):
+	if value is None:
+		return "\\N"
+	if isinstance(value, str):
+		return value.replace("\\", "\\\\").replace("\t", "\\t").replace("\n", "\\n").replace("\r", "\\r")
+	if isinstance(value, float):
+		return repr(value)
+	return str(value)
+
+#Returns the values of the attributes of the record in the order of the layout
+def getRecordValues(record, layout):
+	return [getattr(record, name) for name in layout.names]
+
+def writeCopyRow(buffer, values):
+	buffer.write("\t".join([toCopyValue(value) for value in values]))
+	buffer.write("\n")
+
+#Returns the COPY data of the line tables for the events. The event ids are given in the same order as the events
+def createCopyData(nordic_events, event_ids):
+	buffers = collections.OrderedDict()
+	for header_type, table, layout in HEADER_TABLES:
+		buffers[table] = io.StringIO()
+	buffers[PHASE_DATA_TABLE] = io.StringIO()
+
+	for nordic_event, event_id in zip(nordic_events, event_ids):
+		for header_type, table, layout in HEADER_TABLES:
+			for line_number, header in enumerate(nordic_event.headers[header_type]):
+				writeCopyRow(buffers[table], [event_id, line_number] + getRecordValues(header, layout))
+
+		for line_number, phase_data in enumerate(nordic_event.phase_data):
+			writeCopyRow(buffers[PHASE_DATA_TABLE], [event_id, line_number] + getRecordValues(phase_data, nordicColumns.PHASE_DATA_LAYOUT))
+
+	return buffers
+
+#Returns the columns of the table in the order of the COPY data
+def getCopyColumns(table):
+	if table == PHASE_DATA_TABLE:
+		return ROW_KEY_COLUMNS + nordicColumns.PHASE_DATA_LAYOUT.names
+
+	for header_type, header_table, layout in HEADER_TABLES:
+		if header_table == table:
+			return ROW_KEY_COLUMNS + layout.names
+
+#Loads NordicEvent objects into PostgreSQL with COPY FROM STDIN. The events are written in batches of BATCH_EVENTS, each batch in its own transaction on a connection of the pool, and several batches are written at the same time. The events of the source path that are already in the database are skipped
+class NordicDatabaseLoader:
+	def __init__(self, dsn, connections=4, batch_events=BATCH_EVENTS):
+		self.pool = psycopg2.pool.ThreadedConnectionPool(1, connections, dsn)
+		self.connections = connections
+		self.batch_events = batch_events
+		self.event_count = 0
+		self.phase_data_count = 0
+		self.skipped_count = 0
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, exc_type, exc_value, traceback):
+		self.close()
+
+	def close(self):
+		self.pool.closeall()
+
+	def createTables(self):
+		connection = self.pool.getconn()
+		try:
+			with connection:
+				with connection.cursor() as cursor:
+					cursor.execute(getCreateTablesSql())
+		finally:
+			self.pool.putconn(connection)
+
+	#Write one batch of (event hash, NordicEvent) pairs of the source path. The events are inserted into the event table first and only the lines of the events that were not in the database yet are copied in the same transaction
+	def loadBatch(self, source_path, batch):
+		connection = self.pool.getconn()
+		try:
+			with connection:
+				with connection.cursor() as cursor:
+					rows = psycopg2.extras.execute_values(cursor, "INSERT INTO {0} (source_path, hash) VALUES %s ON CONFLICT (source_path, hash) DO NOTHING RETURNING id, hash".format(EVENT_TABLE),
+														[(source_path, event_hash) for event_hash, nordic_event in batch], page_size=len(batch), fetch=True)
+					inserted_ids = dict((event_hash, event_id) for event_id, event_hash in rows)
+
+					nordic_events = []
+					event_ids = []
+					for event_hash, nordic_event in batch:
+						if event_hash in inserted_ids:
+							nordic_events.append(nordic_event)
+							event_ids.append(inserted_ids.pop(event_hash))
+
+					for table, buffer in createCopyData(nordic_events, event_ids).items():
+						if buffer.tell() == 0:
+							continue
+						buffer.seek(0)
+						columns = ", ".join('"{0}"'.format(column) for column in getCopyColumns(table))
+						cursor.copy_expert("COPY {0} ({1}) FROM STDIN".format(table, columns), buffer)
+		finally:
+			self.pool.putconn(connection)
+
+		return len(nordic_events), sum(len(nordic_event.phase_data) for nordic_event in nordic_events), len(batch) - len(nordic_events)
+
+	#Load the (event hash, NordicEvent) pairs of the iterable that were read from the source path. Returns the number of loaded events
+	def loadNordicEvents(self, source_path, nordic_events):
+		pending = collections.deque()
+		executor = concurrent.futures.ThreadPoolExecutor(max_workers=self.connections)
+
+		try:
+			batch = []
+			for nordic_event in nordic_events:
+				batch.append(nordic_event)
+
+				if len(batch) == self.batch_events:
+					pending.append(executor.submit(self.loadBatch, source_path, batch))
+					batch = []
+
+					#Keep the amount of events in memory bounded
+					if len(pending) >= self.connections * BATCHES_PER_CONNECTION:
+						self.addLoadedCounts(pending.popleft().result())
+
+			if batch:
+				pending.append(executor.submit(self.loadBatch, source_path, batch))
+
+			while pending:
+				self.addLoadedCounts(pending.popleft().result())
+		finally:
+			executor.shutdown(wait=True)
+
+		return self.event_count
+
+	def addLoadedCounts(self, counts):
+		self.event_count += counts[0]
+		self.phase_data_count += counts[1]
+		self.skipped_count += counts[2]
+
+#Generator that reads, validates and creates the events of the nordic file and yields them with the hash of their lines. In the bulk mode invalid events are recorded to the report and skipped, otherwise the reading stops at the first invalid event and only the events before it are loaded
+def createValidNordicEvents(fnordic, report=None):
+	for event_number, (nordic_lines, errors) in enumerate(nordic2quakeml.readNordicEventsAndErrors(fnordic, report is not None)):
+		nordic = None
+		if not errors:
+			nordic = nordicCompiledValidation.validateAndCreateNordicEvent(nordic_lines, errors)
+
+		if nordic is None:
+			if nordic2quakeml.skipInvalidEvent(event_number, nordic_lines, errors, report):
+				continue
+			return
+
+		if report is not None:
+			report.addConvertedEvent()
+
+		yield getEventHash(nordic_lines), nordic
+
+#Load the events of the nordic file into the PostgreSQL database of the dsn. The tables are created if they don't exist. The events of the file that are already in the database are not loaded again, so the file can be loaded again after it has changed or after a failed load.
+#Without the bulk mode the loading stops at the first invalid event but the events before it are loaded and stay in the database. Each batch is committed on its own, so a failing batch does not roll back the batches that were already committed
+def nordic2Database(usr_path, filename, dsn, connections=4, bulk=False, quarantine_filename=None, report_filename=None):
+	source_path = os.path.abspath(os.path.join(usr_path, filename))
+
+	try:
+		fnordic = open(source_path, encoding=nordicRead.NORDIC_ENCODING)
+	except IOError:
+		logging.error("File {0} does not exists.".format(filename))
+		return False
+
+	report = None
+	quarantine_file = None
+	if bulk:
+		if quarantine_filename is not None:
+			quarantine_file = open(os.path.join(usr_path, quarantine_filename), 'w', encoding=nordicRead.NORDIC_ENCODING)
+		report = conversionReport.ConversionReport(quarantine_file)
+
+	success = True
+
+	try:
+		with NordicDatabaseLoader(dsn, connections) as loader:
+			loader.createTables()
+			loader.loadNordicEvents(source_path, createValidNordicEvents(fnordic, report))
+			print("Loaded {0} events and {1} phase data lines into the database, {2} events were already loaded".format(loader.event_count, loader.phase_data_count, loader.skipped_count))
+	except psycopg2.Error as e:
+		logging.error("Loading the events into the database failed: {0}".format(e))
+		success = False
+
+	fnordic.close()
+
+	if bulk:
+		if quarantine_file is not None:
+			quarantine_file.close()
+		nordic2quakeml.finishReport(usr_path, report, report_filename)
+
+	return success
@@ -1,11 +1,15 @@
 import logging
 import psycopg2
 
+from nor2qml.core import nordicColumnar, nordicColumns
+
 from datetime import date
 import datetime
 
 #class for the whole event 
 class NordicEvent:
+	__slots__ = ("headers", "phase_data")
+
 	def __init__(self, headers, phase_data):
 		self.headers = headers
 		self.phase_data = phase_data	
@@ -25,13 +29,23 @@ class NordicEvent:
 	def get_waveform_headers(self):
 		return self.headers[6]
 
+	#Returns the phase data as nordicColumnar.ColumnarData. Needs numpy
+	def get_phase_data_columns(self):
+		return nordicColumnar.createColumnarDataFromRecords(nordicColumns.PHASE_DATA_LAYOUT, self.phase_data, [0] * len(self.phase_data))
+
+
+#The classes use __slots__ instead of a __dict__ per instance because a catalog can hold millions of them
 
 #Parent class for the header
 class NordicHeader:
+	__slots__ = ("header_type",)
+
 	def __init__(self, header_type):
 		self.header_type = header_type
 
 class NordicPhaseData:
+	__slots__ = nordicColumns.PHASE_DATA_LAYOUT.names
+
 	def __init__(self, phase_data):
 		self.station_code = phase_data[0]
 		self.sp_instrument_type = phase_data[1]
@@ -54,9 +68,11 @@ class NordicPhaseData:
 		self.travel_time_residual = phase_data[18]
 		self.location_weight = phase_data[19]
 		self.epicenter_distance = phase_data[20] 
-		self.epicenter_to_station_azimuth = phase_data[20]
+		self.epicenter_to_station_azimuth = phase_data[21]
 
 class NordicHeaderMain(NordicHeader):
+	__slots__ = nordicColumns.MAIN_HEADER_LAYOUT.names
+
 	def __init__(self, header_data):
 		NordicHeader.__init__(self, 1)
 		self.date = header_data[0]
@@ -85,7 +101,9 @@ class NordicHeaderMain(NordicHeader):
 		self.magnitude_reporting_agency_3 = header_data[23]
 
 class NordicHeaderMacroseismic(NordicHeader):
-	def __init__(self):
+	__slots__ = nordicColumns.MACROSEISMIC_HEADER_LAYOUT.names
+
+	def __init__(self, header_data):
 		NordicHeader.__init__(self, 2)
 		self.description = header_data[0]
 		self.diastrophism_code = header_data[1]
@@ -109,11 +127,15 @@ class NordicHeaderMacroseismic(NordicHeader):
 		self.reporting_agency = header_data[19]
 
 class NordicHeaderComment(NordicHeader):
+	__slots__ = nordicColumns.COMMENT_HEADER_LAYOUT.names
+
 	def __init__(self, header_data):
 		NordicHeader.__init__(self, 3)
 		self.h_comment = header_data[0]
 
 class NordicHeaderError(NordicHeader):
+	__slots__ = nordicColumns.ERROR_HEADER_LAYOUT.names
+
 	def __init__(self, header_data):
 		NordicHeader.__init__(self, 5)
 		self.gap = header_data[0]
@@ -124,161 +146,63 @@ class NordicHeaderError(NordicHeader):
 		self.magnitude_error = header_data[5]
 
 class NordicHeaderWaveform(NordicHeader):
+	__slots__ = nordicColumns.WAVEFORM_HEADER_LAYOUT.names
+
 	def __init__(self, header_data):
 		NordicHeader.__init__(self, 6)
 		self.waveform_info = header_data[0]
 
-def addIntToData(data, int_string):
-	try:
-		int(int_string)
-		data += (int(int_string), )
-	except:
-		data += (None, )
-
-	return data
-
-def addFloatToData(data, float_string):
+def toDateFromString(date_string):
 	try:
-		float(float_string)
-		data += (float(float_string), )
-	except:
-		data += (None, )
+		return date(year=int(date_string[:4]), month=int(date_string[5:7]), day=int(date_string[8:]))
+	except ValueError:
+		return None
+
+#Converters from the attributes of the nordicString objects to the typed values
+STRING_VALUE_CONVERTERS = {
+	"string": nordicColumns.toString,
+	"integer": nordicColumns.toInteger,
+	"float": nordicColumns.toFloat,
+	"date": toDateFromString,
+}
+
+#Attribute names and their converters for each column layout
+def createConverterPipeline(layout):
+	return tuple((column[0], STRING_VALUE_CONVERTERS[column[3]]) for column in layout.columns)
+
+PHASE_DATA_PIPELINE = createConverterPipeline(nordicColumns.PHASE_DATA_LAYOUT)
+MAIN_HEADER_PIPELINE = createConverterPipeline(nordicColumns.MAIN_HEADER_LAYOUT)
+MACROSEISMIC_HEADER_PIPELINE = createConverterPipeline(nordicColumns.MACROSEISMIC_HEADER_LAYOUT)
+COMMENT_HEADER_PIPELINE = createConverterPipeline(nordicColumns.COMMENT_HEADER_LAYOUT)
+ERROR_HEADER_PIPELINE = createConverterPipeline(nordicColumns.ERROR_HEADER_LAYOUT)
+WAVEFORM_HEADER_PIPELINE = createConverterPipeline(nordicColumns.WAVEFORM_HEADER_LAYOUT)
+
+#Convert every attribute of the string object once into a preallocated record
+def createDataList(string_object, pipeline):
+	data = [None] * len(pipeline)
+
+	for i, (name, converter) in enumerate(pipeline):
+		data[i] = converter(getattr(string_object, name))
 
 	return data
 
-def addStringToData(data, string):
-	if (string.strip() == ""):
-		data += (None,)
-	else:
-		data += (string,)
-
-	return data
-	
-def addDateToData(data, date_string):
-	try:
-		date(year=int(date_string[:4].strip()), 
-					month=int(date_string[5:7].strip()), 
-					day=int(date_string[8:].strip()))
-
-		data += (date(year=int(date_string[:4].strip()), 
-					month=int(date_string[5:7].strip()), 
-					day=int(date_string[8:].strip())), )
-		
-	except:
-
-		data += (None,)
-	
-	return data
-
 def createPhaseDataList(phase_data_string):
-	phaseData = ()
-
-	phaseData = addStringToData(phaseData, phase_data_string.station_code)
-	phaseData = addStringToData(phaseData, phase_data_string.sp_instrument_type)
-	phaseData = addStringToData(phaseData, phase_data_string.sp_component)
-	phaseData = addStringToData(phaseData, phase_data_string.quality_indicator)
-	phaseData = addStringToData(phaseData, phase_data_string.phase_type)
-	phaseData = addIntToData(phaseData, phase_data_string.weight)
-	phaseData = addStringToData(phaseData, phase_data_string.first_motion)
-	phaseData = addStringToData(phaseData, phase_data_string.time_info)
-	phaseData = addIntToData(phaseData, phase_data_string.hour)
-	phaseData = addIntToData(phaseData, phase_data_string.minute)
-	phaseData = addFloatToData(phaseData, phase_data_string.second)
-	phaseData = addIntToData(phaseData, phase_data_string.signal_duration)
-	phaseData = addFloatToData(phaseData, phase_data_string.max_amplitude)
-	phaseData = addFloatToData(phaseData, phase_data_string.max_amplitude_period)
-	phaseData = addFloatToData(phaseData, phase_data_string.back_azimuth)
-	phaseData = addFloatToData(phaseData, phase_data_string.apparent_velocity)
-	phaseData = addFloatToData(phaseData, phase_data_string.signal_to_noise)
-	phaseData = addIntToData(phaseData, phase_data_string.azimuth_residual)
-	phaseData = addFloatToData(phaseData, phase_data_string.travel_time_residual)
-	phaseData = addIntToData(phaseData, phase_data_string.location_weight)
-	phaseData = addIntToData(phaseData, phase_data_string.epicenter_distance)
-	phaseData = addIntToData(phaseData, phase_data_string.epicenter_to_station_azimuth)
-
-	return phaseData
+	return createDataList(phase_data_string, PHASE_DATA_PIPELINE)
 
 def createMainHeaderList(main_header_string):
-	mainData = ()
-
-	mainData = addDateToData(mainData, main_header_string.date)
-	mainData = addIntToData(mainData, main_header_string.hour)
-	mainData = addIntToData(mainData, main_header_string.minute)
-	mainData = addFloatToData(mainData, main_header_string.second)
-	mainData = addStringToData(mainData, main_header_string.location_model)
-	mainData = addStringToData(mainData, main_header_string.distance_indicator)
-	mainData = addStringToData(mainData, main_header_string.event_desc_id)
-	mainData = addFloatToData(mainData, main_header_string.epicenter_latitude)
-	mainData = addFloatToData(mainData, main_header_string.epicenter_longitude)
-	mainData = addFloatToData(mainData, main_header_string.depth)
-	mainData = addStringToData(mainData, main_header_string.depth_control)
-	mainData = addStringToData(mainData, main_header_string.locating_indicator)
-	mainData = addStringToData(mainData, main_header_string.epicenter_reporting_agency)
-	mainData = addIntToData(mainData, main_header_string.stations_used)
-	mainData = addFloatToData(mainData, main_header_string.rms_time_residuals)
-	mainData = addFloatToData(mainData, main_header_string.magnitude_1)
-	mainData = addStringToData(mainData, main_header_string.type_of_magnitude_1)
-	mainData = addStringToData(mainData, main_header_string.magnitude_reporting_agency_1)
-	mainData = addFloatToData(mainData, main_header_string.magnitude_2)
-	mainData = addStringToData(mainData, main_header_string.type_of_magnitude_2)
-	mainData = addStringToData(mainData, main_header_string.magnitude_reporting_agency_2)
-	mainData = addFloatToData(mainData, main_header_string.magnitude_3)
-	mainData = addStringToData(mainData, main_header_string.type_of_magnitude_3)
-	mainData = addStringToData(mainData, main_header_string.magnitude_reporting_agency_3)
-
-	return mainData
+	return createDataList(main_header_string, MAIN_HEADER_PIPELINE)
 
 def createMacroseismicHeaderList(macroseismic_header_string):
-	macroData = ()
-
-	macroData = addStringToData(macroData, macroseismic_header_string.description)
-	macroData = addStringToData(macroData, macroseismic_header_string.diastrophism_code)
-	macroData = addStringToData(macroData, macroseismic_header_string.tsunami_code)
-	macroData = addStringToData(macroData, macroseismic_header_string.seiche_code)
-	macroData = addStringToData(macroData, macroseismic_header_string.cultural_effects)
-	macroData = addStringToData(macroData, macroseismic_header_string.unusual_effects)
-	macroData = addIntToData(macroData, macroseismic_header_string.maximum_observed_intensity)
-	macroData = addStringToData(macroData, macroseismic_header_string.maximum_intensity_qualifier)
-	macroData = addStringToData(macroData, macroseismic_header_string.intensity_scale)
-	macroData = addFloatToData(macroData, macroseismic_header_string.macroseismic_latitude)
-	macroData = addFloatToData(macroData, macroseismic_header_string.macroseismic_longitude)
-	macroData = addFloatToData(macroData, macroseismic_header_string.macroseismic_magnitude)
-	macroData = addStringToData(macroData, macroseismic_header_string.type_of_magnitude)
-	macroData = addFloatToData(macroData, macroseismic_header_string.logarithm_of_radius)
-	macroData = addFloatToData(macroData, macroseismic_header_string.logarithm_of_area_1)
-	macroData = addIntToData(macroData, macroseismic_header_string.bordering_intensity_1)
-	macroData = addFloatToData(macroData, macroseismic_header_string.logarithm_of_area_2)
-	macroData = addIntToData(macroData, macroseismic_header_string.bordering_intensity_2)
-	macroData = addStringToData(macroData, macroseismic_header_string.quality_rank)
-	macroData = addStringToData(macroData, macroseismic_header_string.reporting_agency)
-
-	return macroData
+	return createDataList(macroseismic_header_string, MACROSEISMIC_HEADER_PIPELINE)
 
 def createCommentHeaderList(comment_header_string):
-	commentData = () 
-
-	commentData = addStringToData(commentData, comment_header_string.h_comment)
-
-	return commentData
+	return createDataList(comment_header_string, COMMENT_HEADER_PIPELINE)
 
 def createErrorHeaderList(error_header_string):
-	errorData = ()
-
-	errorData = addIntToData(errorData, error_header_string.gap)
-	errorData = addFloatToData(errorData, error_header_string.second_error)
-	errorData = addFloatToData(errorData, error_header_string.epicenter_latitude_error)
-	errorData = addFloatToData(errorData, error_header_string.epicenter_longitude_error)
-	errorData = addFloatToData(errorData, error_header_string.depth_error)
-	errorData = addFloatToData(errorData, error_header_string.magnitude_error)
-
-	return errorData
+	return createDataList(error_header_string, ERROR_HEADER_PIPELINE)
 
 def createWaveformHeaderList(waveform_header_string):
-	waveData = ()
-
-	waveData = addStringToData(waveData, waveform_header_string.waveform_info)
-
-	return waveData
+	return createDataList(waveform_header_string, WAVEFORM_HEADER_PIPELINE)
 
 def createNordicEvent(nordic_string_event):
 	headers = {1:[], 2:[], 3:[], 4:[], 5:[], 6:[]}
@@ -302,3 +226,27 @@ def createNordicEvent(nordic_string_event):
 	nordic_event = NordicEvent(headers, phase_data)
 
 	return nordic_event
+
+#Header classes and the header type numbers by the line type in column 80
+HEADER_CLASSES = {
+	"1": (1, NordicHeaderMain),
+	"2": (2, NordicHeaderMacroseismic),
+	"3": (3, NordicHeaderComment),
+	"5": (5, NordicHeaderError),
+	"6": (6, NordicHeaderWaveform),
+}
+
+#Create the event straight from the lines of the nordic file. Every column is parsed and converted in one pass
+def createNordicEventFromLines(nordic_lines):
+	headers = {1:[], 2:[], 3:[], 4:[], 5:[], 6:[]}
+	header_lines, data_lines = nordicColumns.splitNordicLines(nordic_lines)
+
+	for line in header_lines:
+		if line[79] in HEADER_CLASSES:
+			header_type, header_class = HEADER_CLASSES[line[79]]
+			headers[header_type].append(header_class(nordicColumns.HEADER_LAYOUTS[line[79]].values(line)))
+
+	phase_values = nordicColumns.PHASE_DATA_LAYOUT.values
+	phase_data = [NordicPhaseData(phase_values(line)) for line in data_lines]
+
+	return NordicEvent(headers, phase_data)
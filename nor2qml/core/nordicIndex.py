@@ -0,0 +1,269 @@
+import calendar
+import logging
+import math
+import mmap
+import os
+import struct
+import tempfile
+
+from nor2qml.core import nordic2quakeml, nordicColumns, nordicRead
+
+INDEX_FILE_EXTENSION = ".idx"
+INDEX_MAGIC = b"NORIDX2\0"
+
+#The header of the index file has the magic, the size and the modification time of the indexed file and the number of events. Each event has a fixed size record so that the record of any event can be read without reading the others
+INDEX_HEADER = struct.Struct("<8sqqq")
+INDEX_RECORD = struct.Struct("<qqddddd")
+
+#After the records the index has the origin times with the event numbers sorted by the time and the grid cells of the epicenters with the event numbers sorted by the cell. Both sections have one fixed size entry per event so that they can be searched with bisection
+TIME_ENTRY = struct.Struct("<dq")
+CELL_ENTRY = struct.Struct("<qq")
+
+#Size of the grid cells in degrees
+CELL_SIZE = 1.0
+CELL_COLUMNS = int(360 / CELL_SIZE)
+
+NAN = float("nan")
+INF = float("inf")
+
+#Index entry of one event. The origin time is in seconds from 1970-01-01 UTC. The values that are missing from the type-1 line are nan
+class NordicIndexRecord:
+	__slots__ = ("start", "end", "origin_time", "latitude", "longitude", "depth", "magnitude")
+
+	def __init__(self, start, end, origin_time, latitude, longitude, depth, magnitude):
+		self.start = start
+		self.end = end
+		self.origin_time = origin_time
+		self.latitude = latitude
+		self.longitude = longitude
+		self.depth = depth
+		self.magnitude = magnitude
+
+def toIndexValue(value):
+	if value is None:
+		return NAN
+	return value
+
+#Returns the origin time, latitude, longitude, depth and magnitude of the type-1 line. The first given magnitude of the line is used
+def readMainHeaderValues(line):
+	columns = nordicColumns.MAIN_HEADER_LAYOUT.slice_columns(line)
+	values = dict(zip(nordicColumns.MAIN_HEADER_LAYOUT.names, columns))
+
+	origin_date = nordicColumns.toDate(values["date"])
+	hour = nordicColumns.toInteger(values["hour"])
+	minute = nordicColumns.toInteger(values["minute"])
+	second = nordicColumns.toFloat(values["second"])
+
+	if origin_date is None:
+		origin_time = NAN
+	else:
+		origin_time = float(calendar.timegm(origin_date.timetuple()))
+		origin_time += (hour or 0) * 3600 + (minute or 0) * 60 + (second or 0.0)
+
+	magnitude = None
+	for name in ("magnitude_1", "magnitude_2", "magnitude_3"):
+		magnitude = nordicColumns.toFloat(values[name])
+		if magnitude is not None:
+			break
+
+	return (origin_time,
+			toIndexValue(nordicColumns.toFloat(values["epicenter_latitude"])),
+			toIndexValue(nordicColumns.toFloat(values["epicenter_longitude"])),
+			toIndexValue(nordicColumns.toFloat(values["depth"])),
+			toIndexValue(magnitude))
+
+#Returns the grid cell of the epicenter or -1 if the epicenter is not known
+def getCell(latitude, longitude):
+	if math.isnan(latitude) or math.isnan(longitude):
+		return -1
+
+	row = min(int(math.floor((latitude + 90.0) / CELL_SIZE)), int(180 / CELL_SIZE) - 1)
+	column = int(math.floor(((longitude + 180.0) % 360.0) / CELL_SIZE)) % CELL_COLUMNS
+
+	return row * CELL_COLUMNS + column
+
+#Generator that yields the index record of every event of the memory mapped nordic file. The events are separated by blank lines like in nordicRead and the values are read from the first type-1 line of the event
+def scanNordicEvents(nordic_map):
+	start = None
+	end = None
+	values = None
+	offset = 0
+
+	while True:
+		line = nordic_map.readline()
+		if not line:
+			break
+
+		if line.strip() == b"":
+			if start is not None:
+				yield (start, end) + (values or (NAN, NAN, NAN, NAN, NAN))
+				start = None
+				values = None
+		else:
+			if start is None:
+				start = offset
+			end = offset + len(line)
+
+			if values is None and len(line) >= 81 and line[79:80] == b"1":
+				values = readMainHeaderValues(line.decode(nordicRead.NORDIC_ENCODING))
+
+		offset += len(line)
+
+	if start is not None:
+		yield (start, end) + (values or (NAN, NAN, NAN, NAN, NAN))
+
+#Returns the size and the modification time of the file that the index is valid for
+def getNordicFileStamp(nordic_path):
+	stat = os.stat(nordic_path)
+	return stat.st_size, stat.st_mtime_ns
+
+#Build the index of the nordic file and write it through a temporary file next to the index path
+def buildNordicIndex(nordic_path, index_path):
+	size, mtime = getNordicFileStamp(nordic_path)
+	records = []
+
+	if size > 0:
+		f = open(nordic_path, 'rb')
+		nordic_map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+		records = list(scanNordicEvents(nordic_map))
+		nordic_map.close()
+		f.close()
+
+	#Events without an origin time are sorted last
+	times = sorted((INF if math.isnan(record[2]) else record[2], event_number) for event_number, record in enumerate(records))
+	cells = sorted((getCell(record[3], record[4]), event_number) for event_number, record in enumerate(records))
+
+	fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(index_path)), suffix=".tmp")
+	f = os.fdopen(fd, 'wb')
+	f.write(INDEX_HEADER.pack(INDEX_MAGIC, size, mtime, len(records)))
+	f.write(b"".join(INDEX_RECORD.pack(*record) for record in records))
+	f.write(b"".join(TIME_ENTRY.pack(*entry) for entry in times))
+	f.write(b"".join(CELL_ENTRY.pack(*entry) for entry in cells))
+	f.close()
+
+	os.replace(temp_path, index_path)
+
+#Returns True if the index file exists and was built from the current version of the nordic file
+def isNordicIndexValid(nordic_path, index_path):
+	try:
+		f = open(index_path, 'rb')
+	except (IOError, OSError):
+		return False
+
+	header = f.read(INDEX_HEADER.size)
+	f.close()
+
+	if len(header) != INDEX_HEADER.size:
+		return False
+
+	magic, size, mtime, count = INDEX_HEADER.unpack(header)
+
+	return magic == INDEX_MAGIC and (size, mtime) == getNordicFileStamp(nordic_path)
+
+#Random access to the events of a nordic file. Both the nordic file and its index are memory mapped, so reading the record or the lines of one event does not read the rest of the file. The index is kept in a file next to the nordic file and rebuilt when the nordic file has changed
+class NordicIndex:
+	def __init__(self, nordic_path, index_path=None):
+		if index_path is None:
+			index_path = nordic_path + INDEX_FILE_EXTENSION
+
+		if not isNordicIndexValid(nordic_path, index_path):
+			buildNordicIndex(nordic_path, index_path)
+
+		self.nordic_path = nordic_path
+		self.index_path = index_path
+
+		self.index_file = open(index_path, 'rb')
+		self.index_map = mmap.mmap(self.index_file.fileno(), 0, access=mmap.ACCESS_READ)
+		self.count = INDEX_HEADER.unpack_from(self.index_map, 0)[3]
+		self.time_offset = INDEX_HEADER.size + self.count * INDEX_RECORD.size
+		self.cell_offset = self.time_offset + self.count * TIME_ENTRY.size
+
+		self.nordic_file = open(nordic_path, 'rb')
+		self.nordic_map = None
+		if os.fstat(self.nordic_file.fileno()).st_size > 0:
+			self.nordic_map = mmap.mmap(self.nordic_file.fileno(), 0, access=mmap.ACCESS_READ)
+
+	def __len__(self):
+		return self.count
+
+	def __getitem__(self, event_number):
+		if event_number < 0:
+			event_number += self.count
+		if event_number < 0 or event_number >= self.count:
+			raise IndexError("Event {0} is not in the index".format(event_number))
+
+		return NordicIndexRecord(*INDEX_RECORD.unpack_from(self.index_map, INDEX_HEADER.size + event_number * INDEX_RECORD.size))
+
+	#Returns the position of the first entry of the sorted section whose key is not smaller than the key, or with right the first entry whose key is larger than the key
+	def bisectSection(self, offset, entry, key, right=False):
+		low = 0
+		high = self.count
+
+		while low < high:
+			middle = (low + high) // 2
+			middle_key = entry.unpack_from(self.index_map, offset + middle * entry.size)[0]
+
+			if middle_key < key or (right and middle_key == key):
+				low = middle + 1
+			else:
+				high = middle
+
+		return low
+
+	#Returns the range of positions in the time section of the events whose origin time is between the start and the end time
+	def getTimeRange(self, start_time=-INF, end_time=INF):
+		return (self.bisectSection(self.time_offset, TIME_ENTRY, start_time),
+				self.bisectSection(self.time_offset, TIME_ENTRY, end_time, True))
+
+	#Returns the range of positions in the cell section of the events in the grid cells from the first to the last cell
+	def getCellRange(self, first_cell, last_cell):
+		return (self.bisectSection(self.cell_offset, CELL_ENTRY, first_cell),
+				self.bisectSection(self.cell_offset, CELL_ENTRY, last_cell, True))
+
+	#Returns the event numbers of the range of positions in the time section
+	def getTimeEventNumbers(self, low, high):
+		return [TIME_ENTRY.unpack_from(self.index_map, self.time_offset + position * TIME_ENTRY.size)[1] for position in range(low, high)]
+
+	#Returns the event numbers of the range of positions in the cell section
+	def getCellEventNumbers(self, low, high):
+		return [CELL_ENTRY.unpack_from(self.index_map, self.cell_offset + position * CELL_ENTRY.size)[1] for position in range(low, high)]
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, exc_type, exc_value, traceback):
+		self.close()
+
+	def close(self):
+		if self.nordic_map is not None:
+			self.nordic_map.close()
+		self.index_map.close()
+		self.nordic_file.close()
+		self.index_file.close()
+
+	#Returns the lines of the event and the reading errors of them like nordicRead.readNordicEventsWithErrors
+	def getEventLinesWithErrors(self, event_number):
+		record = self[event_number]
+		text = self.nordic_map[record.start:record.end].decode(nordicRead.NORDIC_ENCODING)
+
+		for nordic_lines, errors in nordicRead.readNordicEventsWithErrors(text.splitlines(True)):
+			return nordic_lines, errors
+
+		return [], []
+
+	#Converts the event with nordic2quakeml.convertNordicLines and returns its result
+	def convertEvent(self, event_number, long_quakeML=True, xmlschema=None, whole_document=True, errors=None):
+		if xmlschema is None:
+			xmlschema = nordic2quakeml.getQuakeMlSchema()
+
+		nordic_lines, read_errors = self.getEventLinesWithErrors(event_number)
+
+		if read_errors:
+			if errors is None:
+				for error in read_errors:
+					logging.error("%s", error)
+			else:
+				errors.extend(read_errors)
+			return (None, None, errors)
+
+		return nordic2quakeml.convertNordicLines(nordic_lines, long_quakeML, xmlschema, whole_document, errors)
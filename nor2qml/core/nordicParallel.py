@@ -0,0 +1,131 @@
+import collections
+import logging
+import multiprocessing
+import os
+
+from nor2qml.core import conversionReport, nordic2quakeml, nordicRead, nordicWatch
+
+#Number of events sent to a worker at a time and the number of batches that can be waiting per worker
+BATCH_SIZE = 32
+BATCHES_PER_WORKER = 4
+
+#Settings of the worker process. Set once by initWorker when the worker starts
+worker_settings = {}
+
+#Creates the one converter of the worker process that converts all events sent to the worker
+def initWorker(schema_path, long_quakeML, separate_files, cache_path=None):
+	converter = nordic2quakeml.QuakeMlConverter(long_quakeML, nordic2quakeml.getQuakeMlSchema(schema_path), schema_path=schema_path)
+	worker_settings["converter"] = converter
+	worker_settings["separate_files"] = separate_files
+	worker_settings["cache"] = None
+
+	if cache_path is not None:
+		worker_settings["cache"] = converter.createCache(cache_path, separate_files)
+
+#Converts the lines of one event with the settings of the worker. Events that already have reading errors are not converted
+def convertNordicLines(nordic_lines, errors):
+	if errors:
+		return (None, None, errors)
+
+	return worker_settings["converter"].convertNordicLines(nordic_lines,
+														worker_settings["separate_files"],
+														errors,
+														worker_settings["cache"])
+
+def convertNordicBatch(batch):
+	return [convertNordicLines(nordic_lines, errors) for nordic_lines, errors in batch]
+
+#Generator that yields the lines and the reading errors of every event of a nordic file or of all S-files in a directory. Hidden files, the QuakeML files and the excluded files, like the quarantine file and the report, are not read from the directory
+def readNordicPath(path, collect_errors, excluded_paths=()):
+	if os.path.isdir(path):
+		filenames = sorted(os.path.join(path, name) for name in os.listdir(path) if nordicWatch.isNordicFilename(name))
+		filenames = [filename for filename in filenames if os.path.isfile(filename) and os.path.abspath(filename) not in excluded_paths]
+	else:
+		filenames = [path]
+
+	for filename in filenames:
+		fnordic = open(filename, encoding=nordicRead.NORDIC_ENCODING)
+
+		for nordic_lines, errors in nordic2quakeml.readNordicEventsAndErrors(fnordic, collect_errors):
+			yield nordic_lines, errors
+
+		fnordic.close()
+
+def readBatches(nordic_events):
+	batch = []
+
+	for nordic_event in nordic_events:
+		batch.append(nordic_event)
+
+		if len(batch) == BATCH_SIZE:
+			yield batch
+			batch = []
+
+	if batch:
+		yield batch
+
+#Generator that converts the events on a pool of worker processes and yields the lines of each event with its result in the input order
+def convertNordicEventsInPool(nordic_events, jobs, schema_path, long_quakeML, separate_files, cache_path=None):
+	if jobs < 2:
+		initWorker(schema_path, long_quakeML, separate_files, cache_path)
+
+		for nordic_lines, errors in nordic_events:
+			yield nordic_lines, convertNordicLines(nordic_lines, errors)
+
+		return
+
+	pool = multiprocessing.Pool(jobs, initWorker, (schema_path, long_quakeML, separate_files, cache_path))
+	pending = collections.deque()
+
+	try:
+		for batch in readBatches(nordic_events):
+			pending.append((batch, pool.apply_async(convertNordicBatch, (batch,))))
+
+			#Keep the amount of events in flight bounded
+			if len(pending) >= jobs * BATCHES_PER_WORKER:
+				batch, results = pending.popleft()
+				for nordic_event, result in zip(batch, results.get()):
+					yield nordic_event[0], result
+
+		while pending:
+			batch, results = pending.popleft()
+			for nordic_event, result in zip(batch, results.get()):
+				yield nordic_event[0], result
+	finally:
+		pool.terminate()
+		pool.join()
+
+#Convert a nordic file or a directory of S-files on a pool of worker processes. In the bulk mode invalid events are skipped and reported instead of stopping the conversion. With a cache path the QuakeML of the events that have not changed since the previous conversion is taken from the cache
+def nordicCatalog2QuakeML(usr_path, path, separate_files=False, schema_path=nordic2quakeml.QUAKEML_SCHEMA_PATH, jobs=1, bulk=False, quarantine_filename=None, report_filename=None, cache_path=None, cache_max_size=None, cache_max_age=None):
+	nordic_path = os.path.join(usr_path, path)
+
+	if not os.path.exists(nordic_path):
+		logging.error("File {0} does not exists.".format(path))
+		return False
+
+	excluded_paths = [os.path.abspath(os.path.join(usr_path, filename)) for filename in (quarantine_filename, report_filename) if filename is not None]
+	results = convertNordicEventsInPool(readNordicPath(nordic_path, bulk, excluded_paths), jobs, schema_path, True, separate_files, cache_path)
+
+	report = None
+	quarantine_file = None
+	if bulk:
+		if quarantine_filename is not None:
+			quarantine_file = open(os.path.join(usr_path, quarantine_filename), 'w', encoding=nordicRead.NORDIC_ENCODING)
+		report = conversionReport.ConversionReport(quarantine_file)
+
+	if separate_files:
+		success = nordic2quakeml.writeQuakeMlFiles(usr_path, results, report)
+	else:
+		qml_filename = os.path.splitext(os.path.basename(os.path.abspath(nordic_path)))[0] + ".xml"
+		success = nordic2quakeml.writeQuakeMlDocument(usr_path, qml_filename, results, nordic2quakeml.getQuakeMlSchema(schema_path), report)
+
+	if bulk:
+		if quarantine_file is not None:
+			quarantine_file.close()
+		nordic2quakeml.finishReport(usr_path, report, report_filename)
+
+	if cache_path is not None:
+		cache = nordic2quakeml.createQuakeMlCache(cache_path, schema_path, True, separate_files)
+		nordic2quakeml.evictQuakeMlCache(cache, cache_max_size, cache_max_age)
+
+	return success
@@ -0,0 +1,240 @@
+import calendar
+import logging
+import math
+import os
+from datetime import datetime
+
+from nor2qml.core import conversionReport, nordic2quakeml, nordicIndex, nordicRead
+
+EARTH_RADIUS = nordic2quakeml.EARTH_RADIUS
+KM_PER_DEGREE = nordic2quakeml.KM_PER_DEGREE
+
+TIME_FORMATS = ("%Y-%m-%dT%H:%M:%S.%f", "%Y-%m-%dT%H:%M:%S", "%Y-%m-%d")
+
+#Returns the time string in one of the TIME_FORMATS as seconds from 1970-01-01 UTC
+def parseTime(time_string):
+	for time_format in TIME_FORMATS:
+		try:
+			parsed_time = datetime.strptime(time_string, time_format)
+		except ValueError:
+			continue
+		return calendar.timegm(parsed_time.timetuple()) + parsed_time.microsecond / 1000000.0
+
+	raise ValueError("Time {0} is not in the form YYYY-MM-DDTHH:MM:SS".format(time_string))
+
+#Great circle distance in kilometers
+def getDistance(latitude_1, longitude_1, latitude_2, longitude_2):
+	latitude_1, longitude_1, latitude_2, longitude_2 = map(math.radians, (latitude_1, longitude_1, latitude_2, longitude_2))
+	a = math.sin((latitude_2 - latitude_1) / 2) ** 2 + math.cos(latitude_1) * math.cos(latitude_2) * math.sin((longitude_2 - longitude_1) / 2) ** 2
+	return 2 * EARTH_RADIUS * math.asin(min(1.0, math.sqrt(a)))
+
+#Selection of events by the values of the type-1 line like in the FDSN event service. The times are seconds from 1970-01-01 UTC and the radius is in kilometers. Values that are None are not used. A longitude range where the minimum is larger than the maximum crosses the date line
+class NordicQuery:
+	def __init__(self, start_time=None, end_time=None, min_magnitude=None, max_magnitude=None, min_depth=None, max_depth=None,
+				min_latitude=None, max_latitude=None, min_longitude=None, max_longitude=None, latitude=None, longitude=None, max_radius=None):
+		self.start_time = start_time
+		self.end_time = end_time
+		self.min_magnitude = min_magnitude
+		self.max_magnitude = max_magnitude
+		self.min_depth = min_depth
+		self.max_depth = max_depth
+		self.min_latitude = min_latitude
+		self.max_latitude = max_latitude
+		self.min_longitude = min_longitude
+		self.max_longitude = max_longitude
+		self.latitude = latitude
+		self.longitude = longitude
+		self.max_radius = max_radius
+
+	def hasTimeRange(self):
+		return self.start_time is not None or self.end_time is not None
+
+	def hasRadius(self):
+		return self.latitude is not None and self.longitude is not None and self.max_radius is not None
+
+	def hasLongitudeRange(self):
+		return self.min_longitude is not None or self.max_longitude is not None
+
+	#Returns True if the values of the index record match the query. Missing values never match a limit on them
+	def matches(self, record):
+		if not isInRange(record.origin_time, self.start_time, self.end_time):
+			return False
+		if not isInRange(record.magnitude, self.min_magnitude, self.max_magnitude):
+			return False
+		if not isInRange(record.depth, self.min_depth, self.max_depth):
+			return False
+		if not isInRange(record.latitude, self.min_latitude, self.max_latitude):
+			return False
+
+		if self.hasLongitudeRange():
+			if math.isnan(record.longitude):
+				return False
+			min_longitude = -180.0 if self.min_longitude is None else self.min_longitude
+			max_longitude = 180.0 if self.max_longitude is None else self.max_longitude
+			if min_longitude <= max_longitude:
+				if not min_longitude <= record.longitude <= max_longitude:
+					return False
+			elif max_longitude < record.longitude < min_longitude:
+				return False
+
+		if self.hasRadius():
+			if math.isnan(record.latitude) or math.isnan(record.longitude):
+				return False
+			if getDistance(self.latitude, self.longitude, record.latitude, record.longitude) > self.max_radius:
+				return False
+
+		return True
+
+def isInRange(value, low, high):
+	if low is None and high is None:
+		return True
+	if math.isnan(value):
+		return False
+	if low is not None and value < low:
+		return False
+	if high is not None and value > high:
+		return False
+	return True
+
+#Returns the latitude range and the longitude range of the area of the query or None if the query has no limits on the area. The maximum longitude may be over 180 when the range crosses the date line
+def getQueryArea(query):
+	if query.hasRadius():
+		latitude_radius = query.max_radius / KM_PER_DEGREE
+		min_latitude = max(-90.0, query.latitude - latitude_radius)
+		max_latitude = min(90.0, query.latitude + latitude_radius)
+		cos_latitude = math.cos(math.radians(max(abs(min_latitude), abs(max_latitude))))
+
+		if cos_latitude < 1e-6 or latitude_radius / cos_latitude >= 180.0:
+			return (min_latitude, max_latitude), (-180.0, 180.0)
+
+		longitude_radius = latitude_radius / cos_latitude
+		return (min_latitude, max_latitude), (query.longitude - longitude_radius, query.longitude + longitude_radius)
+
+	if query.min_latitude is None and query.max_latitude is None and not query.hasLongitudeRange():
+		return None
+
+	min_latitude = -90.0 if query.min_latitude is None else query.min_latitude
+	max_latitude = 90.0 if query.max_latitude is None else query.max_latitude
+	min_longitude = -180.0 if query.min_longitude is None else query.min_longitude
+	max_longitude = 180.0 if query.max_longitude is None else query.max_longitude
+
+	if min_longitude > max_longitude:
+		max_longitude += 360.0
+
+	return (min_latitude, max_latitude), (min_longitude, max_longitude)
+
+#Returns the grid cells that cover the area of the query as ranges of consecutive cells, or None if the query has no limits on the area. The cells of one latitude row are consecutive unless the row crosses the date line
+def getQueryCellRanges(query):
+	area = getQueryArea(query)
+
+	if area is None:
+		return None
+
+	(min_latitude, max_latitude), (min_longitude, max_longitude) = area
+	first_row = nordicIndex.getCell(min_latitude, 0.0) // nordicIndex.CELL_COLUMNS
+	last_row = nordicIndex.getCell(max_latitude, 0.0) // nordicIndex.CELL_COLUMNS
+
+	first_column = nordicIndex.getCell(0.0, min_longitude) % nordicIndex.CELL_COLUMNS
+	column_count = int(math.floor(max_longitude / nordicIndex.CELL_SIZE) - math.floor(min_longitude / nordicIndex.CELL_SIZE)) + 1
+
+	if column_count >= nordicIndex.CELL_COLUMNS:
+		column_ranges = [(0, nordicIndex.CELL_COLUMNS - 1)]
+	elif first_column + column_count <= nordicIndex.CELL_COLUMNS:
+		column_ranges = [(first_column, first_column + column_count - 1)]
+	else:
+		column_ranges = [(first_column, nordicIndex.CELL_COLUMNS - 1), (0, first_column + column_count - 1 - nordicIndex.CELL_COLUMNS)]
+
+	cell_ranges = []
+	for row in range(first_row, last_row + 1):
+		for first, last in column_ranges:
+			cell_ranges.append((row * nordicIndex.CELL_COLUMNS + first, row * nordicIndex.CELL_COLUMNS + last))
+
+	return cell_ranges
+
+#Returns the numbers of the events of the index that match the query in the order of the nordic file. The candidates are taken from the time or the grid cell section of the index, whichever has fewer of them, and only the index records of the candidates are read
+def findEvents(index, query):
+	candidate_ranges = None
+	candidate_count = len(index)
+	get_event_numbers = None
+
+	if query.hasTimeRange():
+		start_time = -nordicIndex.INF if query.start_time is None else query.start_time
+		end_time = nordicIndex.INF if query.end_time is None else query.end_time
+		time_range = index.getTimeRange(start_time, end_time)
+
+		if time_range[1] - time_range[0] < candidate_count:
+			candidate_ranges = [time_range]
+			candidate_count = time_range[1] - time_range[0]
+			get_event_numbers = index.getTimeEventNumbers
+
+	query_cell_ranges = getQueryCellRanges(query)
+	if query_cell_ranges is not None:
+		cell_ranges = [index.getCellRange(first, last) for first, last in query_cell_ranges]
+		cell_count = sum(high - low for low, high in cell_ranges)
+
+		if cell_count < candidate_count:
+			candidate_ranges = cell_ranges
+			candidate_count = cell_count
+			get_event_numbers = index.getCellEventNumbers
+
+	if candidate_ranges is None:
+		candidates = range(len(index))
+	else:
+		candidates = [event_number for low, high in candidate_ranges for event_number in get_event_numbers(low, high)]
+
+	return sorted(event_number for event_number in candidates if query.matches(index[event_number]))
+
+#Generator that converts the events of the index one at a time like nordic2quakeml.convertNordicEvents
+def convertIndexedEvents(index, event_numbers, long_quakeML, xmlschema, whole_document, collect_errors=False):
+	converter = nordic2quakeml.QuakeMlConverter(long_quakeML, xmlschema)
+
+	for event_number in event_numbers:
+		nordic_lines, errors = index.getEventLinesWithErrors(event_number)
+
+		if errors:
+			if not collect_errors:
+				for error in errors:
+					logging.error("%s", error)
+			yield nordic_lines, (None, None, errors)
+		elif collect_errors:
+			yield nordic_lines, converter.convertNordicLines(nordic_lines, whole_document, [])
+		else:
+			yield nordic_lines, converter.convertNordicLines(nordic_lines, whole_document)
+
+#Convert only the events of the nordic file that match the query. Only the type-1 values in the index of the file are read for the events that do not match. The index is built or rebuilt first if the file has changed
+def queryNordic2QuakeML(usr_path, filename, query, separate_files=False, schema_path=nordic2quakeml.QUAKEML_SCHEMA_PATH, bulk=False, quarantine_filename=None, report_filename=None):
+	nordic_path = os.path.join(usr_path, filename)
+
+	if not os.path.isfile(nordic_path):
+		logging.error("File {0} does not exists.".format(filename))
+		return False
+
+	index = nordicIndex.NordicIndex(nordic_path)
+	event_numbers = findEvents(index, query)
+
+	print("{0} of {1} events match the query".format(len(event_numbers), len(index)))
+
+	xmlschema = nordic2quakeml.getQuakeMlSchema(schema_path)
+	results = convertIndexedEvents(index, event_numbers, True, xmlschema, separate_files, bulk)
+
+	report = None
+	quarantine_file = None
+	if bulk:
+		if quarantine_filename is not None:
+			quarantine_file = open(os.path.join(usr_path, quarantine_filename), 'w', encoding=nordicRead.NORDIC_ENCODING)
+		report = conversionReport.ConversionReport(quarantine_file)
+
+	if separate_files:
+		success = nordic2quakeml.writeQuakeMlFiles(usr_path, results, report)
+	else:
+		qml_filename = os.path.splitext(os.path.basename(filename))[0] + "_query.xml"
+		success = nordic2quakeml.writeQuakeMlDocument(usr_path, qml_filename, results, xmlschema, report)
+
+	index.close()
+
+	if bulk:
+		if quarantine_file is not None:
+			quarantine_file.close()
+		nordic2quakeml.finishReport(usr_path, report, report_filename)
+
+	return success
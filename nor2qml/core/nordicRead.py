@@ -1,24 +1,45 @@
 import logging
-import sys
 
-def readNordicFile(f):
-	nordics = []
-	emsg = "Nordic Read: The following line is too short: {0}\n{1}"
-	i = 0
-	nordics.append([])
+from nor2qml.core import nordicColumnar
+from nor2qml.validation import validationTools
+
+#Encoding of the nordic files. Every byte is a character in latin-1, so files with other 8-bit characters are read the same way everywhere instead of failing in some places
+NORDIC_ENCODING = "latin-1"
+
+#Generator that yields the lines of one nordic event at a time together with the list of reading errors of the event. Only the lines of the event being read are kept in memory
+def readNordicEventsWithErrors(f):
+	emsg = "{0}: The following line is too short: {2}\n{3}"
+	nordic = []
+	errors = []
 	
 	for line in f:
 		if line.strip() == "":
-			i += 1;
-			nordics.append([])
+			if nordic or errors:
+				yield nordic, errors
+				nordic = []
+				errors = []
 		elif(len(line) < 81):
-			logging.error(emsg.format(len(line), line))
-			sys.exit()
+			errors.append(validationTools.ValidationError(9, "line length", emsg, (len(line), line), line))
 		elif (line[79] == "7"):
 			pass
-		elif (line[79] == " "):
-			nordics[i].append(line)
 		else:
-			nordics[i].append(line)
+			nordic.append(line)
+
+	if nordic or errors:
+		yield nordic, errors
+
+#Generator that yields the lines of one nordic event at a time. The reading is stopped at the first line that is too short and the error is logged, use readNordicEventsWithErrors to get the errors and continue
+def readNordicEvents(f):
+	for nordic, errors in readNordicEventsWithErrors(f):
+		if errors:
+			logging.error("%s", errors[0])
+			return
+
+		yield nordic
+
+def readNordicFile(f):
+	return list(readNordicEvents(f))
 
-	return nordics
+#Reads the main headers and the phase data of the whole file straight into nordicColumnar.NordicCatalogColumns. Needs numpy
+def readNordicCatalogColumns(f):
+	return nordicColumnar.createCatalogColumns(readNordicEvents(f))
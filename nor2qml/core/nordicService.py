@@ -0,0 +1,290 @@
+import asyncio
+import collections
+import concurrent.futures
+import logging
+import os
+import urllib.parse
+
+from nor2qml.core import nordic2quakeml, nordicIndex, nordicQuery
+
+QUERY_PATH = "/fdsnws/event/1/query"
+VERSION_PATH = "/fdsnws/event/1/version"
+SERVICE_VERSION = "1.2.0"
+
+#Number of events converted at a time before the converted events are sent to the client
+CHUNK_EVENTS = 16
+
+#Number of threads converting the events of the requests
+CONVERSION_THREADS = 4
+
+MAX_REQUEST_LINE = 8192
+MAX_HEADERS = 100
+
+#Query parameters of the FDSN event service and their short forms by the NordicQuery attribute. The times are parsed with nordicQuery.parseTime and the radius is given in degrees
+QUERY_PARAMETERS = {
+	"start_time": ("starttime", "start"),
+	"end_time": ("endtime", "end"),
+	"min_latitude": ("minlatitude", "minlat"),
+	"max_latitude": ("maxlatitude", "maxlat"),
+	"min_longitude": ("minlongitude", "minlon"),
+	"max_longitude": ("maxlongitude", "maxlon"),
+	"latitude": ("latitude", "lat"),
+	"longitude": ("longitude", "lon"),
+	"max_radius": ("maxradius",),
+	"min_depth": ("mindepth",),
+	"max_depth": ("maxdepth",),
+	"min_magnitude": ("minmagnitude", "minmag"),
+	"max_magnitude": ("maxmagnitude", "maxmag"),
+}
+OTHER_PARAMETERS = ("limit", "nodata", "format")
+
+HTTP_REASONS = {200: "OK", 204: "No Content", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed", 500: "Internal Server Error"}
+
+#Raised when the request is not valid. The status is the HTTP status of the response
+class ServiceError(Exception):
+	def __init__(self, status, message):
+		Exception.__init__(self, message)
+		self.status = status
+		self.message = message
+
+#File object that collects what QuakeMlWriter writes so that it can be sent as one chunk
+class ChunkBuffer:
+	def __init__(self):
+		self.parts = []
+
+	def write(self, data):
+		self.parts.append(bytes(data))
+
+	def takeChunk(self):
+		chunk = b"".join(self.parts)
+		self.parts = []
+		return chunk
+
+#Returns the NordicQuery, the maximum number of events and the HTTP status of an empty result of the query string of the request
+def parseQueryParameters(query_string):
+	parameters = {}
+
+	for name, value in urllib.parse.parse_qsl(query_string, keep_blank_values=True):
+		parameters[name.lower()] = value
+
+	known_parameters = set(OTHER_PARAMETERS)
+	query_values = {}
+
+	for attribute, names in QUERY_PARAMETERS.items():
+		known_parameters.update(names)
+		for name in names:
+			if name not in parameters:
+				continue
+
+			try:
+				if attribute in ("start_time", "end_time"):
+					query_values[attribute] = nordicQuery.parseTime(parameters[name])
+				else:
+					query_values[attribute] = float(parameters[name])
+			except ValueError:
+				raise ServiceError(400, "Invalid value for the parameter {0}: {1}".format(name, parameters[name]))
+
+	for name in parameters:
+		if name not in known_parameters:
+			raise ServiceError(400, "Unsupported parameter: {0}".format(name))
+
+	if parameters.get("format", "xml") != "xml":
+		raise ServiceError(400, "Unsupported format: {0}".format(parameters["format"]))
+
+	if "max_radius" in query_values:
+		query_values["max_radius"] *= nordicQuery.KM_PER_DEGREE
+
+	limit = None
+	if "limit" in parameters:
+		try:
+			limit = int(parameters["limit"])
+		except ValueError:
+			raise ServiceError(400, "Invalid value for the parameter limit: {0}".format(parameters["limit"]))
+
+		if limit < 1:
+			raise ServiceError(400, "Invalid value for the parameter limit: {0}".format(parameters["limit"]))
+
+	nodata = parameters.get("nodata", "204")
+	if nodata not in ("204", "404"):
+		raise ServiceError(400, "Invalid value for the parameter nodata: {0}".format(nodata))
+
+	return nordicQuery.NordicQuery(**query_values), limit, int(nodata)
+
+#Serves the events of a nordic file like the FDSN event service. The requests are handled concurrently on the asyncio event loop and the events are converted on worker threads so that converting a large response does not block the other clients. The events are found with the index of the file, which is rebuilt when the file changes. The converter can be given to serve the events with the ids of another authority or network
+class NordicEventService:
+	def __init__(self, nordic_path, schema_path=nordic2quakeml.QUAKEML_SCHEMA_PATH, converter=None):
+		if converter is None:
+			converter = nordic2quakeml.QuakeMlConverter(True, schema_path=schema_path)
+
+		self.nordic_path = nordic_path
+		self.converter = converter
+		self.index = None
+		self.index_lock = asyncio.Lock()
+
+		#Number of requests using each open index. An index that has been replaced is closed when its last request is done
+		self.index_users = collections.Counter()
+
+		#The converter is shared by the threads
+		self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=CONVERSION_THREADS)
+
+	#Returns the index of the nordic file. The index is reopened when the nordic file has changed. The index must be given back with releaseIndex
+	async def getIndex(self):
+		async with self.index_lock:
+			index_path = self.nordic_path + nordicIndex.INDEX_FILE_EXTENSION
+
+			if self.index is None or not nordicIndex.isNordicIndexValid(self.nordic_path, index_path):
+				old_index = self.index
+				loop = asyncio.get_running_loop()
+				self.index = await loop.run_in_executor(self.executor, nordicIndex.NordicIndex, self.nordic_path)
+
+				if old_index is not None and self.index_users[old_index] == 0:
+					del self.index_users[old_index]
+					old_index.close()
+
+			self.index_users[self.index] += 1
+
+			return self.index
+
+	def releaseIndex(self, index):
+		self.index_users[index] -= 1
+
+		if self.index_users[index] == 0 and index is not self.index:
+			del self.index_users[index]
+			index.close()
+
+	#Convert the events into QuakeML fragments. The events that are not valid are logged and skipped
+	def convertEvents(self, index, event_numbers):
+		fragments = []
+
+		for event_number in event_numbers:
+			errors = []
+			nordic_lines, read_errors = index.getEventLinesWithErrors(event_number)
+			errors.extend(read_errors)
+
+			result = (None, None, errors)
+			if not read_errors:
+				result = self.converter.convertNordicLines(nordic_lines, False, errors)
+
+			if result[1] is None:
+				logging.error("Event {0} of {1} is not valid: {2}".format(event_number + 1, self.nordic_path, "; ".join(str(error) for error in errors)))
+			else:
+				fragments.append(result[1])
+
+		return fragments
+
+	async def handleClient(self, reader, writer):
+		try:
+			await self.handleRequest(reader, writer)
+		except ServiceError as e:
+			await self.writeResponse(writer, e.status, e.message.encode('utf-8') + b"\n")
+		except (ConnectionError, asyncio.IncompleteReadError):
+			pass
+		except Exception:
+			logging.exception("Request failed")
+		finally:
+			writer.close()
+
+	async def handleRequest(self, reader, writer):
+		request_line = await reader.readline()
+		if len(request_line) > MAX_REQUEST_LINE or not request_line.endswith(b"\n"):
+			raise ServiceError(400, "Invalid request line")
+
+		for i in range(MAX_HEADERS):
+			header = await reader.readline()
+			if header in (b"\r\n", b"\n", b""):
+				break
+		else:
+			raise ServiceError(400, "Too many headers")
+
+		parts = request_line.decode('latin-1').split()
+		if len(parts) != 3:
+			raise ServiceError(400, "Invalid request line")
+
+		method, target, version = parts
+		if method != "GET":
+			raise ServiceError(405, "Only GET is supported")
+
+		url = urllib.parse.urlsplit(target)
+
+		if url.path == VERSION_PATH:
+			await self.writeResponse(writer, 200, SERVICE_VERSION.encode('utf-8') + b"\n")
+		elif url.path == QUERY_PATH:
+			await self.writeQuery(writer, url.query)
+		else:
+			raise ServiceError(404, "Unknown path {0}".format(url.path))
+
+	#Send the QuakeML of the events matching the query with the chunked transfer encoding. The events are converted and sent CHUNK_EVENTS at a time so that the response is never kept in memory as a whole
+	async def writeQuery(self, writer, query_string):
+		query, limit, nodata = parseQueryParameters(query_string)
+
+		index = await self.getIndex()
+		try:
+			await self.writeIndexedEvents(writer, index, query, limit, nodata)
+		finally:
+			self.releaseIndex(index)
+
+	async def writeIndexedEvents(self, writer, index, query, limit, nodata):
+		loop = asyncio.get_running_loop()
+		event_numbers = await loop.run_in_executor(self.executor, nordicQuery.findEvents, index, query)
+
+		if limit is not None:
+			event_numbers = event_numbers[:limit]
+
+		if not event_numbers:
+			await self.writeResponse(writer, nodata, b"")
+			return
+
+		writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: application/xml\r\nTransfer-Encoding: chunked\r\nConnection: close\r\n\r\n")
+
+		buffer = ChunkBuffer()
+		with self.converter.createWriter(buffer) as quakeml_writer:
+			for i in range(0, len(event_numbers), CHUNK_EVENTS):
+				fragments = await loop.run_in_executor(self.executor, self.convertEvents, index, event_numbers[i:i + CHUNK_EVENTS])
+
+				for fragment in fragments:
+					quakeml_writer.writeEventFragment(fragment)
+
+				await self.writeChunk(writer, buffer.takeChunk())
+
+		await self.writeChunk(writer, buffer.takeChunk())
+		writer.write(b"0\r\n\r\n")
+		await writer.drain()
+
+	async def writeChunk(self, writer, chunk):
+		if chunk:
+			writer.write("{0:x}\r\n".format(len(chunk)).encode('ascii') + chunk + b"\r\n")
+			await writer.drain()
+
+	async def writeResponse(self, writer, status, body):
+		if status == 204:
+			writer.write("HTTP/1.1 204 {0}\r\nConnection: close\r\n\r\n".format(HTTP_REASONS[status]).encode('latin-1'))
+		else:
+			writer.write("HTTP/1.1 {0} {1}\r\nContent-Type: text/plain\r\nContent-Length: {2}\r\nConnection: close\r\n\r\n".format(status, HTTP_REASONS[status], len(body)).encode('latin-1'))
+			writer.write(body)
+		await writer.drain()
+
+	async def serve(self, host, port):
+		server = await asyncio.start_server(self.handleClient, host, port)
+		print("Serving {0} at http://{1}:{2}{3}".format(self.nordic_path, host, port, QUERY_PATH))
+
+		async with server:
+			await server.serve_forever()
+
+#Serve the events of the nordic file over HTTP until interrupted
+def serveNordicFile(usr_path, filename, host="127.0.0.1", port=8080, schema_path=nordic2quakeml.QUAKEML_SCHEMA_PATH):
+	nordic_path = os.path.join(usr_path, filename)
+
+	if not os.path.isfile(nordic_path):
+		logging.error("File {0} does not exists.".format(filename))
+		return False
+
+	async def run():
+		service = NordicEventService(nordic_path, schema_path)
+		await service.serve(host, port)
+
+	try:
+		asyncio.run(run())
+	except KeyboardInterrupt:
+		print("Stopped serving {0}".format(nordic_path))
+
+	return True
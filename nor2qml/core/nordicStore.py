@@ -0,0 +1,316 @@
+import logging
+import math
+import os
+import sqlite3
+from datetime import date
+
+from nor2qml.core import nordic2quakeml, nordicColumns, nordicDatabase, nordicHandler, nordicIndex, nordicRead, nordicWatch
+from nor2qml.validation import nordicCompiledValidation
+
+#Number of events written in one transaction. The events of one file are always written in the same transaction
+BATCH_EVENTS = 5000
+
+#Number of events read from the store with one query per table
+LOAD_EVENTS = 500
+
+#Suffixes of the files SQLite keeps next to the store database
+STORE_FILE_SUFFIXES = ("", "-wal", "-shm", "-journal")
+
+SQLITE_TYPES = {"string": "TEXT", "integer": "INTEGER", "float": "REAL", "date": "TEXT"}
+
+#The event table has the values of the first type-1 line of the event for the lookups and the hash of the lines of the event so that the unchanged events of a changed file are kept
+STORE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS nordic_file (id INTEGER PRIMARY KEY, path TEXT UNIQUE NOT NULL, size INTEGER, mtime INTEGER);
+CREATE TABLE IF NOT EXISTS nordic_event (id INTEGER PRIMARY KEY, file_id INTEGER NOT NULL, event_number INTEGER NOT NULL, hash TEXT NOT NULL,
+	origin_time REAL, latitude REAL, longitude REAL, depth REAL, magnitude REAL);
+CREATE INDEX IF NOT EXISTS nordic_event_file_id ON nordic_event (file_id, event_number);
+CREATE INDEX IF NOT EXISTS nordic_event_origin_time ON nordic_event (origin_time);
+CREATE INDEX IF NOT EXISTS nordic_event_magnitude ON nordic_event (magnitude);
+"""
+
+#Tables of the lines with their header type, or None for the phase data, and their column layouts
+LINE_TABLES = tuple((header_type, table, layout) for header_type, table, layout in nordicDatabase.HEADER_TABLES) + ((None, nordicDatabase.PHASE_DATA_TABLE, nordicColumns.PHASE_DATA_LAYOUT),)
+
+def getCreateTablesSql():
+	statements = [STORE_SCHEMA]
+
+	for header_type, table, layout in LINE_TABLES:
+		columns = ["event_id INTEGER NOT NULL", "line_number INTEGER NOT NULL"]
+		columns += ['"{0}" {1}'.format(column[0], SQLITE_TYPES[column[3]]) for column in layout.columns]
+		statements.append("CREATE TABLE IF NOT EXISTS {0} ({1});".format(table, ", ".join(columns)))
+		statements.append("CREATE INDEX IF NOT EXISTS {0}_event_id ON {0} (event_id);".format(table))
+
+	statements.append("CREATE INDEX IF NOT EXISTS {0}_station_code ON {0} (station_code);".format(nordicDatabase.PHASE_DATA_TABLE))
+
+	return "\n".join(statements)
+
+def getInsertSql(table, layout):
+	columns = nordicDatabase.ROW_KEY_COLUMNS + layout.names
+	return "INSERT INTO {0} ({1}) VALUES ({2})".format(table, ", ".join('"{0}"'.format(column) for column in columns), ", ".join("?" * len(columns)))
+
+def toStoreValue(value):
+	if isinstance(value, float) and math.isnan(value):
+		return None
+	if isinstance(value, date):
+		return value.isoformat()
+	return value
+
+#Returns the origin time, latitude, longitude, depth and magnitude of the first type-1 line of the event like in the event index
+def getEventValues(nordic_lines):
+	for line in nordic_lines:
+		if line[79] == "1":
+			return [toStoreValue(value) for value in nordicIndex.readMainHeaderValues(line)]
+
+	return [None] * 5
+
+#Index record like values of one stored event for nordicQuery.NordicQuery.matches. Unknown values are nan
+class StoredEventRecord:
+	__slots__ = ("event_id", "origin_time", "latitude", "longitude", "depth", "magnitude")
+
+	def __init__(self, row):
+		self.event_id = row[0]
+		self.origin_time, self.latitude, self.longitude, self.depth, self.magnitude = [nordicIndex.NAN if value is None else value for value in row[1:]]
+
+#Parsed nordic events stored in an SQLite database. The nordic files are synced into the store incrementally, only the events of new or changed files are parsed, and the QuakeML is created from the stored values without reading the nordic files again
+class NordicStore:
+	def __init__(self, database_path):
+		self.store_paths = set(os.path.abspath(database_path) + suffix for suffix in STORE_FILE_SUFFIXES)
+		self.connection = sqlite3.connect(database_path)
+		self.connection.execute("PRAGMA journal_mode=WAL")
+		self.connection.execute("PRAGMA synchronous=NORMAL")
+		self.connection.executescript(getCreateTablesSql())
+
+		self.insert_sql = dict((table, getInsertSql(table, layout)) for header_type, table, layout in LINE_TABLES)
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, exc_type, exc_value, traceback):
+		self.close()
+
+	def close(self):
+		self.connection.close()
+
+	#Insert one valid event and its lines
+	def insertEvent(self, file_id, event_number, event_hash, nordic_lines, nordic):
+		cursor = self.connection.execute("INSERT INTO nordic_event (file_id, event_number, hash, origin_time, latitude, longitude, depth, magnitude) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+										[file_id, event_number, event_hash] + getEventValues(nordic_lines))
+		event_id = cursor.lastrowid
+
+		for header_type, table, layout in LINE_TABLES:
+			if header_type is None:
+				records = nordic.phase_data
+			else:
+				records = nordic.headers[header_type]
+
+			if records:
+				rows = [[event_id, line_number] + [toStoreValue(value) for value in nordicDatabase.getRecordValues(record, layout)] for line_number, record in enumerate(records)]
+				self.connection.executemany(self.insert_sql[table], rows)
+
+	def deleteEvents(self, event_ids):
+		rows = [(event_id,) for event_id in event_ids]
+
+		for header_type, table, layout in LINE_TABLES:
+			self.connection.executemany("DELETE FROM {0} WHERE event_id = ?".format(table), rows)
+		self.connection.executemany("DELETE FROM nordic_event WHERE id = ?", rows)
+
+	#Sync the events of one file. The events whose lines have not changed are kept and only the new events are parsed and inserted. The file is read in the encoding of the nordic files like in the event index. Returns the number of inserted and deleted events
+	def syncFile(self, nordic_path, size, mtime):
+		row = self.connection.execute("SELECT id, size, mtime FROM nordic_file WHERE path = ?", (nordic_path,)).fetchone()
+
+		if row is not None and (row[1], row[2]) == (size, mtime):
+			return 0, 0
+
+		fnordic = open(nordic_path, encoding=nordicRead.NORDIC_ENCODING)
+
+		if row is None:
+			file_id = self.connection.execute("INSERT INTO nordic_file (path, size, mtime) VALUES (?, ?, ?)", (nordic_path, size, mtime)).lastrowid
+		else:
+			file_id = row[0]
+			self.connection.execute("UPDATE nordic_file SET size = ?, mtime = ? WHERE id = ?", (size, mtime, file_id))
+
+		stored_events = {}
+		for event_id, event_hash in self.connection.execute("SELECT id, hash FROM nordic_event WHERE file_id = ?", (file_id,)):
+			stored_events.setdefault(event_hash, []).append(event_id)
+
+		inserted = 0
+
+		for event_number, (nordic_lines, errors) in enumerate(nordicRead.readNordicEventsWithErrors(fnordic)):
+			event_hash = nordicDatabase.getEventHash(nordic_lines)
+
+			if stored_events.get(event_hash):
+				event_id = stored_events[event_hash].pop()
+				self.connection.execute("UPDATE nordic_event SET event_number = ? WHERE id = ?", (event_number, event_id))
+				continue
+
+			nordic = None
+			if not errors:
+				nordic = nordicCompiledValidation.validateAndCreateNordicEvent(nordic_lines, errors)
+
+			if nordic is None:
+				logging.error("Event {0} of {1} is not valid and is not stored: {2}".format(event_number + 1, nordic_path, "; ".join(str(error) for error in errors)))
+				continue
+
+			self.insertEvent(file_id, event_number, event_hash, nordic_lines, nordic)
+			inserted += 1
+
+		fnordic.close()
+
+		removed_events = [event_id for event_ids in stored_events.values() for event_id in event_ids]
+		self.deleteEvents(removed_events)
+
+		return inserted, len(removed_events)
+
+	def deleteFile(self, nordic_path):
+		event_ids = [row[0] for row in self.connection.execute("SELECT nordic_event.id FROM nordic_event JOIN nordic_file ON nordic_file.id = nordic_event.file_id WHERE nordic_file.path = ?", (nordic_path,))]
+		self.deleteEvents(event_ids)
+		self.connection.execute("DELETE FROM nordic_file WHERE path = ?", (nordic_path,))
+
+		return len(event_ids)
+
+	#Sync a file with a savepoint so that a file that cannot be read is logged and its changes are rolled back without rolling back the rest of the sync
+	def syncFileSafely(self, nordic_path, size, mtime):
+		if not self.connection.in_transaction:
+			self.connection.execute("BEGIN")
+		self.connection.execute("SAVEPOINT sync_file")
+
+		try:
+			changes = self.syncFile(nordic_path, size, mtime)
+		except (IOError, OSError, ValueError) as e:
+			self.connection.execute("ROLLBACK TO sync_file")
+			logging.error("File {0} could not be read and is not synced: {1}".format(nordic_path, e))
+			changes = 0, 0
+
+		self.connection.execute("RELEASE sync_file")
+		return changes
+
+	#Sync a nordic file or all files of a directory tree into the store. The files that have not changed since the last sync are not read. The store database, its SQLite files and the QuakeML files are not synced. The files of the directory that no longer exist are removed from the store. The changes are committed after at least BATCH_EVENTS changed events
+	def syncNordicPath(self, path):
+		path = os.path.abspath(path)
+
+		if os.path.isdir(path):
+			scanned_files = dict((nordic_path, stat) for nordic_path, stat in nordicWatch.scanNordicFiles(path) if nordic_path not in self.store_paths)
+			#The paths are compared as exact prefixes because LIKE would match _ and % as wildcards and ignore the case
+			prefix = os.path.join(path, "")
+			stored_paths = [row[0] for row in self.connection.execute("SELECT path FROM nordic_file WHERE substr(path, 1, length(?)) = ?", (prefix, prefix))]
+		else:
+			stat = os.stat(path)
+			scanned_files = {path: [stat.st_mtime_ns, stat.st_size]}
+			stored_paths = []
+
+		inserted = 0
+		deleted = 0
+		uncommitted = 0
+
+		try:
+			for nordic_path in stored_paths:
+				if nordic_path not in scanned_files:
+					deleted += self.deleteFile(nordic_path)
+
+			for nordic_path, (mtime, size) in sorted(scanned_files.items()):
+				file_inserted, file_deleted = self.syncFileSafely(nordic_path, size, mtime)
+				inserted += file_inserted
+				deleted += file_deleted
+				uncommitted += file_inserted + file_deleted
+
+				if uncommitted >= BATCH_EVENTS:
+					self.connection.commit()
+					uncommitted = 0
+
+			self.connection.commit()
+		except:
+			self.connection.rollback()
+			raise
+
+		return inserted, deleted
+
+	#Returns the ids of the stored events that match the nordicQuery.NordicQuery in the order of the origin time. The time, magnitude and depth limits are searched with the indexes of the store and the rest of the query is checked for the remaining events. With a station code only the events with phase data from the station are returned
+	def findEvents(self, query=None, station_code=None):
+		conditions = []
+		parameters = []
+
+		if query is not None:
+			for column, low, high in (("origin_time", query.start_time, query.end_time), ("magnitude", query.min_magnitude, query.max_magnitude), ("depth", query.min_depth, query.max_depth)):
+				if low is not None:
+					conditions.append("{0} >= ?".format(column))
+					parameters.append(low)
+				if high is not None:
+					conditions.append("{0} <= ?".format(column))
+					parameters.append(high)
+
+		if station_code is not None:
+			conditions.append("id IN (SELECT event_id FROM {0} WHERE station_code = ?)".format(nordicDatabase.PHASE_DATA_TABLE))
+			parameters.append(station_code)
+
+		sql = "SELECT id, origin_time, latitude, longitude, depth, magnitude FROM nordic_event"
+		if conditions:
+			sql += " WHERE " + " AND ".join(conditions)
+		sql += " ORDER BY origin_time, id"
+
+		records = [StoredEventRecord(row) for row in self.connection.execute(sql, parameters)]
+
+		if query is None:
+			return [record.event_id for record in records]
+
+		return [record.event_id for record in records if query.matches(record)]
+
+	#Generator that creates the NordicEvents of the stored events from the stored values. The lines of LOAD_EVENTS events are read with one query per table
+	def getNordicEvents(self, event_ids):
+		for i in range(0, len(event_ids), LOAD_EVENTS):
+			chunk = event_ids[i:i + LOAD_EVENTS]
+			events = dict((event_id, ({1:[], 2:[], 3:[], 4:[], 5:[], 6:[]}, [])) for event_id in chunk)
+			placeholders = ", ".join("?" * len(chunk))
+
+			for header_type, table, layout in LINE_TABLES:
+				columns = ", ".join('"{0}"'.format(name) for name in layout.names)
+				rows = self.connection.execute("SELECT event_id, {0} FROM {1} WHERE event_id IN ({2}) ORDER BY event_id, line_number".format(columns, table, placeholders), chunk)
+				date_columns = [j for j, column in enumerate(layout.columns) if column[3] == "date"]
+
+				for row in rows:
+					values = list(row[1:])
+					for j in date_columns:
+						if values[j] is not None:
+							values[j] = nordicHandler.toDateFromString(values[j])
+
+					headers, phase_data = events[row[0]]
+					if header_type is None:
+						phase_data.append(nordicHandler.NordicPhaseData(values))
+					else:
+						headers[header_type].append(nordicHandler.HEADER_CLASSES[str(header_type)][1](values))
+
+			for event_id in chunk:
+				yield nordicHandler.NordicEvent(*events[event_id])
+
+#Generator that converts the stored events one at a time like nordic2quakeml.convertNordicEvents
+def convertStoredEvents(store, event_ids, long_quakeML, xmlschema, whole_document):
+	converter = nordic2quakeml.QuakeMlConverter(long_quakeML, xmlschema)
+
+	for nordic in store.getNordicEvents(event_ids):
+		fragment = converter.convertEvent(nordic, whole_document)
+
+		if fragment is None:
+			yield [], (None, None, None)
+		else:
+			yield [], (nordic2quakeml.getQuakeMlFilename(nordic), fragment, None)
+
+#Sync the nordic file or directory into the SQLite store and write the QuakeML of the stored events that match the query
+def nordicStore2QuakeML(usr_path, path, database_path, query=None, station_code=None, separate_files=False, schema_path=nordic2quakeml.QUAKEML_SCHEMA_PATH):
+	nordic_path = os.path.join(usr_path, path)
+
+	if not os.path.exists(nordic_path):
+		logging.error("File {0} does not exists.".format(path))
+		return False
+
+	with NordicStore(os.path.join(usr_path, database_path)) as store:
+		inserted, deleted = store.syncNordicPath(nordic_path)
+		print("Synced {0}: {1} new events, {2} removed events".format(path, inserted, deleted))
+
+		event_ids = store.findEvents(query, station_code)
+		xmlschema = nordic2quakeml.getQuakeMlSchema(schema_path)
+		results = convertStoredEvents(store, event_ids, True, xmlschema, separate_files)
+
+		if separate_files:
+			return nordic2quakeml.writeQuakeMlFiles(usr_path, results)
+
+		qml_filename = os.path.splitext(os.path.basename(os.path.abspath(nordic_path)))[0] + ".xml"
+		return nordic2quakeml.writeQuakeMlDocument(usr_path, qml_filename, results, xmlschema)
@@ -0,0 +1,130 @@
+import json
+import logging
+import os
+import tempfile
+import time
+
+from nor2qml.core import conversionReport, nordic2quakeml, nordicRead
+
+STATE_FILENAME = ".nor2qml-watch.json"
+POLL_INTERVAL = 1.0
+
+#Extensions of the files written by the converter. They are never taken as S-files
+OUTPUT_FILE_EXTENSIONS = (".xml",)
+
+#Returns True if the file of the name can be an S-file. Hidden files and the files written by the converter are not
+def isNordicFilename(name):
+	return not name.startswith(".") and os.path.splitext(name)[1].lower() not in OUTPUT_FILE_EXTENSIONS
+
+#Generator that yields the path and the modification time and size of every file in the directory tree. Hidden files and directories, the output files and the excluded directories are skipped
+def scanNordicFiles(path, excluded_paths=()):
+	for entry in os.scandir(path):
+		if entry.name.startswith("."):
+			continue
+
+		if entry.is_dir():
+			if os.path.normpath(entry.path) in excluded_paths:
+				continue
+			for scanned in scanNordicFiles(entry.path, excluded_paths):
+				yield scanned
+		elif entry.is_file():
+			if not isNordicFilename(entry.name):
+				continue
+			stat = entry.stat()
+			yield entry.path, [stat.st_mtime_ns, stat.st_size]
+
+#Returns the modification times and sizes of the files that have been converted by the path of the file
+def readWatchState(state_path):
+	if not os.path.isfile(state_path):
+		return {}
+
+	f = open(state_path)
+	state = json.load(f)
+	f.close()
+
+	return state
+
+#Write the state through a temporary file so that an interrupted write never loses the old state
+def writeWatchState(state_path, state):
+	fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(state_path), suffix=".tmp")
+
+	f = os.fdopen(fd, 'w')
+	json.dump(state, f)
+	f.close()
+
+	os.replace(temp_path, state_path)
+
+#Convert one S-file into a QuakeML document with the compiled schema. Invalid events are reported and skipped so that one bad file does not stop the watching
+def convertNordicFile(usr_path, nordic_path, xmlschema):
+	report = conversionReport.ConversionReport()
+
+	try:
+		fnordic = open(nordic_path, encoding=nordicRead.NORDIC_ENCODING)
+	except (IOError, OSError):
+		logging.error("File {0} could not be opened.".format(nordic_path))
+		return False
+
+	results = nordic2quakeml.convertNordicEvents(fnordic, True, xmlschema, False, True)
+	qml_filename = os.path.splitext(os.path.basename(nordic_path))[0] + ".xml"
+	success = nordic2quakeml.writeQuakeMlDocument(usr_path, qml_filename, results, xmlschema, report)
+
+	fnordic.close()
+
+	for invalid_event in report.invalid_events:
+		for error in invalid_event.errors:
+			logging.error("{0}, event {1}: {2}".format(nordic_path, invalid_event.event_number + 1, error))
+
+	return success
+
+#Watch the directory tree and convert every new or changed S-file into QuakeML. A file is converted once its size and modification time have stayed the same for one poll so that files that are still being written are not read. The converted files are recorded in the state file so that a restart does not convert them again. A file that could not be converted is tried again when it changes or when the watching is restarted. The QuakeML files and the output directory, when it is inside the watched tree, are not watched. Runs until interrupted or for max_polls polls if it is given
+def watchNordicDirectory(usr_path, path, schema_path=nordic2quakeml.QUAKEML_SCHEMA_PATH, state_path=None, poll_interval=POLL_INTERVAL, max_polls=None):
+	watch_path = os.path.normpath(os.path.join(usr_path, path))
+
+	if not os.path.isdir(watch_path):
+		logging.error("Directory {0} does not exists.".format(path))
+		return False
+
+	if state_path is None:
+		state_path = os.path.join(usr_path, STATE_FILENAME)
+
+	xmlschema = nordic2quakeml.getQuakeMlSchema(schema_path)
+	state = readWatchState(state_path)
+	previous_scan = {}
+	failed = {}
+	polls = 0
+	excluded_paths = (os.path.normpath(usr_path),)
+
+	print("Watching {0} for new S-files".format(watch_path))
+
+	try:
+		while max_polls is None or polls < max_polls:
+			scan = dict(scanNordicFiles(watch_path, excluded_paths))
+			state_changed = False
+
+			for nordic_path, stat in sorted(scan.items()):
+				if state.get(nordic_path) == stat or failed.get(nordic_path) == stat or previous_scan.get(nordic_path) != stat:
+					continue
+
+				if convertNordicFile(usr_path, nordic_path, xmlschema):
+					state[nordic_path] = stat
+					state_changed = True
+					failed.pop(nordic_path, None)
+				else:
+					failed[nordic_path] = stat
+
+			for nordic_path in [nordic_path for nordic_path in state if nordic_path not in scan]:
+				del state[nordic_path]
+				state_changed = True
+
+			if state_changed:
+				writeWatchState(state_path, state)
+
+			previous_scan = scan
+			polls += 1
+
+			if max_polls is None or polls < max_polls:
+				time.sleep(poll_interval)
+	except KeyboardInterrupt:
+		print("Stopped watching {0}".format(watch_path))
+
+	return True
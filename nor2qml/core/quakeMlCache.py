@@ -0,0 +1,95 @@
+import hashlib
+import os
+import tempfile
+import time
+
+CACHE_FILE_EXTENSION = ".xml"
+
+#Returns the sha1 of the contents of the file
+def getFileHash(filename):
+	sha = hashlib.sha1()
+
+	f = open(filename, 'rb')
+	for block in iter(lambda: f.read(65536), b""):
+		sha.update(block)
+	f.close()
+
+	return sha.hexdigest()
+
+#On-disk cache of the converted QuakeML of nordic events. The entries are keyed by the hash of the raw lines of the event and the version string, which should change whenever the converter, the schema or the conversion settings change. Every entry is a file whose first line is the QuakeML filename of the event and the rest is the QuakeML
+class QuakeMlCache:
+	def __init__(self, cache_path, version):
+		self.cache_path = cache_path
+		self.version = version.encode('utf-8')
+
+		if not os.path.isdir(cache_path):
+			os.makedirs(cache_path)
+
+	def getKey(self, nordic_lines):
+		sha = hashlib.sha1(self.version)
+
+		for line in nordic_lines:
+			sha.update(line.encode('utf-8'))
+
+		return sha.hexdigest()
+
+	def getEntryPath(self, key):
+		return os.path.join(self.cache_path, key + CACHE_FILE_EXTENSION)
+
+	#Returns the QuakeML filename and the QuakeML of the entry or None if the entry is not in the cache. Reading the entry updates its modification time so that the age is counted from the last use
+	def get(self, key):
+		entry_path = self.getEntryPath(key)
+
+		try:
+			f = open(entry_path, 'rb')
+		except (IOError, OSError):
+			return None
+
+		filename = f.readline()[:-1].decode('utf-8')
+		fragment = f.read()
+		f.close()
+
+		try:
+			os.utime(entry_path, None)
+		except OSError:
+			pass
+
+		return filename, fragment
+
+	#Add the entry to the cache. The entry is written to a temporary file first so that other processes never read a partial entry
+	def put(self, key, filename, fragment):
+		fd, temp_path = tempfile.mkstemp(dir=self.cache_path, suffix=".tmp")
+
+		f = os.fdopen(fd, 'wb')
+		f.write(filename.encode('utf-8') + b"\n")
+		f.write(fragment)
+		f.close()
+
+		os.replace(temp_path, self.getEntryPath(key))
+
+	#Remove the entries that have not been used in max_age seconds and then the least recently used entries until the cache is at most max_size bytes. Returns the number of removed entries
+	def evict(self, max_size=None, max_age=None):
+		entries = []
+
+		for entry in os.scandir(self.cache_path):
+			if entry.is_file() and entry.name.endswith(CACHE_FILE_EXTENSION):
+				stat = entry.stat()
+				entries.append((stat.st_mtime, stat.st_size, entry.path))
+
+		entries.sort()
+		removed = 0
+
+		if max_age is not None:
+			oldest_allowed = time.time() - max_age
+			while removed < len(entries) and entries[removed][0] < oldest_allowed:
+				os.remove(entries[removed][2])
+				removed += 1
+
+		if max_size is not None:
+			cache_size = sum(entry[1] for entry in entries[removed:])
+			while removed < len(entries) and cache_size > max_size:
+				os.remove(entries[removed][2])
+				cache_size -= entries[removed][1]
+				removed += 1
+
+		return removed
@@ -0,0 +1,407 @@
+from lxml import etree
+
+import logging
+import os
+from datetime import datetime
+
+from nor2qml.core import nordic2quakeml, nordicColumns, nordicRead
+from nor2qml.validation import nordicCompiledValidation
+
+BED_NAMESPACE = nordic2quakeml.BED_NAMESPACE
+
+#Inverse of a conversion dictionary of nordic2quakeml. When several nordic codes map to the same QuakeML value the code must be chosen in the preferred codes, where None leaves the column blank
+def invertConversion(conversion, preferred=None):
+	preferred = preferred or {}
+	inverse = {}
+
+	for nordic_value, quakeml_value in conversion.items():
+		if quakeml_value in inverse and quakeml_value not in preferred:
+			raise ValueError("There is no preferred nordic code for {0}".format(quakeml_value))
+		inverse[quakeml_value] = nordic_value
+
+	inverse.update(preferred)
+
+	return inverse
+
+#Confirmed earthquakes and explosions are written with their own codes. The undecidable polarity is left blank because + and - are the poor compressional and dilatational first motions
+EVENT_TYPE_INVERSE = invertConversion(nordic2quakeml.EVENT_TYPE_CONVERSION, {"earthquake": "Q", "explosion": "E", "not reported": " "})
+PICK_POLARITY_INVERSE = invertConversion(nordic2quakeml.PICK_POLARITY_CONVERSION, {"undecidable": None})
+MAGNITUDE_TYPE_INVERSE = invertConversion(nordic2quakeml.MAGNITUDE_TYPE_CONVERSION)
+INSTRUMENT_TYPE_INVERSE = invertConversion(nordic2quakeml.INSTRUMENT_TYPE_CONVERSION)
+
+#Number of decimals written for the float columns of each line type. The decimals are reduced if the value does not fit into the column otherwise
+FLOAT_DECIMALS = {
+	"1": {
+		"second": 1,
+		"epicenter_latitude": 3,
+		"epicenter_longitude": 3,
+		"depth": 1,
+		"rms_time_residuals": 1,
+		"magnitude_1": 1,
+		"magnitude_2": 1,
+		"magnitude_3": 1,
+	},
+	"5": {
+		"second_error": 1,
+		"epicenter_latitude_error": 1,
+		"epicenter_longitude_error": 1,
+		"depth_error": 1,
+		"magnitude_error": 1,
+	},
+	" ": {
+		"second": 2,
+		"max_amplitude": 1,
+		"max_amplitude_period": 2,
+		"back_azimuth": 1,
+		"apparent_velocity": 1,
+		"signal_to_noise": 1,
+		"travel_time_residual": 2,
+	},
+}
+
+#Integer columns that are padded with zeros like the times of the nordic lines
+ZERO_PADDED_COLUMNS = ("hour", "minute")
+
+#Header line of the phase data lines
+PHASE_DATA_HEADER_LINE = " STAT SP IPHASW D HRMM SECON CODA AMPLIT PERI AZIMU VELO AIN AR TRES W  DIS CAZ7\n"
+
+#Returns the float as a string of the width or None if it does not fit
+def formatFloat(value, width, decimals):
+	for d in range(decimals, -1, -1):
+		column = "{0:{1}.{2}f}".format(value, width, d)
+		if len(column) <= width:
+			return column
+
+	return None
+
+#Returns the value as the column of the layout or None if the value does not fit into the column. The float columns are written with the decimals of the line type
+def formatColumn(value, name, width, column_type, float_decimals):
+	if column_type == "string":
+		return value[:width].ljust(width)
+	if column_type == "integer" and name in ZERO_PADDED_COLUMNS:
+		column = "{0:0{1}d}".format(int(round(value)), width)
+	elif column_type == "integer":
+		column = "{0:{1}d}".format(int(round(value)), width)
+	elif column_type == "float":
+		column = formatFloat(value, width, float_decimals.get(name, width - 2))
+	else:
+		column = "{0:04d} {1:02d}{2:02d}".format(value.year, value.month, value.day).ljust(width)
+
+	if column is None or len(column) > width:
+		return None
+
+	return column
+
+#Write the values into a fixed column line of the layout. The values are given by the column names and the values that are missing or None are left blank. The line type is written into column 80
+def formatNordicLine(layout, values, line_type):
+	line = [" "] * 80
+	float_decimals = FLOAT_DECIMALS.get(line_type, {})
+
+	for name, start, end, column_type in layout.columns:
+		value = values.get(name)
+		if value is None:
+			continue
+
+		column = formatColumn(value, name, end - start, column_type, float_decimals)
+		if column is None:
+			logging.warning("Value {0} of {1} does not fit into the nordic line".format(value, name))
+			continue
+
+		line[start:end] = column
+
+	line[79] = line_type
+
+	return "".join(line) + "\n"
+
+#Helpers for reading the text of the QuakeML elements. The path is given without the namespace and the qualified paths are kept so that lxml can reuse its compiled path
+qualified_paths = {}
+
+def getQualifiedPath(path):
+	qualified_path = qualified_paths.get(path)
+
+	if qualified_path is None:
+		qualified_path = "/".join(BED_NAMESPACE + tag for tag in path.split("/"))
+		qualified_paths[path] = qualified_path
+
+	return qualified_path
+
+def getText(element, path):
+	if element is None:
+		return None
+
+	text = element.findtext(getQualifiedPath(path))
+
+	if text is None:
+		return None
+
+	return text.strip()
+
+def getFloat(element, path):
+	text = getText(element, path)
+
+	if text is None:
+		return None
+
+	try:
+		return float(text)
+	except ValueError:
+		return None
+
+def parseQuakeMlTime(time_text):
+	if time_text is None:
+		return None
+
+	time_text = time_text.rstrip("Z")
+
+	try:
+		return datetime.fromisoformat(time_text)
+	except ValueError:
+		pass
+
+	for time_format in ("%Y-%m-%dT%H:%M:%S.%f", "%Y-%m-%dT%H:%M:%S"):
+		try:
+			return datetime.strptime(time_text, time_format)
+		except ValueError:
+			continue
+
+	return None
+
+#Returns the origins of the event with the magnitudes of each origin. A magnitude belongs to the origin of its originID, or to the origin before it in the document when the originID does not identify one origin. The preferred origin is the first one
+def getOriginsAndMagnitudes(event):
+	origins = []
+	origin_counts = {}
+
+	for origin in event.iterchildren(BED_NAMESPACE + "origin"):
+		origin_counts[origin.get("publicID")] = origin_counts.get(origin.get("publicID"), 0) + 1
+
+	preferred_id = getText(event, "preferredOriginID")
+	preferred_magnitude_id = getText(event, "preferredMagnitudeID")
+
+	for element in event.iterchildren(BED_NAMESPACE + "origin", BED_NAMESPACE + "magnitude"):
+		if element.tag == BED_NAMESPACE + "origin":
+			origins.append((element, []))
+			continue
+
+		origin_id = getText(element, "originID")
+		for origin, magnitudes in origins:
+			if origin_counts.get(origin_id) == 1 and origin.get("publicID") == origin_id:
+				break
+		else:
+			if not origins:
+				continue
+			origin, magnitudes = origins[-1]
+
+		if element.get("publicID") == preferred_magnitude_id:
+			magnitudes.insert(0, element)
+		else:
+			magnitudes.append(element)
+
+	origins.sort(key=lambda origin: origin[0].get("publicID") != preferred_id)
+
+	return origins
+
+#Returns the value in kilometers from the QuakeML units, given as the number of QuakeML units in one kilometer
+def toKilometers(value, units_per_km):
+	if value is None:
+		return None
+
+	return value / units_per_km
+
+#The values are converted from the QuakeML units, depths in meters and distances in degrees, into the kilometers of nordic
+def createMainHeaderLine(event, origin, magnitudes, first):
+	values = {}
+	origin_time = parseQuakeMlTime(getText(origin, "time/value"))
+
+	if origin_time is not None:
+		values["date"] = origin_time.date()
+		values["hour"] = origin_time.hour
+		values["minute"] = origin_time.minute
+		values["second"] = origin_time.second + origin_time.microsecond / 1000000.0
+
+	event_type = getText(event, "type")
+	if first and event_type in EVENT_TYPE_INVERSE:
+		values["event_desc_id"] = EVENT_TYPE_INVERSE[event_type]
+
+	values["epicenter_latitude"] = getFloat(origin, "latitude/value")
+	values["epicenter_longitude"] = getFloat(origin, "longitude/value")
+	values["depth"] = toKilometers(getFloat(origin, "depth/value"), nordic2quakeml.M_PER_KM)
+	values["epicenter_reporting_agency"] = getText(origin, "creationInfo/agencyID")
+	values["rms_time_residuals"] = getFloat(origin, "quality/standardError")
+
+	station_count = getFloat(origin, "quality/usedStationCount")
+	for i, magnitude in enumerate(magnitudes[:3]):
+		number = str(i + 1)
+		values["magnitude_" + number] = getFloat(magnitude, "mag/value")
+		values["type_of_magnitude_" + number] = MAGNITUDE_TYPE_INVERSE.get(getText(magnitude, "type"))
+		values["magnitude_reporting_agency_" + number] = getText(magnitude, "creationInfo/agencyID")
+		if station_count is None:
+			station_count = getFloat(magnitude, "stationCount")
+
+	values["stations_used"] = station_count
+
+	return formatNordicLine(nordicColumns.MAIN_HEADER_LAYOUT, values, "1")
+
+#Returns the type 5 line of the uncertainties of the origin or None if the origin has no uncertainties
+def createErrorHeaderLine(event, origin, magnitudes):
+	values = {
+		#The time uncertainty is written as 0 by nordic2quakeml when it is not known
+		"second_error": getFloat(origin, "time/uncertainty") or None,
+		"epicenter_latitude_error": toKilometers(getFloat(origin, "latitude/uncertainty"), 1.0 / nordic2quakeml.KM_PER_DEGREE),
+		"epicenter_longitude_error": toKilometers(getFloat(origin, "longitude/uncertainty"), 1.0 / nordic2quakeml.getKmPerLongitudeDegree(getFloat(origin, "latitude/value"))),
+		"depth_error": toKilometers(getFloat(origin, "depth/uncertainty"), nordic2quakeml.M_PER_KM),
+		"gap": getFloat(origin, "quality/azimuthalGap"),
+	}
+
+	if values["gap"] is None:
+		values["gap"] = getFloat(event, "focalMechanism/azimuthalGap")
+
+	if magnitudes:
+		values["magnitude_error"] = getFloat(magnitudes[0], "mag/uncertainty")
+
+	if all(value is None for value in values.values()):
+		return None
+
+	return formatNordicLine(nordicColumns.ERROR_HEADER_LAYOUT, values, "5")
+
+def createPhaseDataLine(pick, arrival, amplitude, origin_time):
+	values = {}
+
+	waveform_id = pick.find(BED_NAMESPACE + "waveformID")
+	if waveform_id is not None:
+		values["station_code"] = waveform_id.get("stationCode")
+		channel_code = waveform_id.get("channelCode")
+		if channel_code:
+			values["sp_instrument_type"] = INSTRUMENT_TYPE_INVERSE.get(channel_code[:2])
+			values["sp_component"] = channel_code[-1]
+
+	pick_time = parseQuakeMlTime(getText(pick, "time/value"))
+	if pick_time is not None:
+		values["hour"] = pick_time.hour
+		values["minute"] = pick_time.minute
+		values["second"] = pick_time.second + pick_time.microsecond / 1000000.0
+
+		if origin_time is not None and pick_time.date() > origin_time.date():
+			values["time_info"] = "+"
+		elif origin_time is not None and pick_time.date() < origin_time.date():
+			values["time_info"] = "-"
+
+	values["first_motion"] = PICK_POLARITY_INVERSE.get(getText(pick, "polarity"))
+	values["back_azimuth"] = getFloat(pick, "backazimuth/value")
+
+	if arrival is not None:
+		values["phase_type"] = getText(arrival, "phase")
+		values["epicenter_to_station_azimuth"] = getFloat(arrival, "azimuth")
+		values["travel_time_residual"] = getFloat(arrival, "timeResidual")
+		values["epicenter_distance"] = toKilometers(getFloat(arrival, "distance"), 1.0 / nordic2quakeml.KM_PER_DEGREE)
+
+	if values.get("phase_type") is None:
+		values["phase_type"] = getText(pick, "phaseHint")
+
+	if amplitude is not None:
+		generic_amplitude = getFloat(amplitude, "genericAmplitude/value")
+		if generic_amplitude is not None:
+			#Convert to nanometers from meters
+			values["max_amplitude"] = generic_amplitude * 1e9
+		values["max_amplitude_period"] = getFloat(amplitude, "period/value")
+		values["signal_duration"] = getFloat(amplitude, "timeWindow/value")
+		values["signal_to_noise"] = getFloat(amplitude, "snr")
+
+	return formatNordicLine(nordicColumns.PHASE_DATA_LAYOUT, values, " ")
+
+#Returns the publicID of the pick of the amplitude. Amplitudes without a pickID are matched by their publicID, which nordic2quakeml gives the same number as the pick
+def getAmplitudePickId(amplitude):
+	pick_id = getText(amplitude, "pickID")
+
+	if pick_id is None and amplitude.get("publicID") is not None:
+		pick_id = amplitude.get("publicID").replace("/amplitude/", "/pick/")
+
+	return pick_id
+
+#Returns the nordic lines of one QuakeML event element
+def createNordicLines(event):
+	origins = getOriginsAndMagnitudes(event)
+	origin, magnitudes = origins[0] if origins else (None, [])
+
+	nordic_lines = [createMainHeaderLine(event, origin, magnitudes, True)]
+
+	for other_origin, other_magnitudes in origins[1:]:
+		nordic_lines.append(createMainHeaderLine(event, other_origin, other_magnitudes, False))
+
+	for comment in event.iterchildren(BED_NAMESPACE + "comment"):
+		text = getText(comment, "text")
+		if text:
+			nordic_lines.append(formatNordicLine(nordicColumns.COMMENT_HEADER_LAYOUT, {"h_comment": text}, "3"))
+
+	error_line = createErrorHeaderLine(event, origin, magnitudes)
+	if error_line is not None:
+		nordic_lines.append(error_line)
+
+	picks = event.findall(BED_NAMESPACE + "pick")
+
+	if picks:
+		arrivals = {}
+		if origin is not None:
+			for arrival in origin.iterchildren(BED_NAMESPACE + "arrival"):
+				arrivals[getText(arrival, "pickID")] = arrival
+
+		amplitudes = {}
+		for amplitude in event.iterchildren(BED_NAMESPACE + "amplitude"):
+			amplitudes[getAmplitudePickId(amplitude)] = amplitude
+
+		origin_time = parseQuakeMlTime(getText(origin, "time/value"))
+
+		nordic_lines.append(PHASE_DATA_HEADER_LINE)
+		for pick in picks:
+			pick_id = pick.get("publicID")
+			nordic_lines.append(createPhaseDataLine(pick, arrivals.get(pick_id), amplitudes.get(pick_id), origin_time))
+
+	return nordic_lines
+
+#Generator that yields the nordic lines of every event of the QuakeML file. The file is parsed with iterparse and every event element is cleared after it has been converted, so the memory use does not grow with the number of events
+def readQuakeMlEvents(fquakeml):
+	for action, event in etree.iterparse(fquakeml, events=("end",), tag=BED_NAMESPACE + "event"):
+		yield createNordicLines(event)
+
+		event.clear()
+		while event.getprevious() is not None:
+			del event.getparent()[0]
+
+#Convert the QuakeML file into one nordic file with the events separated by empty lines. The events that do not go through the nordic validation are logged and skipped. An existing nordic file is not overwritten, so the nordic file a QuakeML file was converted from is kept
+def quakeML2Nordic(usr_path, filename):
+	quakeml_path = os.path.join(usr_path, filename)
+
+	if not os.path.isfile(quakeml_path):
+		logging.error("File {0} does not exists.".format(filename))
+		return False
+
+	nordic_filename = os.path.splitext(os.path.basename(filename))[0] + ".nor"
+
+	try:
+		fnordic = open(os.path.join(usr_path, nordic_filename), 'x', encoding=nordicRead.NORDIC_ENCODING)
+	except FileExistsError:
+		logging.error("File {0} already exists. Move or remove it first.".format(nordic_filename))
+		return False
+	event_count = 0
+
+	try:
+		for event_number, nordic_lines in enumerate(readQuakeMlEvents(quakeml_path)):
+			errors = []
+
+			if nordicCompiledValidation.validateAndCreateNordicEvent([line for line in nordic_lines if line[79] != "7"], errors) is None:
+				logging.error("Event {0} of {1} could not be converted: {2}".format(event_number + 1, filename, "; ".join(str(error) for error in errors)))
+				continue
+
+			fnordic.writelines(nordic_lines)
+			fnordic.write("\n")
+			event_count += 1
+	except etree.XMLSyntaxError as e:
+		logging.error("File {0} is not valid XML: {1}".format(filename, e))
+		fnordic.close()
+		os.remove(os.path.join(usr_path, nordic_filename))
+		return False
+
+	fnordic.close()
+
+	print("{0} has been created with {1} events!".format(nordic_filename, event_count))
+
+	return True
@@ -7,7 +7,7 @@ if __name__=="__main__":
 from nor2qml.validation import validationTools 
 from nor2qml.validation.validationTools import values
 
-def validateCommentHeader(header):
+def validateCommentHeader(header, errors=None):
 	validation = True
 	mheader = 3
 
@@ -17,7 +17,8 @@ def validateCommentHeader(header):
 									78,
 									"",
 									False,
-									mheader):
+									mheader,
+									errors):
 		validation = False
  
 	
@@ -0,0 +1,285 @@
+import math
+from datetime import date
+
+from nor2qml.core import nordicColumns, nordicHandler
+from nor2qml.validation import validationTools
+
+#Declarative validation rules for the columns of each nordic line type. Each rule is (attribute, value name, rule) and the rules are created with the functions below
+#Rules of values that are required report the blank column as missing
+def integerRule(low, high, required=False):
+	return ("integer", low, high, required)
+
+def floatRule(low, high):
+	return ("float", low, high)
+
+def stringRule(minlen, maxlen, allowed=None):
+	return ("string", minlen, maxlen, allowed)
+
+def dateRule():
+	return ("date",)
+
+MAIN_HEADER_RULES = (
+	("date", "date", dateRule()),
+	("hour", "hour", integerRule(0, 23, True)),
+	("minute", "minute", integerRule(0, 59, True)),
+	("second", "second", floatRule(0.0, 59.9)),
+	("location_model", "location model", stringRule(0, 1)),
+	("distance_indicator", "distance indicator", stringRule(0, 1, "LRD")),
+	("event_desc_id", "event description id", stringRule(0, 1)),
+	("epicenter_latitude", "epicenter latitude", floatRule(-90.0, 90.0)),
+	("epicenter_longitude", "epicenter longitude", floatRule(-180.0, 180.0)),
+	("depth", "depth", floatRule(0.0, 999.9)),
+	("depth_control", "depth control", stringRule(0, 1, "FSG")),
+	("locating_indicator", "locating indicator", stringRule(0, 1, "FS")),
+	("epicenter_reporting_agency", "epicenter reporting agency", stringRule(0, 3)),
+	("stations_used", "stations used", integerRule(0, 999)),
+	("rms_time_residuals", "rms time residuals", floatRule(-9.9, 99.9)),
+	("magnitude_1", "magnitude 1", floatRule(0.0, 9.9)),
+	("type_of_magnitude_1", "type of magnitude 1", stringRule(0, 1)),
+	("magnitude_reporting_agency_1", "magnitude reporting agency 1", stringRule(0, 3)),
+	("magnitude_2", "magnitude 2", floatRule(0.0, 9.9)),
+	("type_of_magnitude_2", "type of magnitude 2", stringRule(0, 1)),
+	("magnitude_reporting_agency_2", "magnitude reporting agency 2", stringRule(0, 3)),
+	("magnitude_3", "magnitude 3", floatRule(0.0, 9.9)),
+	("type_of_magnitude_3", "type of magnitude 3", stringRule(0, 1)),
+	("magnitude_reporting_agency_3", "magnitude reporting agency 3", stringRule(0, 3)),
+)
+
+MACROSEISMIC_HEADER_RULES = (
+	("description", "description", stringRule(0, 15)),
+	("diastrophism_code", "diastrophism code", stringRule(0, 1, "FUD ")),
+	("tsunami_code", "tsunami code", stringRule(0, 1, "TQ ")),
+	("seiche_code", "seiche code", stringRule(0, 1, "SQ ")),
+	("cultural_effects", "cultural effects", stringRule(0, 1, "CDFH ")),
+	("unusual_effects", "unusual effects", stringRule(0, 1, "LGSBCVOM ")),
+	("maximum_observed_intensity", "maximum observed intensity", integerRule(0, 20)),
+	("maximum_intensity_qualifier", "maximum intensity qualifier", stringRule(0, 1, "+- ")),
+	("intensity_scale", "intensity scale", stringRule(0, 2, {"MM", "RF", "CS", "SK"})),
+	("macroseismic_latitude", "macroseismic latitude", floatRule(-90.0, 90.0)),
+	("macroseismic_longitude", "macroseismic longitude", floatRule(-180.0, 180.0)),
+	("macroseismic_magnitude", "macroseismic magnitude", floatRule(0.0, 20.0)),
+	("type_of_magnitude", "type of magnitude", stringRule(0, 1, "IAR* ")),
+	("logarithm_of_radius", "logarithm of radius", floatRule(0.0, 99.9)),
+	("logarithm_of_area_1", "logarithm of area 1", floatRule(0.0, 99.99)),
+	("bordering_intensity_1", "bordering intensity 1", integerRule(0, 99)),
+	("logarithm_of_area_2", "logarithm of area 2", floatRule(0.0, 99.99)),
+	("bordering_intensity_2", "bordering intensity 2", integerRule(0, 99)),
+	("reporting_agency", "reporting agency", stringRule(3, 3)),
+)
+
+COMMENT_HEADER_RULES = (
+	("h_comment", "comment", stringRule(0, 78)),
+)
+
+ERROR_HEADER_RULES = (
+	("gap", "gap", integerRule(0, 360)),
+	("second_error", "second error", floatRule(0.0, 99.9)),
+	("epicenter_latitude_error", "epicenter latitude error", floatRule(0.0, 99.99)),
+	("epicenter_longitude_error", "epicenter longitude error", floatRule(0.0, 99.99)),
+	("depth_error", "depth error", floatRule(0.0, 999.9)),
+	("magnitude_error", "magnitude error", floatRule(0.0, 9.9)),
+)
+
+WAVEFORM_HEADER_RULES = (
+	("waveform_info", "waveform string", stringRule(0, 78)),
+)
+
+PHASE_DATA_RULES = (
+	("station_code", "station code", stringRule(0, 4)),
+	("sp_instrument_type", "instrument type", stringRule(0, 1, "LSBEH ")),
+	("sp_component", "component", stringRule(0, 1, "ZNEH ")),
+	("quality_indicator", "quality indicator", stringRule(0, 1)),
+	("phase_type", "phase type", stringRule(0, 4)),
+	("weight", "weight", integerRule(0, 9)),
+	("first_motion", "first motion", stringRule(0, 1, "CD+- ")),
+	("time_info", "time info", stringRule(0, 1, "-+ ")),
+	("hour", "hour", integerRule(0, 23, True)),
+	("minute", "minute", integerRule(0, 59, True)),
+	("second", "second", floatRule(0.0, 59.99)),
+	("signal_duration", "signal duration", integerRule(0, 9999)),
+	("max_amplitude", "max amplitude", floatRule(0.0, 9999.9)),
+	("max_amplitude_period", "max amplitude period", floatRule(0.0, 99.9)),
+	("back_azimuth", "back azimuth", floatRule(0.0, 359.9)),
+	("apparent_velocity", "apparent velocity", floatRule(0.0, 99.9)),
+	("signal_to_noise", "signal to noise", floatRule(0.0, 99.9)),
+	("azimuth_residual", "azimuth residual", integerRule(-99, 999)),
+	("travel_time_residual", "travel time residual", floatRule(-999.9, 9999.9)),
+	("location_weight", "location weight", integerRule(0, 10)),
+	("epicenter_distance", "epicenter distance", integerRule(0, 99999)),
+	("epicenter_to_station_azimuth", "epicenter to station azimuth", integerRule(0, 359)),
+)
+
+#Raised by a compiled check when the column is not valid. Contains the message template and its arguments
+class RuleError(Exception):
+	def __init__(self, msg, value_name, msg_args, allowed=None):
+		Exception.__init__(self, msg)
+		self.msg = msg
+		self.value_name = value_name
+		self.msg_args = msg_args
+		self.allowed = allowed
+
+def compileIntegerCheck(value_name, low, high, required):
+	def check(column):
+		if column == "" or column.isspace():
+			if required:
+				raise RuleError(validationTools.MISSING_MSG, value_name, ())
+			return None
+
+		try:
+			value = int(column)
+		except ValueError:
+			raise RuleError(validationTools.NOT_INTEGER_MSG, value_name, (column.strip(),))
+
+		if value < low:
+			raise RuleError(validationTools.SMALLER_MSG, value_name, (low, column.strip()))
+		if value > high:
+			raise RuleError(validationTools.LARGER_MSG, value_name, (high, column.strip()))
+
+		return value
+
+	return check
+
+def compileFloatCheck(value_name, low, high):
+	def check(column):
+		if column == "" or column.isspace():
+			return None
+
+		try:
+			value = float(column)
+		except ValueError:
+			raise RuleError(validationTools.NOT_FLOAT_MSG, value_name, (column.strip(),))
+
+		if math.isnan(value) or math.isinf(value):
+			raise RuleError(validationTools.NOT_ALLOWED_FLOAT_MSG, value_name, (column.strip(),))
+		if value < low:
+			raise RuleError(validationTools.SMALLER_MSG, value_name, (low, column.strip()))
+		if value > high:
+			raise RuleError(validationTools.LARGER_MSG, value_name, (high, column.strip()))
+
+		return value
+
+	return check
+
+def compileStringCheck(value_name, minlen, maxlen, allowed):
+	def check(column):
+		value = column.strip()
+
+		if value == "":
+			return None
+
+		if allowed is not None and value not in allowed:
+			raise RuleError(validationTools.NOT_IN_LIST_MSG, value_name, (value,), allowed)
+
+		if len(value) < minlen:
+			raise RuleError(validationTools.SHORTER_MSG, value_name, (minlen, value))
+		if len(value) > maxlen:
+			raise RuleError(validationTools.LONGER_MSG, value_name, (maxlen, value))
+
+		return value
+
+	return check
+
+def compileDateCheck(value_name):
+	def check(column):
+		try:
+			return date(year=int(column[0:4]), month=int(column[5:7]), day=int(column[7:9]))
+		except ValueError:
+			raise RuleError(validationTools.NOT_DATE_MSG, value_name, (nordicColumns.toDateString(column),))
+
+	return check
+
+def compileCheck(value_name, rule):
+	if rule[0] == "integer":
+		return compileIntegerCheck(value_name, rule[1], rule[2], rule[3])
+	elif rule[0] == "float":
+		return compileFloatCheck(value_name, rule[1], rule[2])
+	elif rule[0] == "string":
+		return compileStringCheck(value_name, rule[1], rule[2], rule[3])
+	elif rule[0] == "date":
+		return compileDateCheck(value_name)
+
+#Checker for one line type. Every column is checked and converted exactly once. Columns without a rule are only converted
+class CompiledValidator:
+	def __init__(self, layout, rules, nType):
+		self.layout = layout
+		self.nType = nType
+
+		rules_by_attribute = dict((rule[0], rule) for rule in rules)
+		checks = []
+
+		for i, column in enumerate(layout.columns):
+			if column[0] in rules_by_attribute:
+				checks.append(compileCheck(rules_by_attribute[column[0]][1], rules_by_attribute[column[0]][2]))
+			else:
+				checks.append(layout.value_converters[i])
+
+		self.checks = tuple(checks)
+
+	#Returns the typed values of the line or None if any of the columns is not valid. The errors are logged or collected to the errors list if one is given
+	def validateLine(self, line, errors=None):
+		values = [None] * len(self.checks)
+		valid = True
+
+		for i, (check, column) in enumerate(zip(self.checks, self.layout.slice_columns(line))):
+			try:
+				values[i] = check(column)
+			except RuleError as error:
+				validationTools.reportError(errors, self.nType, error.value_name, error.msg, error.msg_args, line, error.allowed)
+				valid = False
+
+		if not valid:
+			return None
+
+		return values
+
+PHASE_DATA_VALIDATOR = CompiledValidator(nordicColumns.PHASE_DATA_LAYOUT, PHASE_DATA_RULES, 8)
+
+#Validators of the header lines by the line type in column 80
+HEADER_VALIDATORS = {
+	"1": CompiledValidator(nordicColumns.MAIN_HEADER_LAYOUT, MAIN_HEADER_RULES, 1),
+	"2": CompiledValidator(nordicColumns.MACROSEISMIC_HEADER_LAYOUT, MACROSEISMIC_HEADER_RULES, 2),
+	"3": CompiledValidator(nordicColumns.COMMENT_HEADER_LAYOUT, COMMENT_HEADER_RULES, 3),
+	"5": CompiledValidator(nordicColumns.ERROR_HEADER_LAYOUT, ERROR_HEADER_RULES, 5),
+	"6": CompiledValidator(nordicColumns.WAVEFORM_HEADER_LAYOUT, WAVEFORM_HEADER_RULES, 6),
+}
+
+#Validate the lines of one event and create the typed event from the values of the validation. Returns None if the event is not valid. The errors are logged or collected to the errors list if one is given
+def validateAndCreateNordicEvent(nordic_lines, errors=None):
+	validation_error = False
+	headers = {1:[], 2:[], 3:[], 4:[], 5:[], 6:[]}
+	header_lines, data_lines = nordicColumns.splitNordicLines(nordic_lines)
+
+	header_lines = [line for line in header_lines if line[79] in HEADER_VALIDATORS]
+
+	if not header_lines or all(line[79] != "1" for line in header_lines):
+		validationTools.reportError(errors, 0, "main header", validationTools.NO_MAIN_HEADER_MSG, (), nordic_lines[0] if nordic_lines else None)
+		validation_error = True
+	elif header_lines[0][79] != "1":
+		msg = validationTools.FIRST_HEADER_MSG
+		validationTools.reportError(errors, 0, "first header", msg, (header_lines[0][79],), header_lines[0])
+		validation_error = True
+
+	for line in header_lines:
+		values = HEADER_VALIDATORS[line[79]].validateLine(line, errors)
+
+		if values is None:
+			validation_error = True
+		elif not validation_error:
+			header_type, header_class = nordicHandler.HEADER_CLASSES[line[79]]
+			headers[header_type].append(header_class(values))
+
+	phase_data = []
+	validatePhaseData = PHASE_DATA_VALIDATOR.validateLine
+
+	for line in data_lines:
+		values = validatePhaseData(line, errors)
+
+		if values is None:
+			validation_error = True
+		elif not validation_error:
+			phase_data.append(nordicHandler.NordicPhaseData(values))
+
+	if validation_error:
+		return None
+
+	return nordicHandler.NordicEvent(headers, phase_data)
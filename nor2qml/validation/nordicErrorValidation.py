@@ -7,7 +7,7 @@ if __name__=="__main__":
 from nor2qml.validation import validationTools 
 from nor2qml.validation.validationTools import values
 
-def validateErrorHeader(header):
+def validateErrorHeader(header, errors=None):
 	validation = True
 	mheader = 5
 
@@ -16,7 +16,8 @@ def validateErrorHeader(header):
 										0,
 										360,
 										True,
-										mheader):
+										mheader,
+										errors):
 		validation = False
 
 	if not validationTools.validateFloat(header.second_error,	
@@ -24,7 +25,8 @@ def validateErrorHeader(header):
 										0.0,
 										99.9,
 										True,
-										mheader):
+										mheader,
+										errors):
 		validation = False
 
 	if not validationTools.validateFloat(header.epicenter_latitude_error,
@@ -32,7 +34,8 @@ def validateErrorHeader(header):
 										0.0,
 										99.99,
 										True,
-										mheader):
+										mheader,
+										errors):
 		validation = False
 
 	if not validationTools.validateFloat(header.epicenter_longitude_error,
@@ -40,7 +43,8 @@ def validateErrorHeader(header):
 										0.0,
 										99.99,
 										True,
-										mheader):
+										mheader,
+										errors):
 		validation = False
 
 	if not validationTools.validateFloat(header.depth_error,
@@ -48,7 +52,8 @@ def validateErrorHeader(header):
 										0.0,
 										999.9,
 										True,
-										mheader):
+										mheader,
+										errors):
 		validation = False
 	
 	if not validationTools.validateFloat(header.magnitude_error,
@@ -56,7 +61,8 @@ def validateErrorHeader(header):
 										0.0,
 										9.9,
 										True,
-										mheader):
+										mheader,
+										errors):
 		validation = False
 	
 	return validation	
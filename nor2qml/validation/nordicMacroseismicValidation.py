@@ -7,7 +7,7 @@ if __name__=="__main__":
 from nor2qml.validation import validationTools 
 from nor2qml.validation.validationTools import values
 
-def validateMacroseismicHeader(nordic_event):
+def validateMacroseismicHeader(nordic_event, errors=None):
 	validation = True
 	mheader = 2
 
@@ -17,7 +17,8 @@ def validateMacroseismicHeader(nordic_event):
 											15,
 											"",
 											False,
-											mheader):
+											mheader,
+											errors):
 		validation = False
 
 	if not validationTools.validateString(nordic_event.diastrophism_code,
@@ -26,7 +27,8 @@ def validateMacroseismicHeader(nordic_event):
 											1,
 											"FUD ",
 											True,
-											mheader):
+											mheader,
+											errors):
 		validation = False
 
 	if not validationTools.validateString(nordic_event.tsunami_code,
@@ -35,7 +37,8 @@ def validateMacroseismicHeader(nordic_event):
 											1,
 											"TQ ",
 											True,
-											mheader):
+											mheader,
+											errors):
 		validation = False
 
 	if not validationTools.validateString(nordic_event.seiche_code,
@@ -44,7 +47,8 @@ def validateMacroseismicHeader(nordic_event):
 											1,
 											"SQ ",
 											True,
-											mheader):
+											mheader,
+											errors):
 		validation = False
 
 	if not validationTools.validateString(nordic_event.cultural_effects,
@@ -53,7 +57,8 @@ def validateMacroseismicHeader(nordic_event):
 											1,
 											"CDFH ",
 											True,
-											mheader):
+											mheader,
+											errors):
 		validation = False
 
 	if not validationTools.validateString(nordic_event.unusual_effects,
@@ -62,7 +67,8 @@ def validateMacroseismicHeader(nordic_event):
 											1,
 											"LGSBCVOM ",
 											True,
-											mheader):
+											mheader,
+											errors):
 		validation = False
 
 	if not validationTools.validateInteger(nordic_event.maximum_observed_intensity,
@@ -70,7 +76,8 @@ def validateMacroseismicHeader(nordic_event):
 											0,
 											20,
 											True,
-											mheader):
+											mheader,
+											errors):
 		validation = False
 
 	if not validationTools.validateString(nordic_event.maximum_intensity_qualifier,
@@ -79,7 +86,8 @@ def validateMacroseismicHeader(nordic_event):
 											1,
 											"+- ",
 											True,
-											mheader):
+											mheader,
+											errors):
 		validation = False
 
 	if not validationTools.validateString(nordic_event.intensity_scale,
@@ -88,7 +96,8 @@ def validateMacroseismicHeader(nordic_event):
 											2,
 											{"MM", "RF", "CS", "SK"},
 											True,
-											mheader):
+											mheader,
+											errors):
 		validation = False
 
 	if not validationTools.validateFloat(nordic_event.macroseismic_latitude,
@@ -96,7 +105,8 @@ def validateMacroseismicHeader(nordic_event):
 											-90.0,
 											90.0,
 											True,
-											mheader):
+											mheader,
+											errors):
 		validation = False
 
 	if not validationTools.validateFloat(nordic_event.macroseismic_longitude,
@@ -104,7 +114,8 @@ def validateMacroseismicHeader(nordic_event):
 											-180.0,
 											180.0,
 											True,
-											mheader):
+											mheader,
+											errors):
 		validation = False
 
 	if not validationTools.validateFloat(nordic_event.macroseismic_magnitude,
@@ -112,7 +123,8 @@ def validateMacroseismicHeader(nordic_event):
 											0.0,
 											20.0,
 											True,
-											mheader):
+											mheader,
+											errors):
 		validation = False
 
 	if not validationTools.validateString(nordic_event.type_of_magnitude,
@@ -121,7 +133,8 @@ def validateMacroseismicHeader(nordic_event):
 											1,
 											"IAR* ",
 											True,
-											mheader):
+											mheader,
+											errors):
 		validation = False
 
 	if not validationTools.validateFloat(nordic_event.logarithm_of_radius,
@@ -129,7 +142,8 @@ def validateMacroseismicHeader(nordic_event):
 											0.0,
 											99.9,
 											True,
-											mheader):
+											mheader,
+											errors):
 		validation = False
 
 	if not validationTools.validateFloat(nordic_event.logarithm_of_area_1,
@@ -137,7 +151,8 @@ def validateMacroseismicHeader(nordic_event):
 											0.0,
 											99.99,
 											True,
-											mheader):
+											mheader,
+											errors):
 		validation = False
 
 	if not validationTools.validateInteger(nordic_event.bordering_intensity_1,
@@ -145,7 +160,8 @@ def validateMacroseismicHeader(nordic_event):
 											0,
 											99,
 											True,
-											mheader):
+											mheader,
+											errors):
 		validation = False
 
 	if not validationTools.validateFloat(nordic_event.logarithm_of_area_2,
@@ -153,7 +169,8 @@ def validateMacroseismicHeader(nordic_event):
 											0.0,
 											99.99,
 											True,
-											mheader):
+											mheader,
+											errors):
 		validation = False
 
 	if not validationTools.validateInteger(nordic_event.bordering_intensity_2,
@@ -161,7 +178,8 @@ def validateMacroseismicHeader(nordic_event):
 											0,
 											99,
 											True,
-											mheader):
+											mheader,
+											errors):
 		validation = False
 
 	if not validationTools.validateString(nordic_event.reporting_agency,
@@ -169,8 +187,9 @@ def validateMacroseismicHeader(nordic_event):
 											3,
 											3,
 											"",
-											True,
-											mheader):
+											False,
+											mheader,
+											errors):
 		validation = False
 
 	return validation	
@@ -7,7 +7,7 @@ if __name__=="__main__":
 from nor2qml.validation import validationTools 
 from nor2qml.validation.validationTools import values
 
-def validateMainHeader(nordic_main):
+def validateMainHeader(nordic_main, errors=None):
 	validation = True
 	mheader = 1
 
@@ -15,7 +15,8 @@ def validateMainHeader(nordic_main):
 
 	if not validationTools.validateDate(nordic_main.date,
 												"date",
-												mheader):
+												mheader,
+												errors):
 		validation = False
 
 	
@@ -24,7 +25,8 @@ def validateMainHeader(nordic_main):
 												0,
 												23,
 												True,
-												mheader):
+												mheader,
+												errors):
 		validation = False
 
 	if not validationTools.validateInteger(nordic_main.minute,
@@ -32,7 +34,8 @@ def validateMainHeader(nordic_main):
 												0,
 												59,
 												True,
-												mheader):
+												mheader,
+												errors):
 		validation = False
 
 	if not validationTools.validateFloat(nordic_main.second,
@@ -40,7 +43,8 @@ def validateMainHeader(nordic_main):
 												0.0,
 												59.9,
 												True,
-												mheader):
+												mheader,
+												errors):
 		validation = False
 
 	if not validationTools.validateString(nordic_main.location_model,
@@ -49,7 +53,8 @@ def validateMainHeader(nordic_main):
 												1,
 												"",
 												False,
-												mheader):
+												mheader,
+												errors):
 		validation = False
 	
 	if not validationTools.validateString(nordic_main.distance_indicator,
@@ -58,7 +63,8 @@ def validateMainHeader(nordic_main):
 												1,
 												"LRD",
 												True,
-												mheader):
+												mheader,
+												errors):
 		validation = False
 
 	#TODO these limitations
@@ -68,7 +74,8 @@ def validateMainHeader(nordic_main):
 												1,
 												"",
 												False,
-												mheader):
+												mheader,
+												errors):
 		validation = False
 
 	if not validationTools.validateFloat(nordic_main.epicenter_latitude,
@@ -76,7 +83,8 @@ def validateMainHeader(nordic_main):
 												-90.0,
 												90.0,
 												True,
-												mheader):
+												mheader,
+												errors):
 		validation = False
 
 	if not validationTools.validateFloat(nordic_main.epicenter_longitude,
@@ -84,7 +92,8 @@ def validateMainHeader(nordic_main):
 												-180.0,
 												180.0,
 												True,
-												mheader):
+												mheader,
+												errors):
 		validation = False
 
 	if not validationTools.validateFloat(nordic_main.depth,
@@ -92,7 +101,8 @@ def validateMainHeader(nordic_main):
 												0.0,
 												999.9,
 												True,
-												mheader):
+												mheader,
+												errors):
 		validation = False
 
 	if not validationTools.validateString(nordic_main.depth_control,
@@ -101,7 +111,8 @@ def validateMainHeader(nordic_main):
 												1,
 												"FSG",
 												True,
-												mheader):
+												mheader,
+												errors):
 		validation = False
 
 	if not validationTools.validateString(nordic_main.locating_indicator,
@@ -110,7 +121,8 @@ def validateMainHeader(nordic_main):
 												1,
 												"FS",
 												True,
-												mheader):
+												mheader,
+												errors):
 		validation = False
 
 	if not validationTools.validateString(nordic_main.epicenter_reporting_agency,
@@ -119,7 +131,8 @@ def validateMainHeader(nordic_main):
 												3,
 												"",
 												False,
-												mheader):
+												mheader,
+												errors):
 		validation = False
 	
 	if not validationTools.validateInteger(nordic_main.stations_used,
@@ -127,7 +140,8 @@ def validateMainHeader(nordic_main):
 												0,
 												999,
 												True,
-												mheader):
+												mheader,
+												errors):
 		validation = False
 
 	if not validationTools.validateFloat(nordic_main.rms_time_residuals,
@@ -135,7 +149,8 @@ def validateMainHeader(nordic_main):
 												-9.9,
 												99.9,
 												True,
-												mheader):
+												mheader,
+												errors):
 		validation = False
 
 	if not validationTools.validateFloat(nordic_main.magnitude_1,
@@ -143,7 +158,8 @@ def validateMainHeader(nordic_main):
 												0.0,
 												9.9,
 												True,
-												mheader):
+												mheader,
+												errors):
 		validation = False
 
 	if not validationTools.validateString(nordic_main.type_of_magnitude_1,
@@ -152,7 +168,8 @@ def validateMainHeader(nordic_main):
 												1,
 												"",
 												False,
-												mheader):
+												mheader,
+												errors):
 		validation = False
 	
 	if not validationTools.validateString(nordic_main.magnitude_reporting_agency_1,
@@ -161,7 +178,8 @@ def validateMainHeader(nordic_main):
 												3,
 												"",
 												False,
-												mheader):
+												mheader,
+												errors):
 		validation = False
 
 	if not validationTools.validateFloat(nordic_main.magnitude_2,
@@ -169,7 +187,8 @@ def validateMainHeader(nordic_main):
 												0.0,
 												9.9,
 												True,
-												mheader):
+												mheader,
+												errors):
 		validation = False
 
 	if not validationTools.validateString(nordic_main.type_of_magnitude_2,
@@ -178,7 +197,8 @@ def validateMainHeader(nordic_main):
 												1,
 												"",
 												False,
-												mheader):
+												mheader,
+												errors):
 		validation = False
 	
 	if not validationTools.validateString(nordic_main.magnitude_reporting_agency_2,
@@ -187,7 +207,8 @@ def validateMainHeader(nordic_main):
 												3,
 												"",
 												False,
-												mheader):
+												mheader,
+												errors):
 		validation = False
 
 	if not validationTools.validateFloat(nordic_main.magnitude_3,
@@ -195,7 +216,8 @@ def validateMainHeader(nordic_main):
 												0.0,
 												9.9,
 												True,
-												mheader):
+												mheader,
+												errors):
 		validation = False
 
 	if not validationTools.validateString(nordic_main.type_of_magnitude_3,
@@ -204,7 +226,8 @@ def validateMainHeader(nordic_main):
 												1,
 												"",
 												False,
-												mheader):
+												mheader,
+												errors):
 		validation = False
 	
 	if not validationTools.validateString(nordic_main.magnitude_reporting_agency_3,
@@ -213,7 +236,8 @@ def validateMainHeader(nordic_main):
 												3,
 												"",
 												False,
-												mheader):
+												mheader,
+												errors):
 		validation = False
 
 	return validation	
@@ -4,7 +4,7 @@ import sys
 from nor2qml.validation import validationTools 
 from nor2qml.validation.validationTools import values
 
-def validatePhaseData(phase_data):
+def validatePhaseData(phase_data, errors=None):
 	validation = True
 	phname = 8
 
@@ -14,7 +14,8 @@ def validatePhaseData(phase_data):
 												4,
 												"",
 												False,
-												phname):	
+												phname,
+												errors):	
 		validation = False
 	
 	if not validationTools.validateString(phase_data.sp_instrument_type,
@@ -23,7 +24,8 @@ def validatePhaseData(phase_data):
 												1,
 												"LSBEH ",
 												True,
-												phname):
+												phname,
+												errors):
 		validation = False
 
 	if not validationTools.validateString(phase_data.sp_component,
@@ -32,7 +34,8 @@ def validatePhaseData(phase_data):
 												1,
 												"ZNEH ",
 												True,
-												phname):
+												phname,
+												errors):
 		validation = False
 
 	if not validationTools.validateString(phase_data.quality_indicator,
@@ -41,7 +44,8 @@ def validatePhaseData(phase_data):
 												1,
 												"",
 												False,
-												phname):
+												phname,
+												errors):
 		validation = False
 
 	if not validationTools.validateString(phase_data.phase_type,
@@ -50,7 +54,8 @@ def validatePhaseData(phase_data):
 												4,
 												"",
 												False,
-												phname):
+												phname,
+												errors):
 		validation = False
 
 	if not validationTools.validateInteger(phase_data.weight,
@@ -58,7 +63,8 @@ def validatePhaseData(phase_data):
 												0,
 												9,
 												True,
-												phname):
+												phname,
+												errors):
 		validation = False
 
 	if not validationTools.validateString(phase_data.first_motion,
@@ -67,7 +73,8 @@ def validatePhaseData(phase_data):
 												1,
 												"CD+- ",
 												True,
-												phname):
+												phname,
+												errors):
 		validation = False
 
 	if not validationTools.validateString(phase_data.time_info,
@@ -76,7 +83,8 @@ def validatePhaseData(phase_data):
 												1,
 												"-+ ",
 												True,
-												phname):
+												phname,
+												errors):
 		validation = False
 	
 	if not validationTools.validateInteger(phase_data.hour,
@@ -84,7 +92,8 @@ def validatePhaseData(phase_data):
 												0,
 												23,
 												True,
-												phname):
+												phname,
+												errors):
 		validation = False
 
 	if not validationTools.validateInteger(phase_data.minute,
@@ -92,7 +101,8 @@ def validatePhaseData(phase_data):
 												0,
 												59,
 												True,
-												phname):
+												phname,
+												errors):
 		validation = False
 
 	if not validationTools.validateFloat(phase_data.second,
@@ -100,7 +110,8 @@ def validatePhaseData(phase_data):
 												0.0,
 												59.99,
 												True,
-												phname):
+												phname,
+												errors):
 		validation = False
 
 	if not validationTools.validateInteger(phase_data.signal_duration,
@@ -108,7 +119,8 @@ def validatePhaseData(phase_data):
 												0,
 												9999,
 												True,
-												phname):
+												phname,
+												errors):
 		validation = False
 
 	if not validationTools.validateFloat(phase_data.max_amplitude,
@@ -116,7 +128,8 @@ def validatePhaseData(phase_data):
 												0.0,
 												9999.9,
 												True,
-												phname):
+												phname,
+												errors):
 		validation = False
 
 	if not validationTools.validateFloat(phase_data.max_amplitude_period,
@@ -124,7 +137,8 @@ def validatePhaseData(phase_data):
 												0.0,
 												99.9,
 												True,
-												phname):
+												phname,
+												errors):
 		validation = False
 
 	if not validationTools.validateFloat(phase_data.back_azimuth,
@@ -132,7 +146,8 @@ def validatePhaseData(phase_data):
 												0.0,
 												359.9,
 												True,
-												phname):
+												phname,
+												errors):
 		validation = False
 
 	if not validationTools.validateFloat(phase_data.apparent_velocity,
@@ -140,7 +155,8 @@ def validatePhaseData(phase_data):
 												0.0,
 												99.9,
 												True,
-												phname):
+												phname,
+												errors):
 		validation = False
 
 	if not validationTools.validateFloat(phase_data.signal_to_noise,
@@ -148,7 +164,8 @@ def validatePhaseData(phase_data):
 												0.0,
 												99.9,
 												True,
-												phname):
+												phname,
+												errors):
 		validation = False
 
 	if not validationTools.validateInteger(phase_data.azimuth_residual,
@@ -156,7 +173,8 @@ def validatePhaseData(phase_data):
 												-99,
 												999,
 												True,
-												phname):
+												phname,
+												errors):
 		validation = False
 
 	if not validationTools.validateFloat(phase_data.travel_time_residual,
@@ -164,7 +182,8 @@ def validatePhaseData(phase_data):
 												-999.9,
 												9999.9,
 												True,
-												phname):	
+												phname,
+												errors):	
 		validation = False
 
 	if not validationTools.validateInteger(phase_data.location_weight,
@@ -172,7 +191,8 @@ def validatePhaseData(phase_data):
 												0,
 												10,
 												True,
-												phname):
+												phname,
+												errors):
 		validation = False
 
 	if not validationTools.validateInteger(phase_data.epicenter_distance,
@@ -180,7 +200,8 @@ def validatePhaseData(phase_data):
 												0,
 												99999,
 												True,
-												phname):
+												phname,
+												errors):
 		validation = False
 
 	if not validationTools.validateInteger(phase_data.epicenter_to_station_azimuth,
@@ -188,7 +209,8 @@ def validatePhaseData(phase_data):
 												0,
 												359,
 												True,
-												phname):
+												phname,
+												errors):
 		validation = False
 
 	return validation
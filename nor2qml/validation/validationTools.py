@@ -1,3 +1,4 @@
+import collections
 import math
 import logging
 from datetime import date
@@ -8,99 +9,155 @@ nTypes = {0: "Nordic Event",
 		3: "Nordic Comment Header",
 		5: "Nordic Error Header",
 		6: "Nordic Waveform Header",
-		8: "Nordic Phase Data"}
+		8: "Nordic Phase Data",
+		9: "Nordic Read",
+		10: "QuakeML Validation"}
 
 class values():
 	maxInt = 9223372036854775807 
 
-def validateInteger(val, valueName, low, high, limits, nType):
+#Validation error messages. The first argument is the type of the nordic line and the second the name of the value
+NOT_INTEGER_MSG = "Validation Error - {0}: {1} is not an integer! ({2})"
+NOT_FLOAT_MSG = "Validation Error - {0}: {1} is not an float! ({2})"
+NOT_ALLOWED_FLOAT_MSG = "Validation Error - {0}: {1} is {2} which is not allowed!"
+SMALLER_MSG = "Validation Error - {0}: {1} is smaller than {2}! ({3})"
+LARGER_MSG = "Validation Error - {0}: {1} is larger than {2}! ({3})"
+NOT_IN_LIST_MSG = "Validation Error - {0}: {1} not in the list of allowed strings! ({2})\nAllowed:\n"
+SHORTER_MSG = "Validation Error - {0}: {1} is shorter than the minimum allowed length {2}! ({3})"
+LONGER_MSG = "Validation Error - {0}: {1} is longer than the maximum allowed length {2}! ({3})"
+NOT_DATE_MSG = "Validation Error - {0}: {1} is not parsable into date!({2})"
+FIRST_HEADER_MSG = "Validation Error - {0}: First Header is not of type 1! {2}"
+NO_MAIN_HEADER_MSG = "Validation Error - {0}: Event has no header of type 1!"
+MISSING_MSG = "Validation Error - {0}: {1} is missing!"
+CONVERSION_MSG = "Validation Error - {0}: Converting the event failed! {2}: {3}"
+
+#Structured record of one validation error. The message is rendered from the template and its arguments only when it is needed. The line is the nordic line of the error when it is known
+class ValidationError:
+	__slots__ = ("nType", "valueName", "msg", "msgArgs", "line", "allowed")
+
+	def __init__(self, nType, valueName, msg, msgArgs, line=None, allowed=None):
+		self.nType = nType
+		self.valueName = valueName
+		self.msg = msg
+		self.msgArgs = msgArgs
+		self.line = line
+		self.allowed = allowed
+
+	@property
+	def message(self):
+		message = self.msg.format(nTypes[self.nType], self.valueName, *self.msgArgs)
+
+		if self.allowed is not None:
+			message += "".join("  -" + allowed + "\n" for allowed in self.allowed)
+
+		return message
+
+	def __str__(self):
+		return self.message
+
+#Log the validation error or collect it to the errors list if one is given. The logged message is rendered only if the log record is emitted
+def reportError(errors, nType, valueName, msg, msgArgs, line=None, allowed=None):
+	if errors is None:
+		logging.error("%s", ValidationError(nType, valueName, msg, msgArgs, line, allowed))
+	else:
+		errors.append(ValidationError(nType, valueName, msg, msgArgs, line, allowed))
+
+#Number of errors by the line type and the name of the value
+def countErrors(errors, counts=None):
+	if counts is None:
+		counts = collections.Counter()
+
+	for error in errors:
+		counts[(nTypes[error.nType], error.valueName)] += 1
+
+	return counts
+
+def validateInteger(val, valueName, low, high, limits, nType, errors=None):
 	if val == "":
 		return True
 
 	try:
 		int(val)
 	except:		
-		msg = "Validation Error - {0}: {1} is not an integer! ({2})"
-		logging.error(msg.format(nTypes[nType], valueName, val))
+		msg = NOT_INTEGER_MSG
+		reportError(errors, nType, valueName, msg, (val,))
 		return False
 
 	if int(val) < low and limits:
-		msg = "Validation Error - {0}: {1} is smaller than {2}! ({3})"
-		logging.error(msg.format(nTypes[nType], valueName, low, val))
+		msg = SMALLER_MSG
+		reportError(errors, nType, valueName, msg, (low, val))
 		return False
 
 	if int(val) > high and limits:
-		msg = "Validation Error - {0}: {1} is larger than {2}! ({3})"
-		logging.error(msg.format(nTypes[nType], valueName, high, val))
+		msg = LARGER_MSG
+		reportError(errors, nType, valueName, msg, (high, val))
 		return False
 
 	return True
 
-def validateFloat(val, valueName, low, high, limits, nType):
+def validateFloat(val, valueName, low, high, limits, nType, errors=None):
 	if val == "":
 		return True
 
 	try:
 		float(val)
 	except:		
-		msg = "Validation Error - {0}: {1} is not an float! ({2})"
-		logging.error(msg.format(nTypes[nType], valueName, val))
+		msg = NOT_FLOAT_MSG
+		reportError(errors, nType, valueName, msg, (val,))
 		return False
 
 	if math.isnan(float(val)):
-		msg = "Validation Error - {0}: {1} is {2} which is not allowed!"
-		logging.error(msg.format(nTypes[nType], valueName, val))
+		msg = NOT_ALLOWED_FLOAT_MSG
+		reportError(errors, nType, valueName, msg, (val,))
 		return False
 
 	if math.isinf(float(val)):
-		msg = "Validation Error - {0}: {1} is {2} which is not allowed!"
-		logging.error(msg.format(nTypes[nType], valueName, val))
+		msg = NOT_ALLOWED_FLOAT_MSG
+		reportError(errors, nType, valueName, msg, (val,))
 		return False
 
 	if float(val) < low and limits:
-		msg = "Validation Error - {0}: {1} is smaller than {2}! ({3})"
-		logging.error(msg.format(nTypes[nType], valueName, low, val))
+		msg = SMALLER_MSG
+		reportError(errors, nType, valueName, msg, (low, val))
 		return False
 
 	if float(val) > high and limits:
-		msg = "Validation Error - {0}: {1} is larger than {2}! ({3})"
-		logging.error(msg.format(nTypes[nType], valueName, high, val))
+		msg = LARGER_MSG
+		reportError(errors, nType, valueName, msg, (high, val))
 		return False
 
 	return True
 
-def validateString(string, stringName, minlen, maxlen, listOfAllowed, isList, nType):	
+def validateString(string, stringName, minlen, maxlen, listOfAllowed, isList, nType, errors=None):	
 	if string is "":
 		return True
 
 	if string not in listOfAllowed and isList:
-		msg = "Validation Error - {0}: {1} not in the list of allowed strings! ({2})\nAllowed:\n"
-		for allowed in listOfAllowed:
-			msg += "  -" + allowed + "\n"
-		logging.error(msg.format(nTypes[nType], stringName, string))
+		msg = NOT_IN_LIST_MSG
+		reportError(errors, nType, stringName, msg, (string,), allowed=listOfAllowed)
 		return False
 
 	if minlen > -1  and len(string) < minlen:
-		msg = "Validation Error - {0}: {1} is shorter than the minimum allowed length {2}! ({3})"
-		logging.error(msg.format(nTypes[nType], stringName, minlen, string))
+		msg = SHORTER_MSG
+		reportError(errors, nType, stringName, msg, (minlen, string))
 		return False
 
 	if minlen > -1  and len(string) > maxlen:
-		msg = "Validation Error - {0}: {1} is longer than the maximum allowed length {2}! ({3})"
-		logging.error(msg.format(nTypes[nType], stringName, maxlen, string))
+		msg = LONGER_MSG
+		reportError(errors, nType, stringName, msg, (maxlen, string))
 		return False
 
 	return True
 
-def validateDate(dateS, dateName, nType):
+def validateDate(dateS, dateName, nType, errors=None):
 	if dateS == "":
 		return True
 	
 	try:
 		date(year=int(dateS[:4].strip()), month=int(dateS[5:7].strip()), day=int(dateS[8:].strip()))
 	except:
-		msg = "Validation Error - {0}: {1} is not parsable into date!({2})"
-		logging.error(msg.format(nTypes[nType], dateName, dateS))
+		msg = NOT_DATE_MSG
+		reportError(errors, nType, dateName, msg, (dateS,))
 		return False
 
 	return True
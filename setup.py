@@ -8,6 +8,9 @@ setup(
 	install_requires=[
 		"Click",
 	],
+	extras_require={
+		"columnar": ["numpy"],
+	},
 	entry_points='''
 		[console_scripts]
 		Nor2qml=bin.Nor2qml:nor2qml
@@ -0,0 +1,84 @@
+import os
+import shutil
+import tempfile
+import unittest
+import uuid
+
+try:
+	import psycopg2
+	import psycopg2.extensions
+except ImportError:
+	psycopg2 = None
+
+from nor2qml.core import nordicDatabase, nordicRead
+
+#Connection string of the PostgreSQL database the tests are run against. The tests are skipped without it
+TEST_DSN = os.environ.get("NOR2QML_TEST_DSN")
+DATA_PATH = os.path.join(os.path.dirname(os.path.realpath(__file__)), "data")
+
+def connectTestDatabase():
+	if psycopg2 is None or TEST_DSN is None:
+		return None
+
+	try:
+		return psycopg2.connect(TEST_DSN)
+	except psycopg2.Error:
+		return None
+
+#Loads the nordic files into the tables of a schema of its own, which is dropped after the test
+@unittest.skipIf(connectTestDatabase() is None, "Set NOR2QML_TEST_DSN to a PostgreSQL database to run the database tests")
+class NordicDatabaseTest(unittest.TestCase):
+	def setUp(self):
+		self.schema = "nor2qml_test_" + uuid.uuid4().hex
+		self.connection = connectTestDatabase()
+		self.connection.autocommit = True
+		with self.connection.cursor() as cursor:
+			cursor.execute("CREATE SCHEMA {0}".format(self.schema))
+
+		self.dsn = psycopg2.extensions.make_dsn(TEST_DSN, options="-csearch_path={0}".format(self.schema))
+		self.usr_path = tempfile.mkdtemp()
+		shutil.copy(os.path.join(DATA_PATH, "three.nor"), self.usr_path)
+
+	def tearDown(self):
+		with self.connection.cursor() as cursor:
+			cursor.execute("DROP SCHEMA {0} CASCADE".format(self.schema))
+		self.connection.close()
+		shutil.rmtree(self.usr_path)
+
+	def countRows(self, table):
+		with self.connection.cursor() as cursor:
+			cursor.execute("SELECT count(*) FROM {0}.{1}".format(self.schema, table))
+			return cursor.fetchone()[0]
+
+	def countAllRows(self):
+		tables = [nordicDatabase.EVENT_TABLE, nordicDatabase.PHASE_DATA_TABLE] + [table for header_type, table, layout in nordicDatabase.HEADER_TABLES]
+		return dict((table, self.countRows(table)) for table in tables)
+
+	def testLoad(self):
+		self.assertTrue(nordicDatabase.nordic2Database(self.usr_path, "three.nor", self.dsn))
+
+		self.assertEqual(self.countRows(nordicDatabase.EVENT_TABLE), 3)
+		self.assertEqual(self.countRows(nordicDatabase.PHASE_DATA_TABLE), 9)
+		self.assertEqual(self.countRows("nordic_main_header"), 3)
+
+	def testReloadAddsNoRows(self):
+		self.assertTrue(nordicDatabase.nordic2Database(self.usr_path, "three.nor", self.dsn))
+		counts = self.countAllRows()
+
+		self.assertTrue(nordicDatabase.nordic2Database(self.usr_path, "three.nor", self.dsn))
+		self.assertEqual(self.countAllRows(), counts)
+
+	def testReloadAddsOnlyChangedEvents(self):
+		self.assertTrue(nordicDatabase.nordic2Database(self.usr_path, "three.nor", self.dsn))
+
+		nordic_path = os.path.join(self.usr_path, "three.nor")
+		with open(nordic_path, encoding=nordicRead.NORDIC_ENCODING) as f:
+			nordic = f.read()
+		with open(nordic_path, 'w', encoding=nordicRead.NORDIC_ENCODING) as f:
+			f.write(nordic.replace("Helsinki test event", "Changed test event", 1))
+
+		self.assertTrue(nordicDatabase.nordic2Database(self.usr_path, "three.nor", self.dsn))
+		self.assertEqual(self.countRows(nordicDatabase.EVENT_TABLE), 4)
+
+if __name__ == "__main__":
+	unittest.main()